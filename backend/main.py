@@ -8,8 +8,13 @@ from typing import List, Dict, Optional, Any
 import uuid
 import hashlib
 import os
+import threading
 from services.av_processor import AVProcessor
+from services.job_queue import JobQueue, LocalJobBackend, DatabaseJobBackend
+from services.worker_pool import AnalysisWorkerPool
+from services.session_store import MemorySessionStore, create_session_store
 from sqlalchemy import create_engine, Column, Integer, String, Float, Text, DateTime, Boolean
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
 import json
@@ -32,6 +37,27 @@ Base = declarative_base()
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
 DISABLE_AUTH = ENVIRONMENT == "development"  # False en producción, True en desarrollo
 
+# Cola de análisis de prácticas
+# "db": trabajos persistidos en tabla (sobreviven reinicios; varios workers de uvicorn
+#       los reclaman sin duplicarlos) | "local": solo en memoria (un solo worker)
+# "externa": la API solo persiste los trabajos; los ejecuta `python -m services.worker`
+ANALISIS_COLA_BACKEND = os.getenv("ANALISIS_COLA_BACKEND", "db")
+# Espera entre consultas con la cola vacía, lease de un trabajo "procesando" (tras
+# ese tiempo sin latidos se considera abandonado) y cada cuánto se renueva
+ANALISIS_COLA_ESPERA_SEGUNDOS = float(os.getenv("ANALISIS_COLA_ESPERA_SEGUNDOS", "2"))
+ANALISIS_COLA_LEASE_SEGUNDOS = float(os.getenv("ANALISIS_COLA_LEASE_SEGUNDOS", "120"))
+ANALISIS_COLA_LATIDO_SEGUNDOS = float(os.getenv("ANALISIS_COLA_LATIDO_SEGUNDOS", "30"))
+ANALISIS_MAX_WORKERS = int(os.getenv("ANALISIS_MAX_WORKERS", "2"))
+# "hilos": AVProcessor por hilo dentro de la API | "procesos": pool de procesos con MediaPipe pre-inicializado
+ANALISIS_MODO = os.getenv("ANALISIS_MODO", "hilos")
+ANALISIS_PROCESOS = int(os.getenv("ANALISIS_PROCESOS", str(os.cpu_count() or 1)))
+ANALISIS_RECICLAR_CADA = int(os.getenv("ANALISIS_RECICLAR_CADA", "50"))  # 0 = no reciclar workers
+
+# Sesiones de práctica: "db" (tabla compartida) | "redis" | "memoria" (un solo worker de la API)
+SESIONES_BACKEND = os.getenv("SESIONES_BACKEND", "db")
+SESIONES_REDIS_URL = os.getenv("SESIONES_REDIS_URL", "")
+SESIONES_TTL_SEGUNDOS = float(os.getenv("SESIONES_TTL_SEGUNDOS", "86400"))  # expiración de sesiones abandonadas
+
 # Modelos de base de datos (SQLAlchemy)
 class UsuarioDB(Base):
     __tablename__ = "usuarios"
@@ -44,7 +70,7 @@ class PracticaDB(Base):
     __tablename__ = "practicas"
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer)
-    id_sesion = Column(String)
+    id_sesion = Column(String, unique=True, index=True)  # Una práctica por sesión
     fecha = Column(DateTime, default=datetime.utcnow)
     transcripcion = Column(Text)
     metricas_json = Column(Text)  # JSON serializado
@@ -52,6 +78,26 @@ class PracticaDB(Base):
     url_archivo = Column(String)
     comentario = Column(Text)  # Comentario generado por IA
 
+class TrabajoAnalisisDB(Base):
+    __tablename__ = "trabajos_analisis"
+    id = Column(String, primary_key=True, index=True)  # Igual al idSesion
+    user_id = Column(Integer)
+    id_sesion = Column(String, index=True)
+    url_archivo = Column(String)
+    estado = Column(String, default="pendiente", index=True)  # "pendiente" | "procesando" | "listo" | "error"
+    resultado_json = Column(Text, nullable=True)  # JSON serializado
+    error = Column(Text, nullable=True)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    actualizado_en = Column(DateTime, default=datetime.utcnow)
+
+class SesionPracticaDB(Base):
+    __tablename__ = "sesiones_practica"
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=True)
+    estado = Column(String, default="grabando")  # "grabando" | "procesando" | "listo" | "error"
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    expira_en = Column(DateTime, index=True)
+
 class InsigniaDB(Base):
     __tablename__ = "insignias"
     id = Column(Integer, primary_key=True, index=True)
@@ -87,6 +133,12 @@ class TareaPlanDB(Base):
 # Crear tablas
 Base.metadata.create_all(bind=engine)
 
+# Store de sesiones de práctica, compartido entre workers de la API y de análisis
+session_store = create_session_store(
+    SESIONES_BACKEND, SessionLocal, SesionPracticaDB,
+    redis_url=SESIONES_REDIS_URL, ttl_seconds=SESIONES_TTL_SEGUNDOS
+)
+
 # Dependency para obtener sesión de BD
 def get_db():
     db = SessionLocal()
@@ -98,8 +150,27 @@ def get_db():
 # FastAPI app
 app = FastAPI(title="MVP Practica Oral API", version="2.0.0")
 
-# Inicializar procesador A/V
-av_processor = AVProcessor()
+# Procesador A/V por hilo de análisis (los grafos de MediaPipe no son thread-safe)
+_av_local = threading.local()
+
+def get_av_processor() -> AVProcessor:
+    if not hasattr(_av_local, "processor"):
+        _av_local.processor = AVProcessor(concurrency=ANALISIS_MAX_WORKERS)
+    return _av_local.processor
+
+# Pool de procesos de análisis (solo en modo "procesos")
+analysis_pool = None
+if ANALISIS_MODO == "procesos":
+    analysis_pool = AnalysisWorkerPool(
+        workers=ANALISIS_PROCESOS,
+        max_jobs_per_worker=ANALISIS_RECICLAR_CADA
+    )
+
+def analizar_video(url: str) -> Dict[str, Any]:
+    """Ejecuta el análisis A/V según el modo configurado"""
+    if analysis_pool is not None:
+        return analysis_pool.process_video(url)
+    return get_av_processor().process_video(url)
 
 # CORS
 app.add_middleware(
@@ -125,7 +196,7 @@ class Usuario(BaseModel):
 
 class SesionPractica(BaseModel):
     idSesion: str
-    estado: str  # "grabando" | "procesando" | "listo"
+    estado: str  # "grabando" | "procesando" | "listo" | "error"
 
 class Metricas(BaseModel):
     # Audio
@@ -149,6 +220,16 @@ class Metricas(BaseModel):
     # Calidad
     calidad_video: str  # "buena" | "aceptable" | "mala"
     calidad_audio: str  # "buena" | "aceptable" | "mala"
+    
+    # Línea de tiempo del habla: WPM por ventana, muletillas y pausas (segundos)
+    linea_tiempo: Optional[Dict] = None
+    
+    # Ritmo: palabras por minuto de voz (sin pausas) y pausas entre tramos de voz
+    tasa_articulacion: Optional[float] = None
+    pausas: Optional[Dict] = None
+    
+    # Expresividad vocal: variabilidad del tono y la energía de la voz
+    expresividad_vocal: Optional[Dict] = None
 
 class Practica(BaseModel):
     id: int
@@ -229,6 +310,19 @@ class FinalizarPracticaResponse(BaseModel):
     comentario: str
     metricas: Metricas
 
+class TrabajoPracticaResponse(BaseModel):
+    idTrabajo: str
+    idSesion: str
+    estado: str
+
+class EstadoPracticaResponse(BaseModel):
+    idSesion: str
+    estado: str  # "grabando" | "procesando" | "listo" | "error"
+    idPractica: Optional[int] = None
+    resumen: Optional[str] = None
+    comentario: Optional[str] = None
+    error: Optional[str] = None
+
 class AnalisisPracticaResponse(BaseModel):
     idPractica: int
     transcripcion: str
@@ -249,7 +343,6 @@ class HistorialResponse(BaseModel):
 # "Base de datos" en memoria para MVP con entidades tipadas (Deprecado - usar PostgreSQL)
 users_db: Dict[str, Usuario] = {}
 practices_db: Dict[int, Practica] = {}
-sessions_db: Dict[str, SesionPractica] = {}
 plans_db: Dict[int, Plan] = {}
 insignias_db: Dict[int, List[Insignia]] = {}  # por user_id
 rachas_db: Dict[int, Racha] = {}  # por user_id
@@ -439,136 +532,80 @@ async def yo(current_user: Usuario = Depends(get_current_user)):
 async def iniciar_practica(current_user: Usuario = Depends(get_current_user)) -> SesionPractica:
     session_id = str(uuid.uuid4())[:8]
     
-    sesion = SesionPractica(
+    session = session_store.create(session_id, user_id=current_user.id)
+    
+    return SesionPractica(
         idSesion=session_id,
-        estado="grabando"
+        estado=session["estado"]
     )
-    
-    sessions_db[session_id] = sesion
-    
-    return sesion
 
-@app.post("/practica/finalizar", response_model=FinalizarPracticaResponse)
+@app.post("/practica/finalizar", response_model=TrabajoPracticaResponse)
 async def finalizar_practica(
     data: PracticeFinalizar, 
-    current_user: Usuario = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Usuario = Depends(get_current_user)
 ):
-    session = sessions_db.get(data.idSesion)
+    """
+    Encola el análisis del video y retorna inmediatamente el id del trabajo.
+    El progreso se consulta en GET /practica/sesion/{idSesion}/estado
+    """
+    session = session_store.get(data.idSesion)
     if not session:
         raise HTTPException(status_code=404, detail="Sesión no encontrada")
     
-    # Actualizar estado de sesión
-    session.estado = "procesando"
+    # Actualizar estado de sesión: atómico, dos finalizaciones simultáneas no
+    # pueden encolar dos análisis
+    if not session_store.transition(data.idSesion, "procesando"):
+        raise HTTPException(status_code=409, detail="La sesión ya se está procesando")
     
     try:
-        # Procesar video con análisis real
-        analisis_resultado = av_processor.process_video(data.urlArchivo)
-        
-        if not analisis_resultado.get("procesamiento_exitoso"):
-            raise HTTPException(status_code=500, detail="Error al procesar el video")
-        
-        # Extraer métricas del análisis
-        video_data = analisis_resultado["video"]
-        audio_data = analisis_resultado["audio"]
-        
-        # Clasificar gestos de manos
-        manos_pct = video_data.get("porcentaje_manos_visibles", 0)
-        if manos_pct >= 50:
-            gestos = "frecuente"
-        elif manos_pct >= 20:
-            gestos = "moderado"
-        else:
-            gestos = "escaso"
-        
-        # Clasificar orientación de cabeza
-        mov_cabeza = video_data.get("movimiento_cabeza", 0)
-        orientacion = "estable" if mov_cabeza < 0.02 else "inestable"
-        
-        # Clasificar postura
-        # NOTA: Umbrales calibrados para videos móviles (verticales)
-        # Videos móviles tienen valores ~20-40x más altos que videos de escritorio
-        # debido a diferencias en encuadre y orientación de cámara
-        alineacion = video_data.get("alineacion_hombros_promedio", 0)
-        
-        # Detectar si es video móvil (valores altos de alineación)
-        if alineacion > 0.1:
-            # Umbrales para videos móviles (vertical)
-            if alineacion < 0.68:
-                postura = "buena"       # < 0.68: Postura recta y alineada
-            elif alineacion < 0.75:
-                postura = "regular"     # 0.68-0.75: Postura aceptable
-            else:
-                postura = "mala"        # >= 0.75: Postura desalineada
-        else:
-            # Umbrales para videos de escritorio (horizontal) - legacy
-            if alineacion < 0.015:
-                postura = "buena"
-            elif alineacion < 0.03:
-                postura = "regular"
-            else:
-                postura = "mala"
-        
-        # Clasificar calidad de video/audio (simplificado)
-        calidad_video = "buena" if video_data.get("frames_con_cara", 0) > 0 else "mala"
-        calidad_audio = "buena" if audio_data.get("palabras_totales", 0) > 0 else "mala"
-        
-        # Crear métricas optimizadas
-        metricas = Metricas(
-            transcripcion=audio_data.get("transcripcion", ""),
-            muletillas=audio_data.get("muletillas_total", 0),
-            velocidad=audio_data.get("velocidad_nivel", "normal"),
-            palabras_total=audio_data.get("palabras_totales", 0),
-            duracion_segundos=audio_data.get("duracion_segundos", 0),
-            contacto_visual_porcentaje=video_data.get("contacto_visual_porcentaje", 0),
-            contacto_visual_nivel=video_data.get("contacto_visual_nivel", "medio"),
-            expresividad_score=video_data.get("expresividad_score", 0.0),
-            expresividad_nivel=video_data.get("expresividad_nivel", "media"),
-            gestos_manos=gestos,
-            porcentaje_manos_visibles=manos_pct,
-            orientacion_cabeza=orientacion,
-            postura=postura,
-            alineacion_hombros=alineacion,
-            calidad_video=calidad_video,
-            calidad_audio=calidad_audio
-        )
-        
-        # Generar comentario de retroalimentación
-        comentario = generar_comentario_ia(metricas)
-        
-        # Crear práctica en base de datos
-        practica_db = PracticaDB(
-            user_id=current_user.id,
-            id_sesion=data.idSesion,
-            transcripcion=audio_data.get("transcripcion", ""),
-            metricas_json=json.dumps(metricas.model_dump()),
-            puntuacion=analisis_resultado.get("puntuacion", "amarillo"),
-            url_archivo=data.urlArchivo,
-            comentario=comentario
-        )
-        db.add(practica_db)
-        db.commit()
-        db.refresh(practica_db)
-        
-        # Actualizar insignias y racha
-        _actualizar_recompensas(current_user.id, practica_db.id, db)
-        
-        # Marcar sesión como lista
-        session.estado = "listo"
-        
-        return FinalizarPracticaResponse(
-            idPractica=practica_db.id,
-            estado="listo",
-            resumen=analisis_resultado.get("resumen", "Análisis completado"),
-            comentario=comentario,
-            metricas=metricas
-        )
-        
-    except HTTPException:
-        raise
+        job = job_queue.submit(data.idSesion, {
+            "user_id": current_user.id,
+            "id_sesion": data.idSesion,
+            "url_archivo": data.urlArchivo
+        })
     except Exception as e:
-        session.estado = "error"
-        raise HTTPException(status_code=500, detail=f"Error al procesar práctica: {str(e)}")
+        # Sin trabajo encolado la sesión quedaría "procesando" para siempre: se
+        # pasa a "error" para que se pueda volver a finalizar
+        session_store.transition(data.idSesion, "error")
+        raise HTTPException(status_code=503, detail=f"No se pudo encolar el análisis: {e}")
+    
+    return TrabajoPracticaResponse(
+        idTrabajo=job["id"],
+        idSesion=data.idSesion,
+        estado="procesando"
+    )
+
+@app.get("/practica/sesion/{idSesion}/estado", response_model=EstadoPracticaResponse)
+async def estado_practica(
+    idSesion: str,
+    current_user: Usuario = Depends(get_current_user)
+):
+    session = session_store.get(idSesion)
+    job = job_queue.get(idSesion)
+    
+    if not session and not job:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    
+    if job and job["payload"].get("user_id") not in (None, current_user.id):
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    
+    # El estado de la sesión manda; si expiró se usa el del trabajo. Un trabajo
+    # terminado también manda: con el store en memoria, un worker externo no
+    # puede actualizar la sesión
+    if job and job["estado"] in ("listo", "error"):
+        estado = job["estado"]
+    else:
+        estado = session["estado"] if session else job["estado"]
+    resultado = (job or {}).get("resultado") or {}
+    
+    return EstadoPracticaResponse(
+        idSesion=idSesion,
+        estado=estado,
+        idPractica=resultado.get("idPractica"),
+        resumen=resultado.get("resumen"),
+        comentario=resultado.get("comentario"),
+        error=(job or {}).get("error")
+    )
 
 @app.get("/practica/{id}/analisis", response_model=AnalisisPracticaResponse)
 async def analisis_practica(
@@ -640,6 +677,189 @@ async def detalle_practica(
         urlArchivo=practice.url_archivo
     )
 
+# Procesamiento de prácticas (ejecutado por la cola de análisis)
+
+def _procesar_practica(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Descarga y analiza el video, guarda la práctica y actualiza recompensas.
+    Se ejecuta en un hilo del pool de análisis, fuera del event loop.
+    """
+    user_id = payload["user_id"]
+    id_sesion = payload["id_sesion"]
+    url_archivo = payload["url_archivo"]
+    
+    # Idempotente por id_sesion: si el trabajo se vuelve a ejecutar (lease vencido,
+    # reinicio) no se duplica la práctica ni se otorgan dos veces las recompensas
+    existente = _practica_de_sesion(id_sesion)
+    if existente is not None:
+        return existente
+    
+    # Procesar video con análisis real
+    analisis_resultado = analizar_video(url_archivo)
+    
+    if not analisis_resultado.get("procesamiento_exitoso"):
+        raise RuntimeError(analisis_resultado.get("resumen", "Error al procesar el video"))
+    
+    # Extraer métricas del análisis
+    video_data = analisis_resultado["video"]
+    audio_data = analisis_resultado["audio"]
+    
+    # Clasificar gestos de manos
+    manos_pct = video_data.get("porcentaje_manos_visibles", 0)
+    if manos_pct >= 50:
+        gestos = "frecuente"
+    elif manos_pct >= 20:
+        gestos = "moderado"
+    else:
+        gestos = "escaso"
+    
+    # Clasificar orientación de cabeza
+    mov_cabeza = video_data.get("movimiento_cabeza", 0)
+    orientacion = "estable" if mov_cabeza < 0.02 else "inestable"
+    
+    # Clasificar postura
+    # NOTA: Umbrales calibrados para videos móviles (verticales)
+    # Videos móviles tienen valores ~20-40x más altos que videos de escritorio
+    # debido a diferencias en encuadre y orientación de cámara
+    alineacion = video_data.get("alineacion_hombros_promedio", 0)
+    
+    # Detectar si es video móvil (valores altos de alineación)
+    if alineacion > 0.1:
+        # Umbrales para videos móviles (vertical)
+        if alineacion < 0.68:
+            postura = "buena"       # < 0.68: Postura recta y alineada
+        elif alineacion < 0.75:
+            postura = "regular"     # 0.68-0.75: Postura aceptable
+        else:
+            postura = "mala"        # >= 0.75: Postura desalineada
+    else:
+        # Umbrales para videos de escritorio (horizontal) - legacy
+        if alineacion < 0.015:
+            postura = "buena"
+        elif alineacion < 0.03:
+            postura = "regular"
+        else:
+            postura = "mala"
+    
+    # Clasificar calidad de video/audio (simplificado)
+    calidad_video = "buena" if video_data.get("frames_con_cara", 0) > 0 else "mala"
+    calidad_audio = "buena" if audio_data.get("palabras_totales", 0) > 0 else "mala"
+    
+    # Crear métricas optimizadas
+    metricas = Metricas(
+        transcripcion=audio_data.get("transcripcion", ""),
+        muletillas=audio_data.get("muletillas_total", 0),
+        velocidad=audio_data.get("velocidad_nivel", "normal"),
+        palabras_total=audio_data.get("palabras_totales", 0),
+        duracion_segundos=audio_data.get("duracion_segundos", 0),
+        contacto_visual_porcentaje=video_data.get("contacto_visual_porcentaje", 0),
+        contacto_visual_nivel=video_data.get("contacto_visual_nivel", "medio"),
+        expresividad_score=video_data.get("expresividad_score", 0.0),
+        expresividad_nivel=video_data.get("expresividad_nivel", "media"),
+        gestos_manos=gestos,
+        porcentaje_manos_visibles=manos_pct,
+        orientacion_cabeza=orientacion,
+        postura=postura,
+        alineacion_hombros=alineacion,
+        calidad_video=calidad_video,
+        calidad_audio=calidad_audio,
+        linea_tiempo=audio_data.get("linea_tiempo") or None,
+        tasa_articulacion=audio_data.get("tasa_articulacion") or None,
+        pausas=audio_data.get("pausas") or None,
+        expresividad_vocal=audio_data.get("expresividad_vocal") or None
+    )
+    
+    # Generar comentario de retroalimentación
+    comentario = generar_comentario_ia(metricas)
+    
+    db = SessionLocal()
+    try:
+        # Crear práctica en base de datos
+        practica_db = PracticaDB(
+            user_id=user_id,
+            id_sesion=id_sesion,
+            transcripcion=audio_data.get("transcripcion", ""),
+            metricas_json=json.dumps(metricas.model_dump()),
+            puntuacion=analisis_resultado.get("puntuacion", "amarillo"),
+            url_archivo=url_archivo,
+            comentario=comentario
+        )
+        db.add(practica_db)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Otro worker guardó la misma sesión mientras se analizaba
+            db.rollback()
+            return _practica_de_sesion(id_sesion)
+        db.refresh(practica_db)
+        
+        # Actualizar insignias y racha
+        _actualizar_recompensas(user_id, practica_db.id, db)
+        
+        return {
+            "idPractica": practica_db.id,
+            "resumen": analisis_resultado.get("resumen", "Análisis completado"),
+            "comentario": comentario
+        }
+    finally:
+        db.close()
+
+def _practica_de_sesion(id_sesion: str) -> Optional[Dict[str, Any]]:
+    """Resultado de la práctica ya guardada para la sesión, o None"""
+    db = SessionLocal()
+    try:
+        practica = db.query(PracticaDB).filter(PracticaDB.id_sesion == id_sesion).first()
+        if practica is None:
+            return None
+        resumen = "Análisis completado"
+        job = _job_backend.get(id_sesion)
+        if job and job.get("resultado"):
+            resumen = job["resultado"].get("resumen", resumen)
+        return {
+            "idPractica": practica.id,
+            "resumen": resumen,
+            "comentario": practica.comentario
+        }
+    finally:
+        db.close()
+
+def _actualizar_estado_sesion(id_sesion: str, estado: str):
+    """Refleja el estado del trabajo en la sesión de práctica (si la transición es válida)"""
+    session_store.transition(id_sesion, estado)
+
+# Cola de análisis
+if ANALISIS_COLA_BACKEND == "local":
+    _job_backend = LocalJobBackend()
+else:
+    _job_backend = DatabaseJobBackend(SessionLocal, TrabajoAnalisisDB)
+
+job_queue = JobQueue(
+    _job_backend,
+    _procesar_practica,
+    # En modo "procesos" cada hilo de la cola solo espera a un worker del pool
+    max_workers=ANALISIS_PROCESOS if analysis_pool is not None else ANALISIS_MAX_WORKERS,
+    on_state_change=_actualizar_estado_sesion,
+    run_locally=ANALISIS_COLA_BACKEND != "externa",
+    heartbeat_seconds=ANALISIS_COLA_LATIDO_SEGUNDOS,
+    poll_seconds=ANALISIS_COLA_ESPERA_SEGUNDOS,
+    lease_seconds=ANALISIS_COLA_LEASE_SEGUNDOS
+)
+
+@app.on_event("startup")
+def _iniciar_cola_analisis():
+    # Con varios workers de uvicorn (WEB_CONCURRENCY) la cola y las sesiones deben
+    # ser compartidas: en memoria cada proceso vería solo las suyas
+    if int(os.getenv("WEB_CONCURRENCY", "1")) > 1 and (
+            ANALISIS_COLA_BACKEND == "local" or isinstance(session_store, MemorySessionStore)):
+        raise RuntimeError("Varios workers requieren ANALISIS_COLA_BACKEND=db|externa y SESIONES_BACKEND=db|redis")
+    job_queue.start()
+
+@app.on_event("shutdown")
+def _detener_cola_analisis():
+    job_queue.shutdown()
+    if analysis_pool is not None:
+        analysis_pool.shutdown(wait=False)
+
 # Funciones auxiliares para lógica de negocio
 
 def _actualizar_recompensas(user_id: int, practice_id: int, db: Session):
@@ -1391,9 +1611,10 @@ async def limpiar_base_datos(db: Session = Depends(get_db)):
         db.query(PracticaDB).delete()
         db.query(RachaDB).delete()
         db.query(UsuarioDB).delete()
+        db.query(TrabajoAnalisisDB).delete()
         
-        # Limpiar sesiones en memoria
-        sessions_db.clear()
+        # Limpiar sesiones de práctica
+        session_store.clear()
         
         db.commit()
         
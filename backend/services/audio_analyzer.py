@@ -2,12 +2,19 @@
 Análisis de audio usando SpeechRecognition (LIVIANO) para transcripción y detección de muletillas
 """
 import speech_recognition as sr
-from pydub import AudioSegment
-import re
-import os
-import tempfile
-from typing import Dict, List
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 import logging
+from . import config
+from .audio_chunks import group_segments, plan_chunks, slice_pcm
+from .fillers import FillerMatcher
+from .prosody import analyze_prosody
+from .speech_backends import Transcript, create_speech_backend
+from .speech_timeline import SpeechTimeline, Word, spread_words
+from .vad import VoiceActivity, detect_voice_from_config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,61 +24,96 @@ class AudioAnalyzer:
     def __init__(self):
         self.recognizer = sr.Recognizer()
         
-        # Patrones de muletillas en español
-        self.muletillas_patterns = [
-            r'\beh+\b',
-            r'\bum+\b',
-            r'\bemm+\b',
-            r'\bahh+\b',
-            r'\beste\b',
-            r'\bbueno\b',
-            r'\bo sea\b',
-            r'\bcomo que\b',
-            r'\bpues\b',
-            r'\bentonces\b',
-            r'\bverdad\b',
-            r'\bno\?\b',
-        ]
+        # Motor de reconocimiento (ANALISIS_ASR) y pool acotado para transcribir
+        # los fragmentos del audio en paralelo
+        self.speech = create_speech_backend(self.recognizer)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, config.ANALISIS_ASR_HILOS),
+                                            thread_name_prefix="asr")
+        
+        # Muletillas: patrones del idioma configurado compilados en una sola regex
+        self.fillers = FillerMatcher.from_config()
+        
+        # Permite abandonar la transcripción en curso (timeout de la rama de audio)
+        self._cancel_event = threading.Event()
+        
+        # ffmpeg corre fuera del hilo de la rama: el timeout de la rama no lo
+        # interrumpe, así que se acota con el mismo límite
+        self.decode_timeout = config.ANALISIS_TIMEOUT_AUDIO or None
+    
+    def cancel(self):
+        """Omite los fragmentos que falten de la transcripción en curso"""
+        self._cancel_event.set()
     
     def transcribe_audio(self, video_path: str) -> Dict:
         """
-        Transcribe el audio del video usando Google Speech Recognition (gratis, liviano)
+        Transcribe el audio del video: ffmpeg lo decodifica a PCM mono en memoria
+        (sin WAV temporal), ya a la frecuencia nativa del motor de reconocimiento
         Returns: dict con transcripción y métricas básicas
         """
-        audio_file = None
         try:
             logger.info(f"Iniciando transcripción de: {video_path}")
+            sample_rate = self.speech.sample_rate
+            pcm = self._decode_pcm(video_path, sample_rate)
+        except Exception as e:
+            logger.error(f"Error al extraer el audio: {str(e)}")
+            return {
+                "transcripcion": "",
+                "duracion_segundos": 0,
+                "idioma": "es"
+            }
+        return self.transcribe_pcm(pcm, sample_rate)
+    
+    def _decode_pcm(self, video_path: str, sample_rate: int) -> bytes:
+        """Audio del archivo como PCM s16le mono a sample_rate, leído por un pipe"""
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg no está en el PATH")
+        try:
+            process = subprocess.run(
+                [ffmpeg, "-nostdin", "-loglevel", "error", "-i", video_path,
+                 "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1"],
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False,
+                timeout=self.decode_timeout
+            )
+        except subprocess.TimeoutExpired:
+            # subprocess.run ya terminó el proceso: sin audio, métricas por defecto
+            raise RuntimeError(f"ffmpeg no terminó en {self.decode_timeout}s")
+        if process.returncode != 0:
+            raise RuntimeError(process.stderr.decode(errors="replace").strip() or "ffmpeg falló")
+        return process.stdout
+    
+    def transcribe_pcm(self, pcm: bytes, sample_rate: int) -> Dict:
+        """
+        Transcribe audio PCM s16le mono ya decodificado (p.ej. por el demuxer),
+        sin volver a abrir el contenedor ni escribir WAV temporal
+        Returns: dict con transcripción y métricas básicas
+        """
+        try:
+            duration_seconds = len(pcm) / (2 * sample_rate) if sample_rate else 0
+            logger.info(f"Iniciando transcripción de PCM ({duration_seconds:.1f}s)")
+            
+            # Remuestrear a la frecuencia del motor: menos bytes por petición
+            if sample_rate != self.speech.sample_rate:
+                pcm = sr.AudioData(pcm, sample_rate, 2).get_raw_data(convert_rate=self.speech.sample_rate)
+                sample_rate = self.speech.sample_rate
             
-            # Extraer audio del MP4 usando pydub
-            video = AudioSegment.from_file(video_path, format="mp4")
-            duration_seconds = len(video) / 1000.0  # pydub usa milisegundos
-            
-            # Convertir a WAV temporal (SpeechRecognition necesita WAV)
-            audio_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-            video.export(audio_file.name, format="wav")
-            
-            # Transcribir con Google Speech Recognition
-            with sr.AudioFile(audio_file.name) as source:
-                audio_data = self.recognizer.record(source)
-                try:
-                    # Usar Google API (gratis, sin key para uso básico)
-                    transcription = self.recognizer.recognize_google(
-                        audio_data, 
-                        language="es-ES"
-                    )
-                except sr.UnknownValueError:
-                    logger.warning("No se pudo entender el audio")
-                    transcription = ""
-                except sr.RequestError as e:
-                    logger.error(f"Error en el servicio de reconocimiento: {e}")
-                    transcription = ""
+            # Un evento por análisis: cancelar uno abandonado no afecta al siguiente
+            cancel = self._cancel_event = threading.Event()
+            
+            # VAD antes del reconocimiento: el motor solo recibe los tramos con voz
+            activity = detect_voice_from_config(pcm, sample_rate)
+            transcription, fragments = self._transcribe_chunks(pcm, sample_rate, activity, cancel)
+            prosody = self.analyze_prosody(pcm, sample_rate, activity)
             
             logger.info(f"Transcripción completada. Duración: {duration_seconds:.1f}s")
             
             return {
                 "transcripcion": transcription,
                 "duracion_segundos": duration_seconds,
-                "idioma": "es"
+                "idioma": "es",
+                "fragmentos": fragments,
+                "voz": activity,
+                "prosodia": prosody
             }
             
         except Exception as e:
@@ -81,42 +123,96 @@ class AudioAnalyzer:
                 "duracion_segundos": 0,
                 "idioma": "es"
             }
-        finally:
-            # Limpiar archivo temporal
-            if audio_file and os.path.exists(audio_file.name):
-                try:
-                    os.unlink(audio_file.name)
-                except:
-                    pass
+    
+    def _transcribe_chunks(self, pcm: bytes, sample_rate: int,
+                           activity: Optional[VoiceActivity] = None,
+                           cancel: Optional[threading.Event] = None) -> Tuple[str, List[Dict]]:
+        """
+        Corta el audio en los silencios y transcribe los fragmentos en paralelo
+        activity: tramos de voz del VAD; sin VAD, los silencios se buscan con pydub
+        cancel: si se activa, los fragmentos que falten no se envían al motor
+        Returns: (texto completo, fragmentos con inicio/fin en segundos y su texto)
+        """
+        if activity is not None:
+            chunks = group_segments(
+                activity.segments_ms(), int(activity.duration * 1000),
+                max_chunk_seconds=config.ANALISIS_ASR_FRAGMENTO_SEGUNDOS
+            )
+        else:
+            chunks = plan_chunks(
+                pcm, sample_rate,
+                min_silence_ms=config.ANALISIS_ASR_SILENCIO_MS,
+                silence_db=config.ANALISIS_ASR_SILENCIO_DB,
+                max_chunk_seconds=config.ANALISIS_ASR_FRAGMENTO_SEGUNDOS
+            )
+        if not chunks:
+            logger.warning("No se detectó voz en el audio")
+            return "", []
+        logger.info(f"Transcribiendo {len(chunks)} fragmentos con '{self.speech.name}'")
+        
+        def transcribe(chunk: Tuple[int, int]) -> Transcript:
+            if cancel is not None and cancel.is_set():
+                return Transcript("")
+            return self.speech.transcribe(slice_pcm(pcm, sample_rate, *chunk), sample_rate)
+        
+        # map conserva el orden: los textos se unen según su posición en el audio
+        fragments = []
+        for (start, end), transcript in zip(chunks, self._executor.map(transcribe, chunks)):
+            if not transcript.text:
+                continue
+            offset = start / 1000
+            if transcript.words:
+                # Tiempos del motor, relativos al fragmento
+                words = [Word(word.text, offset + word.start, offset + word.end) for word in transcript.words]
+            else:
+                words = spread_words(transcript.text, offset, end / 1000)
+            fragments.append({
+                "inicio": round(offset, 2),
+                "fin": round(end / 1000, 2),
+                "texto": transcript.text,
+                "palabras": words,
+                "tiempos_por_palabra": bool(transcript.words)
+            })
+        return " ".join(fragment["texto"] for fragment in fragments), fragments
+    
+    def analyze_prosody(self, pcm: bytes, sample_rate: int, activity: Optional[VoiceActivity] = None) -> Dict:
+        """
+        Expresividad vocal a partir del tono (F0) y la energía del PCM ya decodificado
+        Returns: dict con la prosodia; vacío si está deshabilitada o no hay voz suficiente
+        """
+        if not config.ANALISIS_PROSODIA:
+            return {}
+        try:
+            return analyze_prosody(pcm, sample_rate, activity)
+        except Exception as e:
+            logger.error(f"Error al analizar la prosodia: {str(e)}")
+            return {}
     
     def detect_muletillas(self, transcription: str) -> Dict:
         """
-        Detecta muletillas en la transcripción
-        Returns: dict con cantidad y lista de muletillas encontradas
+        Detecta muletillas en la transcripción con una sola pasada sobre el texto
+        Returns: dict con cantidad total y por patrón, lista y offsets de las muletillas
         """
         try:
-            transcription_lower = transcription.lower()
-            muletillas_found = []
-            muletillas_count = 0
-            
-            for pattern in self.muletillas_patterns:
-                matches = re.findall(pattern, transcription_lower, re.IGNORECASE)
-                muletillas_count += len(matches)
-                if matches:
-                    muletillas_found.extend(matches)
+            matches = self.fillers.scan(transcription.lower())
+            muletillas_count = len(matches)
             
             logger.info(f"Muletillas detectadas: {muletillas_count}")
             
             return {
                 "muletillas_total": muletillas_count,
-                "muletillas_lista": muletillas_found[:10]  # Primeras 10
+                "muletillas_lista": [match.text for match in matches[:10]],  # Primeras 10
+                "muletillas_por_tipo": self.fillers.count(matches),
+                "muletillas_offsets": [match.offset for match in matches]
             }
             
         except Exception as e:
             logger.error(f"Error al detectar muletillas: {str(e)}")
             return {
                 "muletillas_total": 0,
-                "muletillas_lista": []
+                "muletillas_lista": [],
+                "muletillas_por_tipo": {},
+                "muletillas_offsets": []
             }
     
     def calculate_speech_rate(self, transcription: str, duration_seconds: float) -> Dict:
@@ -163,26 +259,58 @@ class AudioAnalyzer:
         """
         Análisis completo de audio: transcripción + muletillas + velocidad
         """
+        return self._analyze_transcription(lambda: self.transcribe_audio(video_path))
+    
+    def analyze_pcm(self, pcm: bytes, sample_rate: int) -> Dict:
+        """
+        Igual que analyze_complete, partiendo de PCM s16le mono ya decodificado
+        """
+        return self._analyze_transcription(lambda: self.transcribe_pcm(pcm, sample_rate))
+    
+    def _analyze_transcription(self, transcribe) -> Dict:
         try:
             # 1. Transcribir
-            transcription_result = self.transcribe_audio(video_path)
+            transcription_result = transcribe()
             transcription = transcription_result["transcripcion"]
             duration = transcription_result["duracion_segundos"]
             
             if not transcription:
                 logger.warning("No se pudo obtener transcripción")
-                return self._default_audio_metrics()
+                # La prosodia no depende del texto: se conserva aunque falle el reconocimiento
+                metrics = self._default_audio_metrics()
+                metrics["expresividad_vocal"] = transcription_result.get("prosodia", {})
+                return metrics
+            
+            # Duración hablada: sin el silencio del inicio y el final (VAD)
+            activity: Optional[VoiceActivity] = transcription_result.get("voz")
+            speaking = activity.trimmed_seconds if activity is not None and activity.segments else duration
             
             # 2. Detectar muletillas
             muletillas_result = self.detect_muletillas(transcription)
             
             # 3. Calcular velocidad de habla
-            speech_rate_result = self.calculate_speech_rate(transcription, duration)
+            speech_rate_result = self.calculate_speech_rate(transcription, speaking)
             
             # Calcular muletillas por minuto
             muletillas_por_minuto = 0
-            if duration > 0:
-                muletillas_por_minuto = (muletillas_result["muletillas_total"] / duration) * 60
+            if speaking > 0:
+                muletillas_por_minuto = (muletillas_result["muletillas_total"] / speaking) * 60
+            
+            # Tasa de articulación (palabras por minuto de voz, sin pausas) y pausas
+            tasa_articulacion = 0.0
+            pausas = {}
+            if activity is not None and activity.speech_seconds > 0:
+                tasa_articulacion = speech_rate_result["palabras_totales"] / activity.speech_seconds * 60
+                pausas = activity.pause_metrics(config.ANALISIS_PAUSA_SEGUNDOS)
+            
+            # 4. Línea de tiempo: WPM por ventana, muletillas y pausas, fragmento a fragmento
+            timeline = SpeechTimeline(
+                self.fillers.find,
+                window_seconds=config.ANALISIS_LINEA_TIEMPO_SEGUNDOS,
+                pause_seconds=config.ANALISIS_PAUSA_SEGUNDOS
+            )
+            for fragment in transcription_result.get("fragmentos", []):
+                timeline.add_fragment(fragment["palabras"], fragment["tiempos_por_palabra"])
             
             return {
                 "transcripcion": transcription,
@@ -190,9 +318,15 @@ class AudioAnalyzer:
                 "muletillas_total": muletillas_result["muletillas_total"],
                 "muletillas_por_minuto": round(muletillas_por_minuto, 1),
                 "muletillas_ejemplos": muletillas_result["muletillas_lista"],
+                "muletillas_por_tipo": muletillas_result["muletillas_por_tipo"],
                 "palabras_por_minuto": speech_rate_result["wpm"],
                 "velocidad_nivel": speech_rate_result["velocidad"],
-                "palabras_totales": speech_rate_result["palabras_totales"]
+                "palabras_totales": speech_rate_result["palabras_totales"],
+                "duracion_habla_segundos": round(speaking, 1),
+                "tasa_articulacion": round(tasa_articulacion, 1),
+                "pausas": pausas,
+                "expresividad_vocal": transcription_result.get("prosodia", {}),
+                "linea_tiempo": timeline.to_dict(duration)
             }
             
         except Exception as e:
@@ -207,7 +341,13 @@ class AudioAnalyzer:
             "muletillas_total": 0,
             "muletillas_por_minuto": 0,
             "muletillas_ejemplos": [],
+            "muletillas_por_tipo": {},
             "palabras_por_minuto": 0,
             "velocidad_nivel": "desconocida",
-            "palabras_totales": 0
+            "palabras_totales": 0,
+            "duracion_habla_segundos": 0,
+            "tasa_articulacion": 0,
+            "pausas": {},
+            "expresividad_vocal": {},
+            "linea_tiempo": {}
         }
@@ -0,0 +1,61 @@
+"""
+División del audio en fragmentos para el reconocimiento: se corta en los
+silencios y se agrupan los tramos de voz hasta una duración máxima, de modo que
+cada fragmento se pueda transcribir por separado (y en paralelo)
+"""
+from typing import List, Tuple
+import logging
+
+from pydub import AudioSegment
+from pydub.silence import detect_nonsilent
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def plan_chunks(pcm: bytes, sample_rate: int, min_silence_ms: int = 500, silence_db: float = -16,
+                max_chunk_seconds: float = 30, padding_ms: int = 200) -> List[Tuple[int, int]]:
+    """
+    pcm: audio s16le mono
+    min_silence_ms: silencio mínimo para cortar
+    silence_db: umbral de silencio relativo al volumen medio del audio (dBFS)
+    max_chunk_seconds: duración máxima de un fragmento
+    padding_ms: margen que se conserva alrededor de cada tramo de voz
+    Returns: fragmentos (inicio_ms, fin_ms) en orden
+    """
+    audio = AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=1)
+    if len(audio) == 0 or audio.dBFS == float("-inf"):
+        return []
+    
+    voiced = detect_nonsilent(audio, min_silence_len=min_silence_ms,
+                              silence_thresh=audio.dBFS + silence_db, seek_step=10)
+    return group_segments(voiced, len(audio), max_chunk_seconds, padding_ms)
+
+
+def group_segments(voiced: List[Tuple[int, int]], total_ms: int, max_chunk_seconds: float = 30,
+                   padding_ms: int = 200) -> List[Tuple[int, int]]:
+    """
+    Agrupa tramos de voz (inicio_ms, fin_ms), p.ej. los del VAD, en fragmentos
+    de hasta max_chunk_seconds con padding_ms de margen alrededor de cada tramo
+    """
+    max_ms = int(max_chunk_seconds * 1000)
+    chunks: List[Tuple[int, int]] = []
+    for start, end in voiced:
+        start, end = max(0, start - padding_ms), min(total_ms, end + padding_ms)
+        # Agregar al fragmento anterior mientras no supere la duración máxima
+        if chunks and end - chunks[-1][0] <= max_ms:
+            chunks[-1] = (chunks[-1][0], end)
+            continue
+        # Voz continua más larga que el máximo: cortar sin esperar un silencio
+        while end - start > max_ms:
+            chunks.append((start, start + max_ms))
+            start += max_ms
+        chunks.append((start, end))
+    return chunks
+
+
+def slice_pcm(pcm: bytes, sample_rate: int, start_ms: int, end_ms: int) -> bytes:
+    """Bytes del tramo [start_ms, end_ms) de un PCM s16le mono"""
+    start = int(start_ms * sample_rate / 1000) * 2
+    end = int(end_ms * sample_rate / 1000) * 2
+    return pcm[start:end]
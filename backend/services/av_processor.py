@@ -1,22 +1,74 @@
 """
 Procesador unificado de audio y video para análisis completo de prácticas orales
 """
+import hashlib
 import os
 import tempfile
-import requests
-from typing import Dict
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Optional, Tuple
 import logging
 from .video_analyzer import VideoAnalyzer
+from .video_segments import SegmentPool
 from .audio_analyzer import AudioAnalyzer
+from .demuxer import MediaDemuxer, DemuxedMedia, demux_available
+from .stream_download import StreamingDownload, mp4_rotation, peek_container
+from .result_cache import ResultCache, analyzer_version
+from .downloader import VideoDownloader, get_downloader
+from . import config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Espera máxima a que la rama de video cierre sus métricas tras cancelarla
+_VIDEO_CANCEL_GRACE_SECONDS = 15.0
+
 
 class AVProcessor:
-    def __init__(self):
-        self.video_analyzer = VideoAnalyzer()
+    def __init__(self, paralelo: Optional[bool] = None,
+                 timeout_video: Optional[float] = None,
+                 timeout_audio: Optional[float] = None,
+                 demux: Optional[bool] = None,
+                 streaming: Optional[bool] = None,
+                 cache: Optional[ResultCache] = None,
+                 downloader: Optional[VideoDownloader] = None,
+                 concurrency: int = 1):
+        # Videos largos por archivo: tramos en paralelo en procesos. concurrency:
+        # AVProcessor simultáneos en el servidor, que se reparten los núcleos
+        segments = SegmentPool.from_config(concurrency) if config.ANALISIS_SEGMENTOS else None
+        self.video_analyzer = VideoAnalyzer(segments=segments)
         self.audio_analyzer = AudioAnalyzer()
+        
+        # Ramas de audio y video en paralelo (no comparten estado)
+        self.paralelo = config.ANALISIS_PARALELO if paralelo is None else paralelo
+        self.timeout_video = config.ANALISIS_TIMEOUT_VIDEO if timeout_video is None else timeout_video
+        self.timeout_audio = config.ANALISIS_TIMEOUT_AUDIO if timeout_audio is None else timeout_audio
+        
+        # Demultiplexar el contenedor una sola vez para ambas ramas (requiere PyAV)
+        self.demux = (config.ANALISIS_DEMUX if demux is None else demux) and demux_available()
+        self.demuxer = MediaDemuxer(sample_rate=16000, max_dim=config.ANALISIS_MAX_DIM) if self.demux else None
+        
+        # Decodificar mientras se descarga (solo con demux y contenedores streamable)
+        # Los segmentos necesitan buscar en el archivo completo: sin streaming
+        self.streaming = (config.ANALISIS_STREAMING if streaming is None else streaming) and self.demux \
+            and segments is None
+        
+        # Sesión HTTP compartida por el proceso (keep-alive, reintentos, rangos)
+        self.downloader = downloader or get_downloader()
+        
+        # Caché de resultados por hash del contenido descargado
+        self.cache = cache
+        if self.cache is None and config.ANALISIS_CACHE:
+            self.cache = ResultCache(
+                config.ANALISIS_CACHE_DIR,
+                max_bytes=int(config.ANALISIS_CACHE_MAX_MB * 1024 * 1024),
+                version=analyzer_version(extra=config.settings_fingerprint())
+            )
+        
+        # Acota cada petición al reconocedor de Google; la rama completa la acota
+        # _run_branches con timeout_audio
+        if self.timeout_audio:
+            self.audio_analyzer.recognizer.operation_timeout = self.timeout_audio
     
     def download_video(self, url: str) -> str:
         """
@@ -24,28 +76,36 @@ class AVProcessor:
         Returns: ruta del archivo temporal
         """
         try:
-            logger.info(f"Descargando video desde: {url}")
-            
-            # Crear archivo temporal
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4')
-            temp_path = temp_file.name
-            
-            # Descargar video
-            response = requests.get(url, stream=True, timeout=60)
-            response.raise_for_status()
-            
-            # Guardar en archivo temporal
-            with open(temp_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            logger.info(f"Video descargado exitosamente: {temp_path}")
+            temp_path, _ = self._download(url)
             return temp_path
             
         except Exception as e:
             logger.error(f"Error al descargar video: {str(e)}")
             raise
     
+    def _save_to_temp(self, chunks, prefix: bytes = b"") -> Tuple[str, str]:
+        """
+        Escribe el prefijo ya leído y el resto de los chunks a un archivo temporal
+        Returns: (ruta, hash SHA-256 del contenido)
+        """
+        sha256 = hashlib.sha256(prefix)
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as f:
+            f.write(prefix)
+            for chunk in chunks:
+                f.write(chunk)
+                sha256.update(chunk)
+            return f.name, sha256.hexdigest()
+    
+    def _download(self, url: str, info: Optional[Dict] = None) -> Tuple[str, str]:
+        """
+        Descarga a archivo temporal (por rangos en paralelo si el servidor lo permite)
+        Returns: (ruta, hash del contenido)
+        """
+        logger.info(f"Descargando video desde: {url}")
+        temp_path, content_hash = self.downloader.download(url, info)
+        logger.info(f"Video descargado exitosamente: {temp_path}")
+        return temp_path, content_hash
+    
     def process_video(self, video_url: str) -> Dict:
         """
         Procesa un video completo: descarga + análisis de audio y video
@@ -54,16 +114,47 @@ class AVProcessor:
         temp_video_path = None
         
         try:
-            # 1. Descargar video
-            temp_video_path = self.download_video(video_url)
+            inicio = time.perf_counter()
+            analisis = None
+            content_hash = None
+            info = None
+            validator = None
             
-            # 2. Análisis de video COMPLETO (contacto visual, expresividad, confianza)
-            logger.info("Iniciando análisis de video...")
-            video_metrics = self.video_analyzer.analyze_video_complete(temp_video_path)
+            # 0. Caché por URL: solo si el servidor confirma que el archivo no cambió.
+            # El mismo HEAD sirve después para decidir la descarga por rangos
+            if self.cache is not None:
+                info = self.downloader.head(video_url)
+                validator = info["validator"]
+                cached = self.cache.get_by_url(video_url, validator)
+                if cached is not None:
+                    return self._from_cache(cached, "url", inicio)
             
-            # 3. Análisis de audio (transcripción, muletillas, velocidad)
-            logger.info("Iniciando análisis de audio...")
-            audio_metrics = self.audio_analyzer.analyze_complete(temp_video_path)
+            # 1-3. En streaming, el análisis arranca mientras se descarga el resto.
+            # Si el contenedor no es streamable queda descargado en temp_video_path
+            if self.streaming:
+                analisis, temp_video_path, content_hash = self._analyze_streaming(video_url)
+            
+            if analisis is None:
+                # 1. Descargar video
+                if temp_video_path is None:
+                    temp_video_path, content_hash = self._download(video_url, info)
+                tiempo_descarga = time.perf_counter() - inicio
+                
+                # Caché por contenido: el mismo video reenviado no se vuelve a analizar
+                if self.cache is not None:
+                    cached = self.cache.get(content_hash)
+                    if cached is not None:
+                        self.cache.remember_url(video_url, validator, content_hash)
+                        return self._from_cache(cached, "contenido", inicio)
+                
+                # 2. Análisis de video (contacto visual, expresividad, confianza) y
+                # 3. Análisis de audio (transcripción, muletillas, velocidad)
+                analisis = self._analyze_file(temp_video_path)
+                analisis[2]["descarga_segundos"] = round(tiempo_descarga, 2)
+                analisis[2]["streaming"] = False
+            
+            video_metrics, audio_metrics, tiempos = analisis
+            tiempos["total_segundos"] = round(time.perf_counter() - inicio, 2)
             
             # 4. Calcular puntuación general
             puntuacion = self._calculate_score(video_metrics, audio_metrics)
@@ -76,10 +167,15 @@ class AVProcessor:
                 "audio": audio_metrics,
                 "puntuacion": puntuacion,
                 "resumen": resumen,
+                "tiempos": tiempos,
                 "procesamiento_exitoso": True
             }
             
-            logger.info("Procesamiento completado exitosamente")
+            if self.cache is not None and content_hash and self._is_cacheable(result):
+                self.cache.put(content_hash, result)
+                self.cache.remember_url(video_url, validator, content_hash)
+            
+            logger.info(f"Procesamiento completado exitosamente: {tiempos}")
             return result
             
         except Exception as e:
@@ -101,6 +197,217 @@ class AVProcessor:
                 except Exception as e:
                     logger.warning(f"No se pudo eliminar archivo temporal: {e}")
     
+    def _analyze_file(self, video_path: str) -> Tuple[Dict, Dict, Dict]:
+        """
+        Analiza el archivo descargado. Con demux, el contenedor se abre una sola vez:
+        los frames van al análisis visual y el PCM al de audio. Con segmentos, el
+        video se analiza por tramos desde el archivo y el demuxer solo entrega el PCM.
+        Returns: (video_metrics, audio_metrics, tiempos)
+        """
+        segmented = self.video_analyzer.segments is not None
+        media = None
+        if self.demuxer is not None:
+            try:
+                media = self.demuxer.open(video_path, video=not segmented)
+            except Exception as e:
+                logger.warning(f"No se pudo demultiplexar, se usa lectura por archivo: {e}")
+        
+        if media is not None and segmented:
+            try:
+                video_metrics, audio_metrics, tiempos = self._run_branches(
+                    lambda: self.video_analyzer.analyze_video_complete(video_path),
+                    lambda: self._analyze_media_audio(media)
+                )
+            finally:
+                media.close()
+            tiempos["demux"] = "audio"
+            return video_metrics, audio_metrics, tiempos
+        
+        if media is None:
+            video_metrics, audio_metrics, tiempos = self._run_branches(
+                lambda: self.video_analyzer.analyze_video_complete(video_path),
+                lambda: self.audio_analyzer.analyze_complete(video_path)
+            )
+            tiempos["demux"] = False
+            return video_metrics, audio_metrics, tiempos
+        
+        try:
+            return self._analyze_media(media)
+        finally:
+            media.close()
+    
+    def _analyze_media(self, media: DemuxedMedia) -> Tuple[Dict, Dict, Dict]:
+        video_metrics, audio_metrics, tiempos = self._run_branches(
+            lambda: self.video_analyzer.analyze_frames(media.frames(), media.fps, media.frame_count),
+            lambda: self._analyze_media_audio(media)
+        )
+        tiempos["demux"] = True
+        return video_metrics, audio_metrics, tiempos
+    
+    def _analyze_media_audio(self, media: DemuxedMedia) -> Dict:
+        # El PCM queda listo al terminar de leer el contenedor, no al terminar el video
+        try:
+            pcm, sample_rate = media.wait_pcm(self.timeout_audio or None)
+        except TimeoutError as e:
+            logger.warning(str(e))
+            return self.audio_analyzer._default_audio_metrics()
+        return self.audio_analyzer.analyze_pcm(pcm, sample_rate)
+    
+    def _analyze_streaming(self, url: str) -> Tuple[Optional[Tuple[Dict, Dict, Dict]], Optional[str], Optional[str]]:
+        """
+        Descarga y decodifica a la vez: los bytes pasan de requests al demuxer por un
+        pipe, y los frames llegan a VideoAnalyzer mientras la cola sigue descargándose.
+        Returns: (resultado de _analyze_media, None, hash) en streaming, o
+                 (None, ruta temporal, hash) si el contenedor no es streamable o no
+                 se pudo decodificar (la descarga sigue a archivo, sin repetirla)
+        """
+        logger.info(f"Descargando video en streaming desde: {url}")
+        inicio = time.perf_counter()
+        response = self.downloader.open_stream(url)
+        
+        try:
+            chunks = self.downloader.iter_content(response)
+            prefix, streamable = peek_container(chunks)
+            
+            if not streamable:
+                # p.ej. MP4 con 'moov' al final: hace falta el archivo completo
+                logger.info("Contenedor no streamable, se descarga a archivo temporal")
+                return (None,) + self._save_to_temp(chunks, prefix)
+            
+            descarga = StreamingDownload(prefix, chunks, spool=True).start()
+            try:
+                try:
+                    # Sin ruta para consultar la matriz de rotación: se lee de la 'moov' del prefijo
+                    media = self.demuxer.open(descarga.reader, rotation=mp4_rotation(prefix))
+                except Exception as e:
+                    # Los bytes ya enviados al pipe siguen en memoria: el resto de la
+                    # descarga continúa a archivo temporal, sin volver a pedir el video
+                    logger.warning(f"No se pudo decodificar en streaming ({e}), se continúa a archivo")
+                    temp_path = descarga.to_file()
+                    descarga.wait()
+                    if descarga.error or not descarga.complete:
+                        os.unlink(temp_path)
+                        raise RuntimeError(f"Descarga incompleta: {descarga.error}")
+                    return None, temp_path, descarga.sha256.hexdigest()
+                descarga.stop_spooling()
+                
+                try:
+                    video_metrics, audio_metrics, tiempos = self._analyze_media(media)
+                finally:
+                    media.close()
+                    # Si el demuxer dejó de leer, el escritor no debe quedar bloqueado en el pipe
+                    descarga.reader.close()
+                    descarga.wait()
+                
+                if descarga.error or media.error:
+                    raise RuntimeError(f"Descarga incompleta: {descarga.error or media.error}")
+                
+                tiempos["descarga_segundos"] = round(descarga.seconds, 2)
+                tiempos["streaming"] = True
+                logger.info(f"Video analizado en streaming ({descarga.bytes_total} bytes, "
+                            f"{time.perf_counter() - inicio:.1f}s)")
+                content_hash = descarga.sha256.hexdigest() if descarga.complete else None
+                return (video_metrics, audio_metrics, tiempos), None, content_hash
+            finally:
+                descarga.close()
+        finally:
+            response.close()
+    
+    def _run_branches(self, video_branch: Callable[[], Dict],
+                      audio_branch: Callable[[], Dict]) -> Tuple[Dict, Dict, Dict]:
+        """
+        Ejecuta las ramas de video y audio.
+        En modo paralelo el tiempo total es aproximadamente el de la rama más lenta.
+        Returns: (video_metrics, audio_metrics, tiempos)
+        """
+        if not self.paralelo:
+            logger.info("Iniciando análisis de video...")
+            video_metrics, t_video = self._timed(video_branch)
+            logger.info("Iniciando análisis de audio...")
+            audio_metrics, t_audio = self._timed(audio_branch)
+            return video_metrics, audio_metrics, {
+                "video_segundos": round(t_video, 2),
+                "audio_segundos": round(t_audio, 2),
+                "modo": "secuencial",
+                "ramas_expiradas": []
+            }
+        
+        logger.info("Iniciando análisis de video y audio en paralelo...")
+        inicio = time.perf_counter()
+        # Un executor por llamada: una rama abandonada sigue en su hilo sin ocupar
+        # el lugar de las ramas del próximo video (el AVProcessor se reutiliza)
+        executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="av")
+        try:
+            futuro_video = executor.submit(self._timed, video_branch)
+            futuro_audio = executor.submit(self._timed, audio_branch)
+            
+            expiradas = []
+            
+            # Los timeouts se cuentan desde el arranque conjunto de ambas ramas
+            try:
+                video_metrics, t_video = futuro_video.result(timeout=self._remaining(inicio, self.timeout_video))
+            except FutureTimeoutError:
+                logger.warning(f"Rama de video superó {self.timeout_video}s, usando frames analizados hasta ahora")
+                expiradas.append("video")
+                self.video_analyzer.cancel()
+                try:
+                    video_metrics, t_video = futuro_video.result(timeout=_VIDEO_CANCEL_GRACE_SECONDS)
+                except FutureTimeoutError:
+                    # p.ej. decodificador bloqueado: la rama ya no llega a revisar la cancelación
+                    logger.error("La rama de video no respondió a la cancelación, se usan métricas por defecto")
+                    video_metrics = self.video_analyzer._default_metrics()
+                    t_video = time.perf_counter() - inicio
+            
+            try:
+                audio_metrics, t_audio = futuro_audio.result(timeout=self._remaining(inicio, self.timeout_audio))
+            except FutureTimeoutError:
+                logger.warning(f"Rama de audio superó {self.timeout_audio}s, se usan métricas por defecto")
+                expiradas.append("audio")
+                # Sin esperar a la rama: los fragmentos que falten no se transcriben y
+                # los que están en curso terminan en segundo plano (resultado descartado)
+                self.audio_analyzer.cancel()
+                audio_metrics = self.audio_analyzer._default_audio_metrics()
+                t_audio = time.perf_counter() - inicio
+        finally:
+            executor.shutdown(wait=False)
+        
+        return video_metrics, audio_metrics, {
+            "video_segundos": round(t_video, 2),
+            "audio_segundos": round(t_audio, 2),
+            "modo": "paralelo",
+            "ramas_expiradas": expiradas
+        }
+    
+    def _from_cache(self, cached: Dict, origen: str, inicio: float) -> Dict:
+        logger.info(f"Resultado recuperado de la caché ({origen})")
+        result = dict(cached)
+        result["tiempos"] = {
+            "cache": origen,
+            "total_segundos": round(time.perf_counter() - inicio, 3)
+        }
+        return result
+    
+    def _is_cacheable(self, result: Dict) -> bool:
+        """No se guardan resultados parciales (timeouts, audio sin transcribir, sin cara)"""
+        return (
+            result.get("procesamiento_exitoso")
+            and not result["tiempos"].get("ramas_expiradas")
+            and result["audio"].get("duracion_segundos", 0) > 0
+            and result["video"].get("frames_con_cara", 0) > 0
+        )
+    
+    @staticmethod
+    def _timed(fn: Callable[[], Dict]) -> Tuple[Dict, float]:
+        inicio = time.perf_counter()
+        resultado = fn()
+        return resultado, time.perf_counter() - inicio
+    
+    @staticmethod
+    def _remaining(inicio: float, timeout: float) -> Optional[float]:
+        if not timeout:
+            return None
+        return max(0.0, timeout - (time.perf_counter() - inicio))
+    
     def _calculate_score(self, video_metrics: Dict, audio_metrics: Dict) -> str:
         """
         Calcula puntuación general basada en métricas
@@ -183,6 +490,11 @@ class AVProcessor:
         velocidad = audio_metrics.get("velocidad_nivel", "desconocida")
         parts.append(f"Velocidad {velocidad} ({wpm:.0f} palabras/min)")
         
+        # Expresividad vocal (tono y energía)
+        voz = audio_metrics.get("expresividad_vocal") or {}
+        if voz:
+            parts.append(f"Expresividad vocal {voz['nivel']} ({voz['score']:.0f}/100)")
+        
         # Duración
         duration = audio_metrics.get("duracion_segundos", 0)
         parts.append(f"Duración: {duration:.0f}s")
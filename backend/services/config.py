@@ -0,0 +1,116 @@
+"""
+Configuración del análisis de audio/video (leída de variables de entorno)
+"""
+import os
+import tempfile
+
+# Ejecutar las ramas de audio y video en paralelo dentro de process_video
+ANALISIS_PARALELO = os.getenv("ANALISIS_PARALELO", "1") == "1"
+
+# Timeout por rama en segundos (0 = sin límite)
+ANALISIS_TIMEOUT_VIDEO = float(os.getenv("ANALISIS_TIMEOUT_VIDEO", "900"))
+ANALISIS_TIMEOUT_AUDIO = float(os.getenv("ANALISIS_TIMEOUT_AUDIO", "300"))
+
+# Demultiplexar el MP4 una sola vez (PyAV) y compartir frames y PCM entre análisis
+ANALISIS_DEMUX = os.getenv("ANALISIS_DEMUX", "1") == "1"
+
+# Analizar mientras se descarga (MP4 faststart/fragmentado, WebM); si no, archivo temporal
+ANALISIS_STREAMING = os.getenv("ANALISIS_STREAMING", "1") == "1"
+
+# Caché de resultados por hash del video (LRU en disco local)
+ANALISIS_CACHE = os.getenv("ANALISIS_CACHE", "1") == "1"
+ANALISIS_CACHE_DIR = os.getenv("ANALISIS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "analisis_cache"))
+ANALISIS_CACHE_MAX_MB = float(os.getenv("ANALISIS_CACHE_MAX_MB", "200"))
+
+# Descarga: sesión HTTP compartida, rangos paralelos y reanudación
+ANALISIS_DESCARGA_CHUNK_KB = int(os.getenv("ANALISIS_DESCARGA_CHUNK_KB", "256"))
+ANALISIS_DESCARGA_PARTES = int(os.getenv("ANALISIS_DESCARGA_PARTES", "4"))
+ANALISIS_DESCARGA_PARALELA_MB = float(os.getenv("ANALISIS_DESCARGA_PARALELA_MB", "16"))
+ANALISIS_DESCARGA_MAX_MB = float(os.getenv("ANALISIS_DESCARGA_MAX_MB", "500"))  # 0 = sin límite
+ANALISIS_DESCARGA_REINTENTOS = int(os.getenv("ANALISIS_DESCARGA_REINTENTOS", "3"))
+
+
+# Inferencia de MediaPipe: "solutions" (un frame por llamada) o "tasks"
+# (FaceLandmarker/HandLandmarker/PoseLandmarker en modo VIDEO, por lotes)
+ANALISIS_MEDIAPIPE = os.getenv("ANALISIS_MEDIAPIPE", "solutions")
+ANALISIS_LOTE_FRAMES = int(os.getenv("ANALISIS_LOTE_FRAMES", "8"))
+_MODELOS_DIR = os.getenv("ANALISIS_MODELOS_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "models"))
+ANALISIS_MODELO_CARA = os.getenv("ANALISIS_MODELO_CARA", os.path.join(_MODELOS_DIR, "face_landmarker.task"))
+ANALISIS_MODELO_MANOS = os.getenv("ANALISIS_MODELO_MANOS", os.path.join(_MODELOS_DIR, "hand_landmarker.task"))
+ANALISIS_MODELO_POSE = os.getenv("ANALISIS_MODELO_POSE", os.path.join(_MODELOS_DIR, "pose_landmarker_lite.task"))
+
+# Muestreo adaptativo de frames: tasa objetivo, presupuesto por video (0 = sin
+# límite) y muestreo denso tras parpadeos o movimientos bruscos de cabeza
+ANALISIS_MUESTREO_FPS = float(os.getenv("ANALISIS_MUESTREO_FPS", "15"))
+ANALISIS_MUESTREO_MAX_FRAMES = int(os.getenv("ANALISIS_MUESTREO_MAX_FRAMES", "3000"))
+ANALISIS_MUESTREO_DENSO_FPS = float(os.getenv("ANALISIS_MUESTREO_DENSO_FPS", "30"))
+ANALISIS_MUESTREO_DENSO_SEGUNDOS = float(os.getenv("ANALISIS_MUESTREO_DENSO_SEGUNDOS", "1.0"))
+
+# Preprocesamiento: lado mayor máximo del frame (0 = sin reducir) y recorte de
+# la ROI de cara/torso para FaceMesh y Hands
+ANALISIS_MAX_DIM = int(os.getenv("ANALISIS_MAX_DIM", "960"))
+ANALISIS_ROI = os.getenv("ANALISIS_ROI", "1") == "1"
+
+# Decodificación del flujo por archivo: opencv | hilo (OpenCV en un hilo productor)
+# | pyav | ffmpeg. Si el backend elegido no está disponible se usa OpenCV
+ANALISIS_DECODER = os.getenv("ANALISIS_DECODER", "hilo")
+ANALISIS_DECODER_HILOS = int(os.getenv("ANALISIS_DECODER_HILOS", "0"))  # 0 = automático
+ANALISIS_DECODER_HWACCEL = os.getenv("ANALISIS_DECODER_HWACCEL", "")  # ej. auto, cuda, vaapi (solo ffmpeg)
+
+# Agregación de rasgos: "streaming" (Welford + t-digest, memoria constante) o
+# "exacto" (guarda todos los valores; para calibrar umbrales)
+ANALISIS_ESTADISTICAS = os.getenv("ANALISIS_ESTADISTICAS", "streaming")
+
+# Videos largos por archivo: analizar tramos en paralelo en procesos y combinar
+# sus estados parciales. Los tramos duran al menos ANALISIS_SEGMENTOS_SEGUNDOS.
+# Requiere el archivo completo, así que desactiva el análisis en streaming; con
+# ANALISIS_DEMUX el demuxer solo extrae el audio y el video se lee por tramos
+ANALISIS_SEGMENTOS = os.getenv("ANALISIS_SEGMENTOS", "0") == "1"
+ANALISIS_SEGMENTOS_PROCESOS = int(os.getenv("ANALISIS_SEGMENTOS_PROCESOS", "0"))  # 0 = núcleos / análisis simultáneos
+ANALISIS_SEGMENTOS_SEGUNDOS = float(os.getenv("ANALISIS_SEGMENTOS_SEGUNDOS", "60"))
+
+# Cascada: re-inferir Hands y Pose solo si la miniatura del frame cambió más que
+# el umbral (diferencia media 0-255), reutilizando como máximo N frames seguidos
+ANALISIS_CASCADA = os.getenv("ANALISIS_CASCADA", "0") == "1"
+ANALISIS_CASCADA_UMBRAL = float(os.getenv("ANALISIS_CASCADA_UMBRAL", "2.0"))
+ANALISIS_CASCADA_MAX_REUSO = int(os.getenv("ANALISIS_CASCADA_MAX_REUSO", "5"))
+
+# Reconocimiento de voz: motor ("google", "http" con ANALISIS_ASR_URL o "vosk"
+# offline), idioma, fragmentos cortados en silencios y transcritos en paralelo
+ANALISIS_ASR = os.getenv("ANALISIS_ASR", "google")
+ANALISIS_ASR_URL = os.getenv("ANALISIS_ASR_URL", "")
+ANALISIS_ASR_MODELO_VOSK = os.getenv("ANALISIS_ASR_MODELO_VOSK", os.path.join(_MODELOS_DIR, "vosk-model-small-es-0.42"))
+ANALISIS_ASR_IDIOMA = os.getenv("ANALISIS_ASR_IDIOMA", "es-ES")
+ANALISIS_ASR_HILOS = int(os.getenv("ANALISIS_ASR_HILOS", "4"))
+ANALISIS_ASR_FRAGMENTO_SEGUNDOS = float(os.getenv("ANALISIS_ASR_FRAGMENTO_SEGUNDOS", "30"))
+ANALISIS_ASR_SILENCIO_MS = int(os.getenv("ANALISIS_ASR_SILENCIO_MS", "500"))
+ANALISIS_ASR_SILENCIO_DB = float(os.getenv("ANALISIS_ASR_SILENCIO_DB", "-16"))  # relativo al volumen medio
+
+# Línea de tiempo del habla: ancho de las ventanas de WPM y pausa mínima entre palabras
+ANALISIS_LINEA_TIEMPO_SEGUNDOS = float(os.getenv("ANALISIS_LINEA_TIEMPO_SEGUNDOS", "10"))
+ANALISIS_PAUSA_SEGUNDOS = float(os.getenv("ANALISIS_PAUSA_SEGUNDOS", "0.5"))
+
+# Muletillas: idioma de los patrones (muletillas/<idioma>.json) y carpeta
+# alternativa con los JSON (vacío = los incluidos en services/muletillas)
+ANALISIS_MULETILLAS_IDIOMA = os.getenv("ANALISIS_MULETILLAS_IDIOMA", "es")
+ANALISIS_MULETILLAS_DIR = os.getenv("ANALISIS_MULETILLAS_DIR", "")
+
+# VAD (energía + cruces por cero) antes del reconocimiento: 0 = cortar con pydub.
+# Margen sobre el ruido de fondo y silencio mínimo que separa dos tramos de voz
+ANALISIS_VAD = int(os.getenv("ANALISIS_VAD", "1"))
+ANALISIS_VAD_MARGEN_DB = float(os.getenv("ANALISIS_VAD_MARGEN_DB", "12"))
+ANALISIS_VAD_SILENCIO_MS = int(os.getenv("ANALISIS_VAD_SILENCIO_MS", "200"))
+
+# Prosodia (tono y energía de la voz) para la expresividad vocal: 0 = no calcular
+ANALISIS_PROSODIA = int(os.getenv("ANALISIS_PROSODIA", "1"))
+
+# Prefijos de opciones que no cambian el resultado del análisis
+_NO_AFECTAN_RESULTADO = ("ANALISIS_CACHE", "ANALISIS_DESCARGA")
+
+
+def settings_fingerprint():
+    """Valores de configuración que forman parte de la versión de la caché"""
+    return sorted(
+        (name, value) for name, value in globals().items()
+        if name.startswith("ANALISIS_") and not name.startswith(_NO_AFECTAN_RESULTADO)
+    )
@@ -0,0 +1,244 @@
+"""
+Demultiplexación en una sola pasada: abre el contenedor una vez (PyAV) y reparte
+frames de video decodificados al análisis visual y PCM mono 16 kHz al de audio
+"""
+import queue
+import threading
+from typing import Iterator, Optional, Tuple
+import logging
+
+from .frame_source import rotate_frame, target_size, video_rotation
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+except ImportError:  # PyAV es opcional: sin él se usa el flujo por archivo
+    av = None
+
+_FIN = object()
+
+
+def demux_available() -> bool:
+    return av is not None
+
+
+class DemuxedMedia:
+    """
+    Medio abierto por MediaDemuxer. Un hilo lee el contenedor y decodifica el audio;
+    los paquetes de video (comprimidos) pasan a un segundo hilo que los decodifica:
+    - los frames de video (BGR) se consumen con frames()
+    - el audio se acumula como PCM s16le mono y se obtiene con wait_pcm()
+    Así el PCM está listo al terminar de leer el contenedor, sin esperar a que el
+    análisis visual consuma los frames. buffer_bytes acota los paquetes en espera.
+    Con video=False solo se demultiplexa el audio (el video se analiza aparte).
+    """
+    def __init__(self, container, sample_rate: int, queue_size: int, max_dim: int = 0,
+                 buffer_bytes: int = 256 * 1024 * 1024, rotation: int = 0, video: bool = True):
+        self.container = container
+        self.sample_rate = sample_rate
+        self.buffer_bytes = buffer_bytes
+        
+        self.video_stream = container.streams.video[0] if video and container.streams.video else None
+        self.audio_stream = container.streams.audio[0] if container.streams.audio else None
+        
+        if self.video_stream is not None:
+            self.video_stream.thread_type = "AUTO"  # Decodificación multi-hilo del códec
+            rate = self.video_stream.average_rate or self.video_stream.guessed_rate
+            self.fps = float(rate) if rate else 30.0
+            self.width = self.video_stream.codec_context.width
+            self.height = self.video_stream.codec_context.height
+            self.frame_count = self.video_stream.frames or None  # 0 si el contenedor no lo indica
+            # Escalado en el decodificador (swscale, junto con la conversión a BGR)
+            self._size = target_size(self.width, self.height, max_dim)
+            # Los frames se entregan girados a su orientación de visualización
+            self.rotation = rotation
+            if rotation in (90, 270):
+                self.width, self.height = self.height, self.width
+        else:
+            self.fps, self.width, self.height = 30.0, 0, 0
+            self._size = (0, 0)
+            self.rotation = 0
+            self.frame_count = None
+        
+        self._frames: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._packets: "queue.Queue" = queue.Queue()
+        self._buffered = 0
+        self._space = threading.Condition()
+        self._pcm_chunks = []
+        self._pcm_ready = threading.Event()
+        self._video_wanted = self.video_stream is not None
+        self._closed = False
+        self.error: Optional[str] = None
+        
+        self._video_thread = None
+        if self.video_stream is not None:
+            self._video_thread = threading.Thread(target=self._decode_video, name="demux-video", daemon=True)
+            self._video_thread.start()
+        self._thread = threading.Thread(target=self._run, name="demux", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        try:
+            resampler = None
+            if self.audio_stream is not None:
+                resampler = av.AudioResampler(format="s16", layout="mono", rate=self.sample_rate)
+            
+            streams = [s for s in (self.video_stream, self.audio_stream) if s is not None]
+            for packet in self.container.demux(*streams):
+                if self._closed:
+                    break
+                
+                if self.video_stream is not None and packet.stream.index == self.video_stream.index:
+                    # Si el análisis visual ya terminó, no decodificar más video
+                    if self._video_wanted:
+                        self._buffer_packet(packet)
+                elif self.audio_stream is not None and packet.stream.index == self.audio_stream.index:
+                    for frame in packet.decode():
+                        for resampled in resampler.resample(frame):
+                            self._pcm_chunks.append(resampled.to_ndarray().tobytes())
+            
+            # Vaciar el resampler
+            if resampler is not None:
+                for resampled in resampler.resample(None):
+                    self._pcm_chunks.append(resampled.to_ndarray().tobytes())
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error al demultiplexar: {self.error}")
+        finally:
+            self._pcm_ready.set()
+            if self._video_thread is not None:
+                # El hilo de video cierra el contenedor al terminar sus paquetes
+                self._packets.put(_FIN)
+            else:
+                self._close_container()
+    
+    def _buffer_packet(self, packet):
+        # Si el video se atrasa más de buffer_bytes comprimidos, esperar (acota memoria)
+        with self._space:
+            while self._buffered > self.buffer_bytes and self._video_wanted and not self._closed:
+                self._space.wait(0.5)
+            self._buffered += packet.size
+        self._packets.put(packet)
+    
+    def _decode_video(self):
+        try:
+            width, height = self._size
+            while True:
+                packet = self._packets.get()
+                if packet is _FIN:
+                    break
+                with self._space:
+                    self._buffered -= packet.size
+                    self._space.notify()
+                if not self._video_wanted:
+                    continue
+                for frame in packet.decode():
+                    self._put_frame(rotate_frame(frame.to_ndarray(format="bgr24", width=width, height=height),
+                                                 self.rotation))
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error al decodificar video: {self.error}")
+        finally:
+            self._put_frame(_FIN)
+            # Si falló, el hilo de lectura no debe quedar esperando espacio
+            self._video_wanted = False
+            with self._space:
+                self._space.notify_all()
+            self._drain_packets()
+            self._thread.join()
+            self._drain_packets()
+            self._close_container()
+    
+    def _close_container(self):
+        try:
+            self.container.close()
+        except Exception:
+            pass
+    
+    def _put_frame(self, item):
+        # Cola acotada: el decodificador no se adelanta más de queue_size frames
+        while self._video_wanted and not self._closed:
+            try:
+                self._frames.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+    
+    def frames(self) -> Iterator:
+        """Frames BGR decodificados, en orden"""
+        try:
+            while self._video_wanted:
+                item = self._frames.get()
+                if item is _FIN:
+                    break
+                yield item
+        finally:
+            # El consumidor terminó (o se canceló): el hilo sigue solo con audio
+            self._video_wanted = False
+            self._drain()
+    
+    def wait_pcm(self, timeout: Optional[float] = None) -> Tuple[bytes, int]:
+        """
+        Espera a que se lea todo el contenedor y retorna (pcm, sample_rate).
+        Lanza TimeoutError si el audio no está listo en timeout segundos
+        """
+        if not self._pcm_ready.wait(timeout):
+            raise TimeoutError(f"El audio no se demultiplexó en {timeout}s")
+        return b"".join(self._pcm_chunks), self.sample_rate
+    
+    def close(self):
+        self._closed = True
+        self._video_wanted = False
+        with self._space:
+            self._space.notify_all()
+        self._drain()
+        self._thread.join(timeout=5)
+        if self._video_thread is not None:
+            self._video_thread.join(timeout=5)
+    
+    def _drain_packets(self):
+        try:
+            while True:
+                self._packets.get_nowait()
+        except queue.Empty:
+            pass
+    
+    def _drain(self):
+        try:
+            while True:
+                self._frames.get_nowait()
+        except queue.Empty:
+            pass
+
+
+class MediaDemuxer:
+    """
+    Abre un contenedor una sola vez para ambos análisis.
+    
+    sample_rate: frecuencia del PCM entregado al análisis de audio
+    queue_size: frames decodificados en espera como máximo (acota memoria)
+    max_dim: escalar los frames en el decodificador a este lado mayor (0 = sin escalar)
+    """
+    def __init__(self, sample_rate: int = 16000, queue_size: int = 32, max_dim: int = 0):
+        self.sample_rate = sample_rate
+        self.queue_size = queue_size
+        self.max_dim = max_dim
+    
+    def open(self, source, rotation: int = 0, video: bool = True) -> DemuxedMedia:
+        """
+        source: ruta del archivo o file-like object.
+        rotation: rotación de visualización ya conocida; si no, se lee del contenedor
+        (la matriz solo se puede consultar con una ruta)
+        video: False para entregar solo el PCM (p.ej. video analizado por segmentos)
+        Lanza excepción si PyAV no está disponible o el contenedor no se puede abrir.
+        """
+        if av is None:
+            raise RuntimeError("PyAV no está instalado")
+        container = av.open(source)
+        if video and not rotation and container.streams.video:
+            path = source if isinstance(source, str) else None
+            rotation = video_rotation(container.streams.video[0], path)
+        return DemuxedMedia(container, self.sample_rate, self.queue_size, self.max_dim,
+                            rotation=rotation, video=video)
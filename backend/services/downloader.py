@@ -0,0 +1,239 @@
+"""
+Descarga de videos desde el almacenamiento: sesión HTTP compartida con keep-alive,
+reintentos, descarga paralela por rangos (HTTP Range) y reanudación
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Errores de red que justifican reanudar desde el último byte recibido
+_RETRYABLE = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+)
+
+
+class IncompleteDownload(IOError):
+    pass
+
+
+class VideoDownloader:
+    """
+    chunk_size: bytes por lectura del cuerpo HTTP
+    parallel_min_bytes: desde este tamaño se descarga en rangos paralelos
+    parts: cantidad de rangos paralelos
+    max_bytes: tamaño máximo aceptado (0 = sin límite)
+    retries: reintentos por rango/descarga antes de fallar
+    pool_size: conexiones keep-alive por host
+    """
+    def __init__(self, chunk_size: int = 256 * 1024, parallel_min_bytes: int = 16 * 1024 * 1024,
+                 parts: int = 4, max_bytes: int = 0, retries: int = 3,
+                 pool_size: int = 8, timeout: float = 60):
+        self.chunk_size = chunk_size
+        self.parallel_min_bytes = parallel_min_bytes
+        self.parts = max(1, parts)
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.timeout = timeout
+        
+        # Sesión compartida: reutiliza conexiones TCP/TLS hacia el bucket
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["HEAD", "GET"]
+            )
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.parts, thread_name_prefix="descarga")
+    
+    def head(self, url: str) -> Dict:
+        """
+        Metadatos del objeto remoto.
+        Returns: dict con size (o None), ranges (bool) y validator (ETag/Last-Modified o None)
+        """
+        info = {"size": None, "ranges": False, "validator": None}
+        try:
+            response = self.session.head(url, timeout=10, allow_redirects=True)
+            if not response.ok:
+                return info
+            length = response.headers.get("Content-Length")
+            info["size"] = int(length) if length and length.isdigit() else None
+            info["ranges"] = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                info["validator"] = f"{etag}|{last_modified}|{length}"
+        except Exception as e:
+            logger.warning(f"No se pudo consultar metadatos del video: {e}")
+        return info
+    
+    def open_stream(self, url: str) -> requests.Response:
+        """GET en streaming con la sesión compartida (el llamador debe cerrarlo)"""
+        response = self.session.get(url, stream=True, timeout=self.timeout)
+        response.raise_for_status()
+        self._check_size(int(response.headers.get("Content-Length") or 0))
+        return response
+    
+    def iter_content(self, response: requests.Response) -> Iterator[bytes]:
+        """Cuerpo de la respuesta en chunks, cortando si supera el tamaño máximo"""
+        total = 0
+        for chunk in response.iter_content(chunk_size=self.chunk_size):
+            total += len(chunk)
+            self._check_size(total)
+            yield chunk
+    
+    def download(self, url: str, info: Optional[Dict] = None) -> Tuple[str, str]:
+        """
+        Descarga a un archivo temporal.
+        Returns: (ruta, hash SHA-256 del contenido)
+        """
+        info = info or self.head(url)
+        size = info.get("size")
+        if size:
+            self._check_size(size)
+        
+        fd, temp_path = tempfile.mkstemp(suffix=".mp4")
+        os.close(fd)
+        try:
+            if size and info.get("ranges") and self.parts > 1 and size >= self.parallel_min_bytes:
+                try:
+                    self._download_ranges(url, temp_path, size)
+                    return temp_path, self._hash_file(temp_path)
+                except IncompleteDownload as e:
+                    logger.warning(f"Descarga por rangos falló ({e}), se reintenta secuencial")
+            return temp_path, self._download_sequential(url, temp_path, size)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+    
+    def _download_sequential(self, url: str, path: str, size: Optional[int]) -> str:
+        """Descarga secuencial que se reanuda con Range desde el último byte escrito"""
+        sha256 = hashlib.sha256()
+        written = 0
+        attempts = 0
+        with open(path, "wb") as f:
+            while True:
+                headers = {"Range": f"bytes={written}-"} if written else {}
+                try:
+                    with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                        response.raise_for_status()
+                        if written and response.status_code != 206:
+                            # El servidor ignoró el rango: empezar de nuevo
+                            f.seek(0)
+                            f.truncate()
+                            sha256 = hashlib.sha256()
+                            written = 0
+                        for chunk in response.iter_content(chunk_size=self.chunk_size):
+                            f.write(chunk)
+                            sha256.update(chunk)
+                            written += len(chunk)
+                            self._check_size(written)
+                    if size is None or written >= size:
+                        return sha256.hexdigest()
+                    raise IncompleteDownload(f"{written}/{size} bytes")
+                except (_RETRYABLE + (IncompleteDownload,)) as e:
+                    attempts += 1
+                    if attempts > self.retries:
+                        raise
+                    logger.warning(f"Descarga interrumpida en {written} bytes ({e}), reanudando...")
+                    time.sleep(0.5 * attempts)
+    
+    def _download_ranges(self, url: str, path: str, size: int) -> None:
+        """Descarga rangos en paralelo escribiendo cada uno en su offset del archivo"""
+        with open(path, "wb") as f:
+            f.truncate(size)
+        
+        part_size = -(-size // self.parts)
+        ranges = [(start, min(start + part_size, size) - 1) for start in range(0, size, part_size)]
+        logger.info(f"Descargando {size} bytes en {len(ranges)} rangos paralelos")
+        
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            futures = [self._executor.submit(self._download_range, url, fd, start, end)
+                       for start, end in ranges]
+            errors: List[str] = []
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors.append(str(e))
+            if errors:
+                raise IncompleteDownload("; ".join(errors))
+        finally:
+            os.close(fd)
+    
+    def _download_range(self, url: str, fd: int, start: int, end: int) -> None:
+        """Un rango; ante cortes se reanuda desde el último byte escrito del rango"""
+        offset = start
+        attempts = 0
+        while offset <= end:
+            try:
+                headers = {"Range": f"bytes={offset}-{end}"}
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise IncompleteDownload("el servidor no respeta HTTP Range")
+                    for chunk in response.iter_content(chunk_size=self.chunk_size):
+                        chunk = chunk[:end - offset + 1]
+                        os.pwrite(fd, chunk, offset)
+                        offset += len(chunk)
+                if offset <= end:
+                    raise IncompleteDownload(f"rango {start}-{end} cortado en {offset}")
+            except _RETRYABLE + (IncompleteDownload,) as e:
+                if isinstance(e, IncompleteDownload) and "HTTP Range" in str(e):
+                    raise
+                attempts += 1
+                if attempts > self.retries:
+                    raise IncompleteDownload(str(e))
+                time.sleep(0.5 * attempts)
+    
+    def _hash_file(self, path: str) -> str:
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(block)
+        return sha256.hexdigest()
+    
+    def _check_size(self, size: int) -> None:
+        if self.max_bytes and size > self.max_bytes:
+            raise ValueError(f"El video supera el tamaño máximo permitido "
+                             f"({self.max_bytes / 1024 / 1024:.0f} MB)")
+
+
+# Descargador compartido por proceso (una sola sesión y pool de conexiones)
+_shared_downloader: Optional[VideoDownloader] = None
+_shared_lock = threading.Lock()
+
+
+def get_downloader() -> VideoDownloader:
+    global _shared_downloader
+    with _shared_lock:
+        if _shared_downloader is None:
+            from . import config
+            _shared_downloader = VideoDownloader(
+                chunk_size=config.ANALISIS_DESCARGA_CHUNK_KB * 1024,
+                parallel_min_bytes=int(config.ANALISIS_DESCARGA_PARALELA_MB * 1024 * 1024),
+                parts=config.ANALISIS_DESCARGA_PARTES,
+                max_bytes=int(config.ANALISIS_DESCARGA_MAX_MB * 1024 * 1024),
+                retries=config.ANALISIS_DESCARGA_REINTENTOS
+            )
+        return _shared_downloader
@@ -0,0 +1,70 @@
+"""
+Detección de muletillas en una sola pasada: todos los patrones se compilan en
+una alternancia con un grupo con nombre por patrón. Los patrones de cada idioma
+viven en muletillas/<idioma>.json y se cambian sin tocar código
+"""
+import json
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "muletillas")
+
+
+class FillerMatch(NamedTuple):
+    offset: int  # Carácter donde empieza en el texto analizado
+    text: str
+    name: str  # Patrón que la detectó
+
+
+class FillerMatcher:
+    """
+    patterns: {nombre: regex}; el nombre debe ser un identificador válido
+    (es el nombre del grupo). En caso de empate gana el primero declarado
+    """
+    def __init__(self, patterns: Dict[str, str], locale: str = "es"):
+        self.locale = locale
+        self.names = list(patterns)
+        self._regex = re.compile(
+            "|".join(f"(?P<{name}>{pattern})" for name, pattern in patterns.items()),
+            re.IGNORECASE
+        ) if patterns else None
+    
+    def scan(self, text: str) -> List[FillerMatch]:
+        """Muletillas del texto en orden de aparición"""
+        if self._regex is None:
+            return []
+        return [FillerMatch(match.start(), match.group(0), match.lastgroup) for match in self._regex.finditer(text)]
+    
+    def count(self, matches: List[FillerMatch]) -> Dict[str, int]:
+        """Cantidad por patrón (incluye los patrones sin apariciones)"""
+        counts = dict.fromkeys(self.names, 0)
+        for match in matches:
+            counts[match.name] += 1
+        return counts
+    
+    def find(self, text: str) -> List[Tuple[int, str]]:
+        """(offset, muletilla) para la línea de tiempo"""
+        return [(match.offset, match.text) for match in self.scan(text)]
+    
+    @classmethod
+    def from_locale(cls, locale: str, directory: Optional[str] = None) -> "FillerMatcher":
+        path = os.path.join(directory or _DEFAULT_DIR, f"{locale}.json")
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["patrones"], locale=data.get("idioma", locale))
+    
+    @classmethod
+    def from_config(cls) -> "FillerMatcher":
+        """Patrones de ANALISIS_MULETILLAS_IDIOMA; si no se pueden cargar, los de español"""
+        from . import config
+        try:
+            return cls.from_locale(config.ANALISIS_MULETILLAS_IDIOMA, config.ANALISIS_MULETILLAS_DIR or None)
+        except Exception as e:
+            logger.warning(f"No se pudieron cargar las muletillas '{config.ANALISIS_MULETILLAS_IDIOMA}' ({e}), "
+                           f"se usan las de español")
+            return cls.from_locale("es")
@@ -0,0 +1,125 @@
+"""
+Preprocesamiento de frames antes de la inferencia: reducción a una dimensión
+máxima y recorte de una ROI (cara + torso) seguida con los landmarks del frame
+anterior. FaceMesh y Hands reciben el recorte; Pose, el frame reducido completo.
+"""
+from typing import Dict, NamedTuple, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Landmarks de Pose usados para la ROI: hombros, codos y muñecas
+_POSE_UPPER_BODY = [11, 12, 13, 14, 15, 16]
+
+
+class PreparedFrame(NamedTuple):
+    rgb: np.ndarray  # Frame completo (reducido) en RGB
+    crop: Optional[np.ndarray]  # ROI en RGB, o None si no hay ROI seguida
+    roi: Optional[Tuple[float, float, float, float]]  # (x0, y0, x1, y1) normalizados
+
+
+def remap(points: np.ndarray, roi: Tuple[float, float, float, float]) -> np.ndarray:
+    """Landmarks (N, 3) normalizados del recorte -> normalizados del frame completo"""
+    x0, y0, x1, y1 = roi
+    sx, sy = x1 - x0, y1 - y0
+    # z de MediaPipe está en la escala de x: se ajusta con el ancho del recorte
+    return points * np.array([sx, sy, sx], dtype=np.float32) + np.array([x0, y0, 0], dtype=np.float32)
+
+
+class FramePreprocessor:
+    """
+    max_dim: lado mayor máximo del frame (0 = no reducir)
+    roi: recortar la región de cara y torso para FaceMesh/Hands
+    margin: margen alrededor de los landmarks, relativo al tamaño de la caja
+    min_size: tamaño mínimo de la ROI (fracción del frame)
+    smoothing: suavizado exponencial de la ROI entre frames (0 = sin suavizar)
+    lost_after: frames sin landmarks antes de volver al frame completo
+    """
+    def __init__(self, max_dim: int = 960, roi: bool = True, margin: float = 0.25,
+                 min_size: float = 0.3, smoothing: float = 0.5, lost_after: int = 5):
+        self.max_dim = max_dim
+        self.roi_enabled = roi
+        self.margin = margin
+        self.min_size = min_size
+        self.smoothing = smoothing
+        self.lost_after = lost_after
+        self.reset()
+    
+    def reset(self) -> None:
+        """Llamado al comenzar cada video"""
+        self._roi: Optional[np.ndarray] = None
+        self._misses = 0
+        self.scale = 1.0
+        self.frames = 0
+        self.frames_with_roi = 0
+        self._roi_area = 0.0
+    
+    def prepare(self, bgr: np.ndarray) -> PreparedFrame:
+        h, w = bgr.shape[:2]
+        if self.max_dim and max(h, w) > self.max_dim:
+            # Reducir antes de convertir: cvtColor trabaja sobre menos píxeles
+            self.scale = self.max_dim / max(h, w)
+            bgr = cv2.resize(bgr, (round(w * self.scale), round(h * self.scale)),
+                             interpolation=cv2.INTER_AREA)
+        rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        self.frames += 1
+        
+        if self._roi is None:
+            return PreparedFrame(rgb, None, None)
+        
+        h, w = rgb.shape[:2]
+        x0, y0, x1, y1 = self._roi
+        px0, py0 = int(x0 * w), int(y0 * h)
+        px1, py1 = max(px0 + 1, int(round(x1 * w))), max(py0 + 1, int(round(y1 * h)))
+        crop = np.ascontiguousarray(rgb[py0:py1, px0:px1])
+        self.frames_with_roi += 1
+        self._roi_area += (x1 - x0) * (y1 - y0)
+        # ROI real en píxeles enteros, para que el remapeo sea exacto
+        roi = (px0 / w, py0 / h, px1 / w, py1 / h)
+        return PreparedFrame(rgb, crop, roi)
+    
+    def update(self, result) -> None:
+        """Actualiza la ROI con los landmarks (ya en coordenadas del frame completo)"""
+        if not self.roi_enabled:
+            return
+        
+        if result.face is None:
+            # Sin cara no hay ROI confiable: tras varios frames, volver al frame completo
+            self._misses += 1
+            if self._misses >= self.lost_after:
+                self._roi = None
+            return
+        self._misses = 0
+        
+        parts = [result.face[:, :2]] + [hand[:, :2] for hand in result.hands]
+        if result.pose is not None:
+            parts.append(result.pose[_POSE_UPPER_BODY, :2])
+        points = np.concatenate(parts)
+        x0, y0 = points.min(axis=0)
+        x1, y1 = points.max(axis=0)
+        mx = max((x1 - x0) * self.margin, (self.min_size - (x1 - x0)) / 2, 0)
+        my = max((y1 - y0) * self.margin, (self.min_size - (y1 - y0)) / 2, 0)
+        box = np.clip([x0 - mx, y0 - my, x1 + mx, y1 + my], 0.0, 1.0)
+        
+        if self._roi is None or not self.smoothing:
+            self._roi = box
+        else:
+            # Suavizar sin dejar nunca fuera la caja actual
+            smoothed = self.smoothing * self._roi + (1 - self.smoothing) * box
+            self._roi = np.concatenate([np.minimum(smoothed[:2], box[:2]), np.maximum(smoothed[2:], box[2:])])
+    
+    def stats(self) -> Dict:
+        return {
+            "escala": round(self.scale, 3),
+            "frames_con_roi": self.frames_with_roi,
+            "area_roi_promedio": round(self._roi_area / self.frames_with_roi, 3) if self.frames_with_roi else 1.0
+        }
+    
+    @classmethod
+    def from_config(cls) -> "FramePreprocessor":
+        from . import config
+        return cls(max_dim=config.ANALISIS_MAX_DIM, roi=config.ANALISIS_ROI)
@@ -0,0 +1,159 @@
+"""
+Muestreo adaptativo de frames para el análisis visual: tasa efectiva objetivo,
+presupuesto de frames por video y muestreo denso alrededor de eventos
+(parpadeos, movimientos bruscos de cabeza)
+"""
+import math
+from typing import Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fracción del presupuesto de frames reservada para el muestreo denso
+_DENSE_RESERVE = 0.2
+
+# Presupuesto extra (fracción de max_frames) cada vez que se agota antes del
+# final del video: el paso se duplica, así que cada tramo cubre el doble de video
+_EXTRA_BUDGET = 0.5
+
+
+class FrameSampler:
+    """
+    Decide qué frames se analizan.
+    
+    fps: cuadros por segundo del video original
+    total_frames: frames del video si se conocen (para repartir el presupuesto)
+    target_fps: frames analizados por segundo de video fuera de los eventos
+    max_frames: presupuesto de frames analizados por video (0 = sin límite)
+    dense_fps: tasa de muestreo durante la ventana de un evento
+    dense_seconds: duración de la ventana densa tras cada evento
+    start_frame: frames anteriores al tramo (los índices son absolutos)
+    
+    El muestreo nunca se detiene antes del final: si el presupuesto no alcanza,
+    se amplía el paso (menos frames por segundo) y se reporta muestreo_reducido.
+    Los frames densos se limitan a la fracción reservada de los muestreados.
+    """
+    def __init__(self, fps: float, total_frames: Optional[int] = None,
+                 target_fps: float = 15, max_frames: int = 0,
+                 dense_fps: float = 30, dense_seconds: float = 1.0,
+                 start_frame: int = 0):
+        self.fps = fps or 30
+        self.total_frames = total_frames or None
+        self.target_fps = target_fps
+        self.max_frames = max_frames
+        self.end_frame = start_frame + self.total_frames if self.total_frames else None
+        
+        self.step = max(1, round(self.fps / target_fps)) if target_fps > 0 else 1
+        if max_frames and self.total_frames:
+            # El presupuesto manda: repartirlo en todo el video, reservando
+            # una parte para las ventanas densas
+            self.step = max(self.step, math.ceil(self.total_frames / (max_frames * (1 - _DENSE_RESERVE))))
+        self.dense_step = min(self.step, max(1, round(self.fps / dense_fps))) if dense_fps > 0 else self.step
+        self.dense_frames = int(dense_seconds * self.fps)
+        self.base_step = self.step
+        
+        self._dense_until = -1
+        self._next = self.step
+        self._limit = max_frames
+        self.sampled = 0
+        self.sampled_dense = 0
+        self.events = 0
+        self.decimated = False
+        self.dense_capped = False
+    
+    def should_sample(self, index: int) -> bool:
+        """index: número de frame (desde 1) en el video original"""
+        if index < self._next:
+            return False
+        
+        dense = index <= self._dense_until
+        if self.max_frames:
+            if dense and not self._dense_allowed():
+                dense = False
+                self.dense_capped = True
+            self._fit_budget(index)
+        self._next = index + (self.dense_step if dense else self.step)
+        self.sampled += 1
+        if dense:
+            self.sampled_dense += 1
+        return True
+    
+    def _dense_allowed(self) -> bool:
+        """Frames densos hasta la fracción reservada de los muestreados (más una ventana)"""
+        regular = self.sampled - self.sampled_dense
+        window = self.dense_frames // self.dense_step + 1
+        return self.sampled_dense < regular * _DENSE_RESERVE / (1 - _DENSE_RESERVE) + window
+    
+    def _fit_budget(self, index: int) -> None:
+        """Amplía el paso para que el presupuesto restante llegue hasta el final del video"""
+        if self.sampled < self._limit:
+            if self.end_frame is None:
+                return
+            remaining = (self._limit - self.sampled) * (1 - _DENSE_RESERVE)
+            step = math.ceil((self.end_frame - index) / max(1.0, remaining))
+            if step <= self.step:
+                return
+        else:
+            # Agotado antes del final (total desconocido o mal estimado): seguir
+            # con la mitad de frames por segundo y un tramo extra de presupuesto
+            step = self.step * 2
+            self._limit += max(1, int(self.max_frames * _EXTRA_BUDGET))
+        if not self.decimated:
+            logger.warning(f"Presupuesto de {self.max_frames} frames insuficiente en el frame {index}: "
+                           f"se reduce el muestreo")
+        self.step = step
+        self.decimated = True
+    
+    def mark_event(self, index: int) -> None:
+        """Un evento en el frame index activa el muestreo denso durante la ventana"""
+        self.events += 1
+        self._dense_until = max(self._dense_until, index + self.dense_frames)
+        self._next = min(self._next, index + self.dense_step)
+    
+    def expected_samples(self) -> int:
+        """Estimación de frames a analizar (para preasignar arreglos)"""
+        if self.total_frames:
+            estimate = self.total_frames // self.step + 1
+            if self.max_frames:
+                estimate = min(estimate + int(self.max_frames * _DENSE_RESERVE), self.max_frames)
+            return estimate
+        return self.max_frames or 1024
+    
+    def policy(self, frames_read: int) -> Dict:
+        """Política aplicada, para reportar en el resultado"""
+        duration = frames_read / self.fps if self.fps else 0
+        return {
+            "politica": "adaptativo",
+            "fps_video": round(self.fps, 2),
+            "fps_objetivo": self.target_fps,
+            "fps_efectivo": round(self.sampled / duration, 2) if duration else 0.0,
+            "paso_base": self.base_step,
+            "paso_final": self.step,
+            "paso_denso": self.dense_step,
+            "presupuesto_frames": self.max_frames,
+            "muestreo_reducido": self.decimated,
+            "densos_limitados": self.dense_capped,
+            "frames_leidos": frames_read,
+            "frames_muestreados": self.sampled,
+            "frames_densos": self.sampled_dense,
+            "eventos": self.events
+        }
+    
+    @classmethod
+    def from_config(cls, fps: float, total_frames: Optional[int] = None,
+                    share: float = 1.0, start_frame: int = 0) -> "FrameSampler":
+        """share: fracción del video que cubre este sampler (parte del presupuesto de frames)"""
+        from . import config
+        max_frames = config.ANALISIS_MUESTREO_MAX_FRAMES
+        if max_frames and share < 1.0:
+            max_frames = max(1, math.ceil(max_frames * share))
+        return cls(
+            fps,
+            total_frames=total_frames,
+            target_fps=config.ANALISIS_MUESTREO_FPS,
+            max_frames=max_frames,
+            dense_fps=config.ANALISIS_MUESTREO_DENSO_FPS,
+            dense_seconds=config.ANALISIS_MUESTREO_DENSO_SEGUNDOS,
+            start_frame=start_frame
+        )
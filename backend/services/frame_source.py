@@ -0,0 +1,272 @@
+"""
+Backends de decodificación de video para VideoAnalyzer (flujo por archivo):
+- "opencv": cv2.VideoCapture en el mismo hilo del análisis
+- "hilo": cv2.VideoCapture en un hilo productor con cola acotada
+- "pyav": PyAV con códec multi-hilo y escalado en el decodificador (swscale)
+- "ffmpeg": proceso ffmpeg que entrega frames BGR ya escalados por un pipe
+Los backends con hilo productor solapan la decodificación con la inferencia.
+"""
+import itertools
+import queue
+import shutil
+import subprocess
+import threading
+from typing import Callable, Iterator, Optional, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import av
+except ImportError:  # PyAV es opcional
+    av = None
+
+_FIN = object()
+
+# Rotación de visualización (grados en sentido horario) -> giro de OpenCV
+_ROTATIONS = {
+    90: cv2.ROTATE_90_CLOCKWISE,
+    180: cv2.ROTATE_180,
+    270: cv2.ROTATE_90_COUNTERCLOCKWISE
+}
+
+
+def target_size(width: int, height: int, max_dim: int) -> Tuple[int, int]:
+    """Tamaño de análisis: lado mayor <= max_dim (0 = sin escalar), dimensiones pares"""
+    if not max_dim or max(width, height) <= max_dim:
+        return width, height
+    scale = max_dim / max(width, height)
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def probe_video(path: str) -> Tuple[float, Optional[int], int, int]:
+    """Metadatos sin decodificar: (fps, frames o None, ancho, alto)"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {path}")
+    try:
+        return (cap.get(cv2.CAP_PROP_FPS) or 30, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None,
+                int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    finally:
+        cap.release()
+
+
+def video_rotation(stream, path: Optional[str] = None) -> int:
+    """
+    Rotación de visualización del stream (0, 90, 180 o 270, sentido horario).
+    Videos de móvil en vertical se graban apaisados con una matriz de rotación:
+    PyAV entrega los frames sin girar. Se lee la etiqueta 'rotate' y, si no
+    está (ffmpeg >= 5 la pasa a side data), la matriz vía OpenCV
+    """
+    rotation = 0
+    try:
+        rotation = int(float(stream.metadata.get("rotate", 0)))
+        if not rotation and path is not None:
+            cap = cv2.VideoCapture(path)
+            try:
+                rotation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META))
+            finally:
+                cap.release()
+    except Exception as e:
+        logger.warning(f"No se pudo leer la rotación del video: {e}")
+    rotation %= 360
+    return rotation if rotation in _ROTATIONS else 0
+
+
+def rotate_frame(frame: np.ndarray, rotation: int) -> np.ndarray:
+    """Gira el frame a su orientación de visualización"""
+    if not rotation:
+        return frame
+    return cv2.rotate(frame, _ROTATIONS[rotation])
+
+
+class FrameSource:
+    """
+    Video abierto: fps, total_frames (o None), frames() y close().
+    Con un productor, la decodificación corre en su propio hilo y deja hasta
+    queue_size frames listos en una cola acotada.
+    """
+    def __init__(self, fps: float, total_frames: Optional[int], backend: str,
+                 produce: Callable[[], Iterator[np.ndarray]], threaded: bool,
+                 queue_size: int = 32, on_close: Optional[Callable[[], None]] = None):
+        self.fps = fps or 30
+        self.total_frames = total_frames or None
+        self.backend = backend
+        self._produce = produce
+        self._on_close = on_close
+        self._closed = False
+        self.error: Optional[str] = None
+        
+        self._queue: Optional[queue.Queue] = None
+        self._thread = None
+        if threaded:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._thread = threading.Thread(target=self._run, name=f"decode-{backend}", daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        try:
+            for frame in self._produce():
+                if not self._put(frame):
+                    break
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error al decodificar ({self.backend}): {self.error}")
+        finally:
+            self._put(_FIN)
+    
+    def _put(self, item) -> bool:
+        while not self._closed:
+            try:
+                self._queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def frames(self) -> Iterator[np.ndarray]:
+        """Frames BGR decodificados, en orden"""
+        if self._queue is None:
+            yield from self._produce()
+            return
+        while True:
+            item = self._queue.get()
+            if item is _FIN:
+                break
+            yield item
+    
+    def close(self):
+        self._closed = True
+        if self._queue is not None:
+            try:
+                while True:
+                    self._queue.get_nowait()
+            except queue.Empty:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self._on_close is not None:
+            self._on_close()
+
+
+def _open_opencv(path: str, max_dim: int, threaded: bool,
+                 start_frame: int, frame_count: Optional[int]) -> FrameSource:
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"No se pudo abrir el video: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    size = target_size(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), max_dim)
+    if start_frame:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    
+    def read():
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            yield frame
+    
+    def produce():
+        return itertools.islice(read(), frame_count)
+    
+    return FrameSource(fps, total, "hilo" if threaded else "opencv", produce, threaded, on_close=cap.release)
+
+
+def _open_pyav(path: str, max_dim: int, threads: int,
+               start_frame: int, frame_count: Optional[int]) -> FrameSource:
+    if av is None:
+        raise RuntimeError("PyAV no está instalado")
+    container = av.open(path)
+    stream = container.streams.video[0]
+    stream.thread_type = "AUTO"  # Decodificación multi-hilo del códec (frame + slice)
+    if threads:
+        stream.codec_context.thread_count = threads
+    rate = stream.average_rate or stream.guessed_rate
+    fps = float(rate) if rate else 30.0
+    width, height = target_size(stream.codec_context.width, stream.codec_context.height, max_dim)
+    rotation = video_rotation(stream, path)
+    
+    # Tramo: buscar el keyframe anterior al inicio y descartar los frames previos
+    start_time = start_frame / fps
+    if start_frame:
+        container.seek(int(start_time / stream.time_base), stream=stream)
+    
+    def decode():
+        for frame in container.decode(stream):
+            if start_frame and frame.time is not None and frame.time < start_time - 0.5 / fps:
+                continue
+            # swscale convierte a BGR y escala en el mismo paso
+            yield rotate_frame(frame.to_ndarray(format="bgr24", width=width, height=height), rotation)
+    
+    def produce():
+        return itertools.islice(decode(), frame_count)
+    
+    return FrameSource(fps, stream.frames, "pyav", produce, True, on_close=container.close)
+
+
+def _open_ffmpeg(path: str, max_dim: int, threads: int, hwaccel: str,
+                 start_frame: int, frame_count: Optional[int]) -> FrameSource:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg no está en el PATH")
+    
+    # Metadatos (tamaño, fps, frames) con OpenCV, sin decodificar
+    fps, total, width, height = probe_video(path)
+    width, height = target_size(width, height, max_dim)
+    
+    cmd = [ffmpeg, "-nostdin", "-loglevel", "error"]
+    if hwaccel:
+        cmd += ["-hwaccel", hwaccel]
+    if start_frame:
+        # -ss antes de -i: busca por keyframe y ffmpeg descarta hasta el instante exacto
+        cmd += ["-ss", f"{start_frame / fps:.6f}"]
+    cmd += ["-threads", str(threads or 0), "-i", path, "-an"]
+    if frame_count:
+        cmd += ["-frames:v", str(frame_count)]
+    cmd += ["-vf", f"scale={width}:{height}", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=10 ** 7)
+    frame_bytes = width * height * 3
+    
+    def produce():
+        while True:
+            data = process.stdout.read(frame_bytes)
+            if len(data) < frame_bytes:
+                break
+            yield np.frombuffer(data, dtype=np.uint8).reshape(height, width, 3)
+    
+    def close():
+        process.kill()
+        process.wait()
+    
+    return FrameSource(fps, total, "ffmpeg", produce, True, on_close=close)
+
+
+def open_video(path: str, backend: Optional[str] = None, max_dim: Optional[int] = None,
+               start_frame: int = 0, frame_count: Optional[int] = None) -> FrameSource:
+    """
+    Abre el video con el backend configurado (ANALISIS_DECODER); si falla, OpenCV.
+    max_dim: escalar en el decodificador a este lado mayor (por defecto ANALISIS_MAX_DIM)
+    start_frame, frame_count: decodificar solo un tramo (análisis por segmentos)
+    """
+    from . import config
+    backend = backend or config.ANALISIS_DECODER
+    max_dim = config.ANALISIS_MAX_DIM if max_dim is None else max_dim
+    threads = config.ANALISIS_DECODER_HILOS
+    
+    try:
+        if backend == "pyav":
+            return _open_pyav(path, max_dim, threads, start_frame, frame_count)
+        if backend == "ffmpeg":
+            return _open_ffmpeg(path, max_dim, threads, config.ANALISIS_DECODER_HWACCEL, start_frame, frame_count)
+        if backend == "hilo":
+            return _open_opencv(path, max_dim, True, start_frame, frame_count)
+    except Exception as e:
+        logger.warning(f"Decodificador '{backend}' no disponible ({e}), se usa OpenCV")
+    return _open_opencv(path, max_dim, False, start_frame, frame_count)
@@ -0,0 +1,332 @@
+"""
+Cola de trabajos de análisis: encola el procesamiento de prácticas y lo ejecuta
+en un pool acotado de workers, sin bloquear el event loop de la API, o lo deja
+en la tabla para que lo tomen workers externos (python -m services.worker)
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Estados de un trabajo (coinciden con SesionPractica.estado)
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_PROCESANDO = "procesando"
+ESTADO_LISTO = "listo"
+ESTADO_ERROR = "error"
+
+
+class LocalJobBackend:
+    """
+    Backend en memoria del proceso. Los trabajos se pierden al reiniciar.
+    """
+    def __init__(self):
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def create(self, job_id: str, payload: Dict) -> Dict:
+        with self._lock:
+            job = {
+                "id": job_id,
+                "payload": dict(payload),
+                "estado": ESTADO_PENDIENTE,
+                "resultado": None,
+                "error": None,
+                "creado_en": datetime.utcnow(),
+                "actualizado_en": datetime.utcnow()
+            }
+            self._jobs[job_id] = job
+            return dict(job)
+    
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["actualizado_en"] = datetime.utcnow()
+    
+    def touch(self, job_id: str) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["estado"] == ESTADO_PROCESANDO:
+                job["actualizado_en"] = datetime.utcnow()
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+    
+    def claim(self, lease_seconds: float = 1800) -> Optional[Dict]:
+        # En un solo proceso no hay workers caídos: solo se toman los pendientes
+        with self._lock:
+            for job in sorted(self._jobs.values(), key=lambda j: j["creado_en"]):
+                if job["estado"] == ESTADO_PENDIENTE:
+                    job["estado"] = ESTADO_PROCESANDO
+                    job["actualizado_en"] = datetime.utcnow()
+                    return dict(job)
+            return None
+
+
+class DatabaseJobBackend:
+    """
+    Backend persistente sobre una tabla SQLAlchemy. Los trabajos que quedaron
+    pendientes o a medias (lease vencido) los vuelve a reclamar cualquier
+    proceso de la API o worker, uno solo por trabajo.
+    
+    model: clase declarativa con columnas id, user_id, id_sesion, url_archivo,
+           estado, resultado_json, error, creado_en, actualizado_en
+    """
+    def __init__(self, session_factory: Callable, model):
+        self.session_factory = session_factory
+        self.model = model
+    
+    def create(self, job_id: str, payload: Dict) -> Dict:
+        db = self.session_factory()
+        try:
+            row = db.query(self.model).filter(self.model.id == job_id).first()
+            if row is None:
+                row = self.model(id=job_id)
+                db.add(row)
+            row.user_id = payload.get("user_id")
+            row.id_sesion = payload.get("id_sesion")
+            row.url_archivo = payload.get("url_archivo")
+            row.estado = ESTADO_PENDIENTE
+            row.resultado_json = None
+            row.error = None
+            row.actualizado_en = datetime.utcnow()
+            db.commit()
+            db.refresh(row)
+            return self._to_dict(row)
+        finally:
+            db.close()
+    
+    def update(self, job_id: str, **fields) -> None:
+        db = self.session_factory()
+        try:
+            row = db.query(self.model).filter(self.model.id == job_id).first()
+            if row is None:
+                return
+            if "estado" in fields:
+                row.estado = fields["estado"]
+            if "resultado" in fields:
+                row.resultado_json = json.dumps(fields["resultado"]) if fields["resultado"] is not None else None
+            if "error" in fields:
+                row.error = fields["error"]
+            row.actualizado_en = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+    
+    def touch(self, job_id: str) -> None:
+        """Renueva el lease de un trabajo en curso (solo si sigue "procesando")"""
+        db = self.session_factory()
+        try:
+            db.query(self.model).filter(
+                self.model.id == job_id,
+                self.model.estado == ESTADO_PROCESANDO
+            ).update({"actualizado_en": datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        db = self.session_factory()
+        try:
+            row = db.query(self.model).filter(self.model.id == job_id).first()
+            return self._to_dict(row) if row else None
+        finally:
+            db.close()
+    
+    def claim(self, lease_seconds: float = 1800) -> Optional[Dict]:
+        """
+        Toma el trabajo pendiente más antiguo y lo marca "procesando" en una
+        sola transacción. SELECT ... FOR UPDATE SKIP LOCKED: varios workers
+        reclaman a la vez sin bloquearse ni tomar el mismo trabajo.
+        Un trabajo "procesando" sin cambios en lease_seconds se considera
+        abandonado (worker caído) y se vuelve a tomar: mientras corre, JobQueue
+        renueva actualizado_en cada heartbeat_seconds.
+        """
+        db = self.session_factory()
+        try:
+            vencido = datetime.utcnow() - timedelta(seconds=lease_seconds)
+            row = db.query(self.model).filter(
+                (self.model.estado == ESTADO_PENDIENTE)
+                | ((self.model.estado == ESTADO_PROCESANDO) & (self.model.actualizado_en < vencido))
+            ).order_by(self.model.creado_en).with_for_update(skip_locked=True).first()
+            if row is None:
+                db.rollback()
+                return None
+            row.estado = ESTADO_PROCESANDO
+            row.actualizado_en = datetime.utcnow()
+            db.commit()
+            db.refresh(row)
+            return self._to_dict(row)
+        finally:
+            db.close()
+    
+    def _to_dict(self, row) -> Dict:
+        return {
+            "id": row.id,
+            "payload": {
+                "user_id": row.user_id,
+                "id_sesion": row.id_sesion,
+                "url_archivo": row.url_archivo
+            },
+            "estado": row.estado,
+            "resultado": json.loads(row.resultado_json) if row.resultado_json else None,
+            "error": row.error,
+            "creado_en": row.creado_en,
+            "actualizado_en": row.actualizado_en
+        }
+
+
+class JobQueue:
+    """
+    Cola de trabajos con un pool acotado de hilos. Cada hilo reclama trabajos
+    del backend con claim(): pendientes y abandonados (lease vencido), así
+    varios procesos de la API comparten la cola sin ejecutar dos veces un trabajo.
+    
+    handler: función síncrona que recibe el payload del trabajo y devuelve un
+             dict serializable con el resultado. Si lanza excepción, el trabajo
+             queda en estado "error".
+    on_state_change: callback opcional (job_id, estado) para reflejar el estado
+                     en la sesión de práctica.
+    run_locally: False = solo se persisten los trabajos; los ejecutan workers
+                 externos con serve() (el backend debe ser compartido)
+    heartbeat_seconds: cada cuánto se renueva el lease de un trabajo en curso
+                       (0 = nunca); debe ser bastante menor que lease_seconds
+    poll_seconds: espera entre reclamos con la cola vacía
+    lease_seconds: tiempo sin latidos tras el cual un trabajo se da por abandonado
+    """
+    def __init__(self, backend, handler: Callable[[Dict], Dict],
+                 max_workers: int = 2,
+                 on_state_change: Optional[Callable[[str, str], None]] = None,
+                 run_locally: bool = True,
+                 heartbeat_seconds: float = 30,
+                 poll_seconds: float = 2.0,
+                 lease_seconds: float = 120):
+        self.backend = backend
+        self.handler = handler
+        self.max_workers = max(1, max_workers)
+        self.on_state_change = on_state_change
+        self.run_locally = run_locally
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+    
+    def start(self) -> None:
+        """
+        Arranca los hilos que reclaman trabajos. Los que quedaron sin terminar
+        (reinicio, proceso caído) se retoman al vencer su lease
+        """
+        if not self.run_locally or self._executor is not None:
+            return
+        self._stop.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="analisis"
+        )
+        for _ in range(self.max_workers):
+            self._executor.submit(self._claim_loop, self._stop, self.poll_seconds, self.lease_seconds)
+    
+    def shutdown(self, wait: bool = False) -> None:
+        if self._executor is not None:
+            self._stop.set()
+            self._wake.set()
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+    
+    def submit(self, job_id: str, payload: Dict) -> Dict:
+        """Encola un trabajo y retorna inmediatamente su registro"""
+        if self.run_locally and self._executor is None:
+            self.start()
+        # Sin notificar "procesando": la sesión ya pasó a ese estado antes de
+        # encolar, y otro worker puede reclamar y terminar el trabajo en cuanto
+        # create() confirma (un aviso tardío reabriría una sesión en "error")
+        job = self.backend.create(job_id, payload)
+        # Despertar a un hilo libre: lo reclama sin esperar al siguiente sondeo
+        self._wake.set()
+        logger.info(f"Trabajo encolado: {job_id}")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.backend.get(job_id)
+    
+    def serve(self, stop_event: threading.Event, poll_seconds: Optional[float] = None,
+              lease_seconds: Optional[float] = None) -> None:
+        """
+        Modo worker: max_workers hilos reclaman trabajos del backend hasta que
+        stop_event se activa. Cada hilo termina el trabajo en curso antes de salir
+        """
+        poll_seconds = self.poll_seconds if poll_seconds is None else poll_seconds
+        lease_seconds = self.lease_seconds if lease_seconds is None else lease_seconds
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analisis") as executor:
+            for _ in range(self.max_workers):
+                executor.submit(self._claim_loop, stop_event, poll_seconds, lease_seconds)
+            logger.info(f"Worker de análisis escuchando la cola ({self.max_workers} hilos)")
+    
+    def _claim_loop(self, stop_event: threading.Event, poll_seconds: float, lease_seconds: float) -> None:
+        while not stop_event.is_set():
+            try:
+                job = self.backend.claim(lease_seconds)
+            except Exception as e:
+                logger.error(f"Error al reclamar trabajo: {str(e)}")
+                job = None
+            if job is None:
+                if stop_event is self._stop:
+                    self._wake.wait(poll_seconds)
+                    self._wake.clear()
+                else:
+                    stop_event.wait(poll_seconds)
+                continue
+            self._run(job["id"], job["payload"])
+    
+    def _run(self, job_id: str, payload: Dict) -> None:
+        # El trabajo ya está "procesando": lo marcó claim()
+        self._notify(job_id, ESTADO_PROCESANDO)
+        latido = self._heartbeat(job_id)
+        try:
+            resultado = self.handler(payload)
+            latido.set()
+            self.backend.update(job_id, estado=ESTADO_LISTO, resultado=resultado, error=None)
+            self._notify(job_id, ESTADO_LISTO)
+            logger.info(f"Trabajo completado: {job_id}")
+        except Exception as e:
+            latido.set()
+            logger.error(f"Error en trabajo {job_id}: {str(e)}")
+            self.backend.update(job_id, estado=ESTADO_ERROR, error=str(e))
+            self._notify(job_id, ESTADO_ERROR)
+    
+    def _heartbeat(self, job_id: str) -> threading.Event:
+        """
+        Renueva el lease del trabajo en un hilo hasta que se active el evento
+        retornado: un análisis largo no se toma por abandonado en otro worker
+        """
+        stop = threading.Event()
+        
+        def beat():
+            while not stop.wait(self.heartbeat_seconds):
+                try:
+                    self.backend.touch(job_id)
+                except Exception as e:
+                    logger.warning(f"No se pudo renovar el lease de {job_id}: {e}")
+        
+        if self.heartbeat_seconds:
+            threading.Thread(target=beat, name=f"latido-{job_id}", daemon=True).start()
+        return stop
+    
+    def _notify(self, job_id: str, estado: str) -> None:
+        if self.on_state_change is None:
+            return
+        try:
+            self.on_state_change(job_id, estado)
+        except Exception as e:
+            logger.warning(f"No se pudo actualizar estado de {job_id}: {e}")
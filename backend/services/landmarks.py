@@ -0,0 +1,355 @@
+"""
+Backends de inferencia de MediaPipe (cara, manos y postura) para VideoAnalyzer.
+- "solutions": API clásica mp.solutions, un frame por llamada
+- "tasks": API MediaPipe Tasks (FaceLandmarker/HandLandmarker/PoseLandmarker) en
+  modo VIDEO, procesando lotes de frames
+
+FaceMesh y Hands corren sobre la ROI del frame si existe (ver frame_preprocess)
+y sus landmarks se remapean a coordenadas del frame completo. Con la cascada
+activa, Hands y Pose solo se re-infieren cuando la imagen cambió.
+"""
+import abc
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence
+import logging
+
+import cv2
+import mediapipe as mp
+import numpy as np
+from .frame_preprocess import PreparedFrame, remap
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class FrameLandmarks(NamedTuple):
+    """
+    Landmarks normalizados [0-1] de un frame, como arreglos float32 de (N, 3) con x, y, z
+    face: (478, 3) de la primera cara (con iris) o None
+    hands: lista de manos, cada una (21, 3)
+    pose: (33, 3) del cuerpo o None
+    """
+    face: Optional[np.ndarray]
+    hands: List[np.ndarray]
+    pose: Optional[np.ndarray]
+
+
+def to_array(points: Sequence) -> np.ndarray:
+    """Landmarks de MediaPipe (objetos con .x/.y/.z) -> arreglo (N, 3) float32"""
+    return np.array([(p.x, p.y, p.z) for p in points], dtype=np.float32)
+
+
+def _interpolate(hands: List[np.ndarray], pose: Optional[np.ndarray],
+                 next_hands: List[np.ndarray], next_pose: Optional[np.ndarray], t: float):
+    """
+    Manos y postura entre dos inferencias (t en [0, 1]). Si no son comparables
+    (cambia la cantidad de manos, postura perdida) se conservan las anteriores
+    """
+    if len(hands) == len(next_hands):
+        hands = [a + (b - a) * t for a, b in zip(hands, next_hands)]
+    if pose is not None and next_pose is not None:
+        pose = pose + (next_pose - pose) * t
+    return hands, pose
+
+
+class CascadeGate:
+    """
+    Decide si hace falta volver a correr Hands y Pose comparando una miniatura en
+    escala de grises con la del último frame en que se corrieron. Si no cambió,
+    no se infiere (postura y manos cambian lento): LandmarkBackend interpola sus
+    landmarks entre las inferencias vecinas, o reutiliza los últimos si el frame
+    siguiente inferido todavía no llegó.
+    
+    threshold: diferencia absoluta media (0-255) a partir de la cual se re-infiere
+    max_reuse: frames seguidos como máximo reutilizando el resultado anterior
+    width: ancho de la miniatura
+    """
+    def __init__(self, threshold: float = 2.0, max_reuse: int = 5, width: int = 64):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.width = width
+        self.reset()
+    
+    def reset(self) -> None:
+        self._reference: Optional[np.ndarray] = None
+        self._reused = 0
+        self.runs = 0
+        self.skips = 0
+        self.interpolated = 0  # Omitidos con landmarks interpolados (el resto se reutilizan)
+    
+    def should_run(self, rgb: np.ndarray) -> bool:
+        h, w = rgb.shape[:2]
+        thumb = cv2.resize(rgb, (self.width, max(1, round(h * self.width / w))), interpolation=cv2.INTER_AREA)
+        thumb = cv2.cvtColor(thumb, cv2.COLOR_RGB2GRAY).astype(np.int16)
+        
+        if (self._reference is None or self._reused >= self.max_reuse
+                or np.abs(thumb - self._reference).mean() > self.threshold):
+            self._reference = thumb
+            self._reused = 0
+            self.runs += 1
+            return True
+        self._reused += 1
+        self.skips += 1
+        return False
+    
+    def stats(self) -> Dict:
+        total = self.runs + self.skips
+        return {
+            "umbral": self.threshold,
+            "inferencias_manos_pose": self.runs,
+            "inferencias_omitidas": self.skips,
+            "inferencias_interpoladas": self.interpolated,
+            "fraccion_omitida": round(self.skips / total, 3) if total else 0.0
+        }
+
+
+class LandmarkBackend(abc.ABC):
+    """
+    Base de los backends. Las subclases implementan _face/_hands/_pose sobre una
+    imagen RGB; process_batch reparte el lote entre los tres modelos.
+    
+    batch_size: frames que VideoAnalyzer acumula antes de llamar a process_batch
+    gate: cascada opcional para omitir Hands/Pose en frames sin cambios
+    """
+    name = "base"
+    
+    def __init__(self, batch_size: int = 1, gate: Optional[CascadeGate] = None):
+        self.batch_size = max(1, batch_size)
+        self.gate = gate
+        self._last_hands: List[np.ndarray] = []
+        self._last_pose: Optional[np.ndarray] = None
+        self._last_ms: Optional[int] = None
+        # Con lotes, cada modelo recorre el lote en su propio hilo (los grafos son
+        # independientes y la inferencia nativa libera el GIL)
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="landmarks") \
+            if self.batch_size > 1 else None
+    
+    def reset(self) -> None:
+        """Llamado al comenzar cada video"""
+        self._last_hands = []
+        self._last_pose = None
+        self._last_ms = None
+        if self.gate is not None:
+            self.gate.reset()
+    
+    def process_batch(self, frames: List[PreparedFrame], timestamps_ms: List[int]) -> List[FrameLandmarks]:
+        # Cascada: Hands y Pose solo en los frames que cambiaron respecto a la última inferencia
+        slow = [self.gate.should_run(f.rgb) for f in frames] if self.gate is not None else [True] * len(frames)
+        
+        # Cara y manos sobre la ROI (si hay); postura sobre el frame completo
+        full_images = [self._image(f.rgb) for f in frames]
+        roi_images = [self._image(f.crop) if f.crop is not None else full for f, full in zip(frames, full_images)]
+        slow_inputs = [(roi_images[i], full_images[i], timestamps_ms[i]) for i, run in enumerate(slow) if run]
+        
+        if self._executor is None or len(frames) == 1:
+            faces = [self._face(img, ts) for img, ts in zip(roi_images, timestamps_ms)]
+            hands = [self._hands(img, ts) for img, _, ts in slow_inputs]
+            poses = [self._pose(img, ts) for _, img, ts in slow_inputs]
+        else:
+            futures = [
+                self._executor.submit(lambda: [self._face(img, ts) for img, ts in zip(roi_images, timestamps_ms)]),
+                self._executor.submit(lambda: [self._hands(img, ts) for img, _, ts in slow_inputs]),
+                self._executor.submit(lambda: [self._pose(img, ts) for _, img, ts in slow_inputs])
+            ]
+            faces, hands, poses = (f.result() for f in futures)
+        
+        # Manos y postura de los frames inferidos: (timestamp, manos, postura)
+        inferred = {}
+        hands_iter, poses_iter = iter(hands), iter(poses)
+        for i, (frame, run) in enumerate(zip(frames, slow)):
+            if run:
+                frame_hands = next(hands_iter)
+                if frame.roi is not None:
+                    frame_hands = [remap(hand, frame.roi) for hand in frame_hands]
+                inferred[i] = (timestamps_ms[i], frame_hands, next(poses_iter))
+        
+        results = []
+        following = None
+        for i in range(len(frames) - 1, -1, -1):
+            # Próximo frame inferido del lote (se recorre de atrás hacia adelante)
+            if i in inferred:
+                following = inferred[i]
+            results.append(following)
+        results.reverse()
+        
+        for i, (frame, face, following) in enumerate(zip(frames, faces, results)):
+            if frame.roi is not None and face is not None:
+                face = remap(face, frame.roi)
+            if i in inferred:
+                self._last_ms, self._last_hands, self._last_pose = inferred[i]
+                frame_hands, pose = self._last_hands, self._last_pose
+            elif following is not None and self._last_ms is not None:
+                # Omitido entre dos inferencias: interpolar según el timestamp
+                following_ms, following_hands, following_pose = following
+                t = (timestamps_ms[i] - self._last_ms) / max(1, following_ms - self._last_ms)
+                frame_hands, pose = _interpolate(self._last_hands, self._last_pose,
+                                                 following_hands, following_pose, t)
+                self.gate.interpolated += 1
+            else:
+                # Sin inferencia posterior en el lote: se reutilizan los últimos landmarks
+                frame_hands, pose = self._last_hands, self._last_pose
+            results[i] = FrameLandmarks(face, frame_hands, pose)
+        return results
+    
+    def _image(self, rgb: np.ndarray):
+        """Imagen en el formato que espera el backend"""
+        return rgb
+    
+    @abc.abstractmethod
+    def _face(self, rgb: np.ndarray, timestamp_ms: int) -> Optional[np.ndarray]:
+        """Landmarks de la primera cara (478, 3) o None"""
+    
+    @abc.abstractmethod
+    def _hands(self, rgb: np.ndarray, timestamp_ms: int) -> List[np.ndarray]:
+        """Landmarks de cada mano detectada, (21, 3) por mano"""
+    
+    @abc.abstractmethod
+    def _pose(self, rgb: np.ndarray, timestamp_ms: int) -> Optional[np.ndarray]:
+        """Landmarks del cuerpo (33, 3) o None"""
+    
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+class SolutionsBackend(LandmarkBackend):
+    """API clásica mp.solutions (FaceMesh, Hands, Pose)"""
+    name = "solutions"
+    
+    def __init__(self, batch_size: int = 1, gate: Optional[CascadeGate] = None):
+        super().__init__(batch_size, gate)
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            static_image_mode=False,
+            max_num_faces=1,
+            refine_landmarks=True,  # Incluye iris para eye gaze
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.hands = mp.solutions.hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+        self.pose = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+    
+    def _face(self, rgb, timestamp_ms):
+        results = self.face_mesh.process(rgb)
+        return to_array(results.multi_face_landmarks[0].landmark) if results.multi_face_landmarks else None
+    
+    def _hands(self, rgb, timestamp_ms):
+        results = self.hands.process(rgb)
+        return [to_array(hand.landmark) for hand in results.multi_hand_landmarks or []]
+    
+    def _pose(self, rgb, timestamp_ms):
+        results = self.pose.process(rgb)
+        return to_array(results.pose_landmarks.landmark) if results.pose_landmarks else None
+    
+    def close(self):
+        super().close()
+        self.face_mesh.close()
+        self.hands.close()
+        self.pose.close()
+
+
+class TasksBackend(LandmarkBackend):
+    """
+    API MediaPipe Tasks en modo VIDEO (con tracking entre frames).
+    Requiere los modelos .task (face_landmarker, hand_landmarker, pose_landmarker).
+    """
+    name = "tasks"
+    
+    def __init__(self, face_model: str, hand_model: str, pose_model: str, batch_size: int = 8,
+                 gate: Optional[CascadeGate] = None):
+        super().__init__(batch_size, gate)
+        from mediapipe.tasks.python import BaseOptions
+        from mediapipe.tasks.python import vision
+        
+        for path in (face_model, hand_model, pose_model):
+            if not os.path.isfile(path):
+                raise FileNotFoundError(f"Modelo de MediaPipe no encontrado: {path}")
+        
+        video_mode = vision.RunningMode.VIDEO
+        self.face_landmarker = vision.FaceLandmarker.create_from_options(vision.FaceLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=face_model),
+            running_mode=video_mode,
+            num_faces=1,
+            min_face_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        ))
+        self.hand_landmarker = vision.HandLandmarker.create_from_options(vision.HandLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=hand_model),
+            running_mode=video_mode,
+            num_hands=2,
+            min_hand_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        ))
+        self.pose_landmarker = vision.PoseLandmarker.create_from_options(vision.PoseLandmarkerOptions(
+            base_options=BaseOptions(model_asset_path=pose_model),
+            running_mode=video_mode,
+            min_pose_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        ))
+        
+        # En modo VIDEO los timestamps deben crecer también entre videos distintos
+        self._offset_ms = 0
+        self._last_ms = -1
+    
+    def reset(self):
+        super().reset()
+        self._offset_ms = self._last_ms + 1
+    
+    def process_batch(self, frames, timestamps_ms):
+        timestamps_ms = [self._offset_ms + ts for ts in timestamps_ms]
+        if timestamps_ms:
+            self._last_ms = max(self._last_ms, timestamps_ms[-1])
+        return super().process_batch(frames, timestamps_ms)
+    
+    def _image(self, rgb: np.ndarray):
+        # Los tres modelos comparten la imagen de cada frame
+        return mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(rgb))
+    
+    def _face(self, image, timestamp_ms):
+        result = self.face_landmarker.detect_for_video(image, timestamp_ms)
+        return to_array(result.face_landmarks[0]) if result.face_landmarks else None
+    
+    def _hands(self, image, timestamp_ms):
+        return [to_array(hand) for hand in self.hand_landmarker.detect_for_video(image, timestamp_ms).hand_landmarks]
+    
+    def _pose(self, image, timestamp_ms):
+        result = self.pose_landmarker.detect_for_video(image, timestamp_ms)
+        return to_array(result.pose_landmarks[0]) if result.pose_landmarks else None
+    
+    def close(self):
+        super().close()
+        self.face_landmarker.close()
+        self.hand_landmarker.close()
+        self.pose_landmarker.close()
+
+
+def create_backend(name: Optional[str] = None) -> LandmarkBackend:
+    """
+    Crea el backend configurado (ANALISIS_MEDIAPIPE). Si el modo "tasks" no está
+    disponible (MediaPipe sin Tasks o modelos ausentes) se usa "solutions".
+    """
+    from . import config
+    name = name or config.ANALISIS_MEDIAPIPE
+    gate = CascadeGate(threshold=config.ANALISIS_CASCADA_UMBRAL, max_reuse=config.ANALISIS_CASCADA_MAX_REUSO) \
+        if config.ANALISIS_CASCADA else None
+    if name == "tasks":
+        try:
+            return TasksBackend(
+                face_model=config.ANALISIS_MODELO_CARA,
+                hand_model=config.ANALISIS_MODELO_MANOS,
+                pose_model=config.ANALISIS_MODELO_POSE,
+                batch_size=config.ANALISIS_LOTE_FRAMES,
+                gate=gate
+            )
+        except Exception as e:
+            logger.warning(f"MediaPipe Tasks no disponible ({e}), se usa mp.solutions")
+    return SolutionsBackend(gate=gate)
@@ -0,0 +1,156 @@
+"""
+Prosodia del habla sobre PCM s16le mono: frecuencia fundamental (F0) por
+autocorrelación vía FFT, energía RMS por trama y su variabilidad, en una
+pasada vectorizada por bloques de tramas. Resume cuán expresiva o monótona
+es la voz, que el texto transcrito no refleja
+"""
+import time
+from typing import Dict, Optional, Tuple
+import logging
+
+import numpy as np
+
+from .vad import VoiceActivity
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tramas por bloque de FFT: acota la memoria en audios largos
+_BLOCK_FRAMES = 1024
+
+# Pico mínimo de la autocorrelación normalizada para considerar la trama sonora
+_VOICING_THRESHOLD = 0.45
+
+# Se elige el primer pico (lag más corto) que alcance esta fracción del mayor:
+# en una voz periódica los múltiplos del período dan picos casi iguales y el
+# máximo absoluto puede caer en 2T o 3T (errores de octava)
+_PEAK_RATIO = 0.9
+
+# Energía mínima de una trama para buscar su F0 (dBFS)
+_MIN_ENERGY_DB = -45.0
+
+# Variabilidad esperada en una voz monótona y en una expresiva
+_PITCH_ST = (1.0, 4.0)  # desvío de F0 en semitonos
+_ENERGY_DB = (2.0, 8.0)  # desvío de la energía en dB
+
+
+def _frames(samples: np.ndarray, frame: int, hop: int, indices: np.ndarray) -> np.ndarray:
+    """Matriz (tramas, frame) con las tramas de los índices dados, sin copiar el audio entero"""
+    offsets = indices[:, None] * hop + np.arange(frame)[None, :]
+    return samples[offsets].astype(np.float32) / 32768.0
+
+
+def _pitch_block(block: np.ndarray, sample_rate: int, min_lag: int, max_lag: int,
+                 nfft: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    F0 (Hz) y claridad (pico de la autocorrelación normalizada) de cada trama.
+    La autocorrelación se obtiene como la inversa del espectro de potencia; el
+    período es el primer máximo local que supera el umbral de sonoridad y
+    _PEAK_RATIO del mayor pico
+    """
+    block = block - block.mean(axis=1, keepdims=True)
+    spectrum = np.fft.rfft(block, n=nfft, axis=1)
+    ac = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=nfft, axis=1)[:, :max_lag + 2]
+    # Compensar el sesgo de la autocorrelación (menos muestras en lags largos)
+    frame = block.shape[1]
+    ac = ac * (frame / (frame - np.arange(ac.shape[1])))[None, :]
+    ac = ac / np.maximum(ac[:, :1], 1e-12)
+    
+    # Máximos locales en [min_lag, max_lag] (ac llega hasta max_lag + 1)
+    window = ac[:, min_lag - 1:max_lag + 2]
+    center = window[:, 1:-1]
+    peaks = (center > window[:, :-2]) & (center >= window[:, 2:])
+    threshold = np.maximum(_VOICING_THRESHOLD, _PEAK_RATIO * center.max(axis=1))
+    candidates = peaks & (center >= threshold[:, None])
+    # Sin candidatos (trama sorda) se usa el máximo: su claridad queda bajo el umbral
+    first = np.where(candidates.any(axis=1), np.argmax(candidates, axis=1), np.argmax(center, axis=1))
+    lags = first + min_lag
+    rows = np.arange(len(lags))
+    clarity = ac[rows, lags]
+    
+    # Interpolación parabólica alrededor del pico: F0 con resolución subsample
+    left, center, right = ac[rows, lags - 1], clarity, ac[rows, lags + 1]
+    denominator = left - 2 * center + right
+    shift = np.where(np.abs(denominator) > 1e-12, 0.5 * (left - right) / denominator, 0.0)
+    return sample_rate / (lags + np.clip(shift, -0.5, 0.5)), clarity
+
+
+def _scale(value: float, bounds: Tuple[float, float]) -> float:
+    low, high = bounds
+    return float(np.clip((value - low) / (high - low), 0.0, 1.0))
+
+
+def analyze_prosody(pcm: bytes, sample_rate: int, activity: Optional[VoiceActivity] = None,
+                    frame_ms: int = 40, hop_ms: int = 20, fmin: float = 75.0, fmax: float = 400.0) -> Dict:
+    """
+    pcm: audio s16le mono
+    activity: tramos de voz del VAD; si se da, solo se analizan esas tramas
+    fmin, fmax: rango de F0 buscado (voz hablada adulta)
+    Returns: dict con F0, energía, su variabilidad y la expresividad vocal (0-100)
+    """
+    inicio = time.perf_counter()
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame = int(sample_rate * frame_ms / 1000)
+    hop = int(sample_rate * hop_ms / 1000)
+    count = (len(samples) - frame) // hop + 1 if len(samples) >= frame else 0
+    
+    indices = np.arange(count)
+    if activity is not None and count:
+        # Solo las tramas dentro de los tramos de voz
+        times = indices * hop_ms / 1000
+        starts = np.array([start for start, _ in activity.segments])
+        ends = np.array([end for _, end in activity.segments])
+        segment = np.searchsorted(starts, times, side="right") - 1
+        if starts.size:
+            indices = indices[(segment >= 0) & (times < ends[np.maximum(segment, 0)])]
+        else:
+            indices = indices[:0]
+    
+    min_lag = max(2, int(sample_rate / fmax))
+    max_lag = min(frame - 2, int(np.ceil(sample_rate / fmin)))
+    nfft = 1 << int(np.ceil(np.log2(2 * frame)))  # Sin solapamiento circular
+    
+    energies, pitches = [], []
+    for first in range(0, len(indices), _BLOCK_FRAMES):
+        block = _frames(samples, frame, hop, indices[first:first + _BLOCK_FRAMES])
+        energy = 20 * np.log10(np.maximum(np.sqrt(np.mean(block * block, axis=1)), 1e-10))
+        loud = energy > _MIN_ENERGY_DB
+        energies.append(energy[loud])
+        if np.any(loud):
+            f0, clarity = _pitch_block(block[loud], sample_rate, min_lag, max_lag, nfft)
+            pitches.append(f0[clarity >= _VOICING_THRESHOLD])
+    
+    energy = np.concatenate(energies) if energies else np.empty(0)
+    f0 = np.concatenate(pitches) if pitches else np.empty(0)
+    elapsed = time.perf_counter() - inicio
+    duration = len(samples) / sample_rate if sample_rate else 0.0
+    logger.info(f"Prosodia: {len(f0)}/{len(indices)} tramas sonoras en {elapsed * 1000:.0f} ms "
+                f"({elapsed / duration * 100 if duration else 0:.2f}% del audio)")
+    
+    if f0.size < 10:
+        return {}
+    
+    # Variabilidad del tono en semitonos respecto de la mediana (independiente del registro)
+    median = float(np.median(f0))
+    semitones = 12 * np.log2(f0 / median)
+    low, high = np.percentile(semitones, [10, 90])
+    pitch_std = float(np.std(semitones))
+    energy_std = float(np.std(energy))
+    
+    score = 100 * (0.7 * _scale(pitch_std, _PITCH_ST) + 0.3 * _scale(energy_std, _ENERGY_DB))
+    if score >= 65:
+        nivel = "alta"
+    elif score >= 35:
+        nivel = "media"
+    else:
+        nivel = "baja"  # Voz monótona
+    
+    return {
+        "score": round(score, 1),
+        "nivel": nivel,
+        "f0_mediana_hz": round(median, 1),
+        "f0_desvio_semitonos": round(pitch_std, 2),
+        "f0_rango_semitonos": round(float(high - low), 2),
+        "energia_desvio_db": round(energy_std, 2),
+        "proporcion_sonora": round(len(f0) / max(1, len(indices)), 3)
+    }
@@ -0,0 +1,181 @@
+"""
+Caché de resultados de análisis direccionada por contenido: la clave es el hash
+SHA-256 de los bytes del video, con índice opcional por URL + ETag/Last-Modified
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Dict, Iterable, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Subir este número invalida la caché aunque el código no cambie
+CACHE_VERSION = "1"
+
+# Al desalojar se baja hasta esta fracción de max_bytes, para no recorrer la
+# carpeta en cada escritura una vez alcanzado el límite
+_EVICT_TARGET = 0.9
+
+# Módulos cuyos umbrales y algoritmos determinan el resultado
+_ANALYZER_MODULES = (
+    "video_analyzer.py", "audio_analyzer.py", "av_processor.py", "demuxer.py",
+    "landmarks.py", "frame_sampler.py", "frame_preprocess.py", "frame_source.py",
+    "streaming_stats.py", "video_segments.py", "audio_chunks.py", "speech_backends.py",
+    "speech_timeline.py", "fillers.py", os.path.join("muletillas", "es.json"), "vad.py",
+    "prosody.py"
+)
+
+
+def analyzer_version(extra: Iterable[str] = ()) -> str:
+    """
+    Clave de versión ligada a los analizadores: hash del código fuente de los
+    módulos de análisis (umbrales incluidos) y de la configuración relevante
+    """
+    h = hashlib.sha256(CACHE_VERSION.encode())
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    for name in _ANALYZER_MODULES:
+        try:
+            with open(os.path.join(base_dir, name), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            h.update(name.encode())
+    for item in extra:
+        h.update(str(item).encode())
+    return h.hexdigest()[:12]
+
+
+def _json_default(value):
+    # Escalares de NumPy (np.float32, np.int64, ...)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"No serializable: {type(value)}")
+
+
+class ResultCache:
+    """
+    Caché en disco local con desalojo LRU acotado por tamaño.
+    
+    directory: carpeta base (compartible entre procesos)
+    max_bytes: tamaño máximo total; al superarlo se borran los menos usados
+    version: clave de versión (ver analyzer_version); cada versión usa su subcarpeta
+    
+    El tamaño total se lleva en memoria (se mide al primer put y se suma lo
+    escrito): la carpeta solo se recorre cuando el total supera max_bytes
+    """
+    def __init__(self, directory: str, max_bytes: int, version: str):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version
+        self._root = os.path.join(directory, version)
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self._root, "urls"), exist_ok=True)
+    
+    # --- Resultados por contenido ---
+    
+    def get(self, content_hash: str) -> Optional[Dict]:
+        return self._read(self._content_path(content_hash))
+    
+    def put(self, content_hash: str, result: Dict) -> None:
+        written = self._write(self._content_path(content_hash), result)
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += written
+            if self._size > self.max_bytes:
+                self._evict()
+    
+    # --- Índice rápido por URL + validador HTTP ---
+    
+    def get_by_url(self, url: str, validator: Optional[str]) -> Optional[Dict]:
+        """Solo acierta si el servidor devuelve el mismo ETag/Last-Modified"""
+        if not validator:
+            return None
+        entry = self._read(self._url_path(url))
+        if not entry or entry.get("validador") != validator:
+            return None
+        return self.get(entry["clave"])
+    
+    def remember_url(self, url: str, validator: Optional[str], content_hash: str) -> None:
+        if not validator:
+            return
+        written = self._write(self._url_path(url), {"validador": validator, "clave": content_hash})
+        with self._lock:
+            if self._size is not None:
+                self._size += written
+    
+    # --- Internos ---
+    
+    def _content_path(self, content_hash: str) -> str:
+        return os.path.join(self._root, content_hash[:2], f"{content_hash}.json")
+    
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self._root, "urls", hashlib.sha256(url.encode()).hexdigest() + ".json")
+    
+    def _read(self, path: str) -> Optional[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)  # Marca de uso reciente para el LRU
+            return data
+        except (OSError, ValueError):
+            return None
+    
+    def _write(self, path: str, data: Dict) -> int:
+        """Escribe el JSON y retorna cuántos bytes creció la caché"""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            # Escritura atómica: varios procesos pueden compartir la carpeta
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, default=_json_default)
+                size = f.tell()
+            os.replace(tmp_path, path)
+            return size - previous
+        except Exception as e:
+            logger.warning(f"No se pudo escribir en la caché: {e}")
+            return 0
+    
+    def _scan(self):
+        """Entradas (mtime, tamaño, ruta) de la carpeta y su tamaño total"""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return entries, total
+    
+    def _evict(self) -> None:
+        """
+        Borra las entradas usadas hace más tiempo hasta quedar bajo el objetivo.
+        Se vuelve a medir la carpeta: otros procesos pueden haber escrito en ella
+        """
+        entries, total = self._scan()
+        target = self.max_bytes * _EVICT_TARGET
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.unlink(path)
+                    total -= size
+                except OSError:
+                    pass
+            logger.info(f"Caché de análisis desalojada hasta {total / 1e6:.1f} MB")
+        self._size = total
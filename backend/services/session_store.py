@@ -0,0 +1,222 @@
+"""
+Estado de las sesiones de práctica fuera del proceso de la API, para correr
+varios workers de uvicorn (y workers de análisis) sobre las mismas sesiones:
+- "memoria": diccionario del proceso (un solo worker, se pierde al reiniciar)
+- "db": tabla SQLAlchemy (Postgres)
+- "redis": servidor Redis o compatible (Valkey, KeyDB)
+Las sesiones abandonadas expiran tras ttl_seconds sin cambios de estado, y los
+cambios de estado son atómicos: solo se aplican si el estado actual lo permite
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import redis
+except ImportError:  # Redis es opcional: solo se necesita con SESIONES_BACKEND=redis
+    redis = None
+
+# Estados de una sesión (coinciden con SesionPractica.estado)
+ESTADO_GRABANDO = "grabando"
+ESTADO_PROCESANDO = "procesando"
+ESTADO_LISTO = "listo"
+ESTADO_ERROR = "error"
+
+# Estado destino -> estados desde los que se puede llegar. Una sesión terminada
+# se puede volver a finalizar (p.ej. reintentar tras un error)
+TRANSICIONES = {
+    ESTADO_PROCESANDO: (ESTADO_GRABANDO, ESTADO_LISTO, ESTADO_ERROR),
+    ESTADO_LISTO: (ESTADO_PROCESANDO,),
+    ESTADO_ERROR: (ESTADO_PROCESANDO,)
+}
+
+
+class MemorySessionStore:
+    """
+    Sesiones en memoria del proceso. Se pierden al reiniciar.
+    """
+    def __init__(self, ttl_seconds: float = 86400):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._sessions: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def create(self, session_id: str, user_id: Optional[int] = None) -> Dict:
+        with self._lock:
+            self._purge(datetime.utcnow())
+            session = {"id": session_id, "user_id": user_id, "estado": ESTADO_GRABANDO,
+                       "expira_en": datetime.utcnow() + self.ttl}
+            self._sessions[session_id] = session
+            return dict(session)
+    
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session["expira_en"] <= datetime.utcnow():
+                return None
+            return dict(session)
+    
+    def transition(self, session_id: str, estado: str) -> bool:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if (session is None or session["expira_en"] <= datetime.utcnow()
+                    or session["estado"] not in TRANSICIONES.get(estado, ())):
+                return False
+            session["estado"] = estado
+            session["expira_en"] = datetime.utcnow() + self.ttl
+            return True
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+    
+    def _purge(self, now: datetime) -> None:
+        expired = [key for key, session in self._sessions.items() if session["expira_en"] <= now]
+        for key in expired:
+            del self._sessions[key]
+
+
+class DatabaseSessionStore:
+    """
+    Sesiones en una tabla SQLAlchemy, compartidas entre procesos. El cambio de
+    estado es un UPDATE condicionado al estado actual (atómico en la base).
+    
+    model: clase declarativa con columnas id, user_id, estado, creado_en, expira_en
+    """
+    def __init__(self, session_factory: Callable, model, ttl_seconds: float = 86400):
+        self.session_factory = session_factory
+        self.model = model
+        self.ttl = timedelta(seconds=ttl_seconds)
+    
+    def create(self, session_id: str, user_id: Optional[int] = None) -> Dict:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            # Borrar las sesiones abandonadas al crear una nueva
+            db.query(self.model).filter(self.model.expira_en <= now).delete(synchronize_session=False)
+            row = self.model(id=session_id, user_id=user_id, estado=ESTADO_GRABANDO,
+                             creado_en=now, expira_en=now + self.ttl)
+            db.merge(row)
+            db.commit()
+            return self._to_dict(row)
+        finally:
+            db.close()
+    
+    def get(self, session_id: str) -> Optional[Dict]:
+        db = self.session_factory()
+        try:
+            row = db.query(self.model).filter(
+                self.model.id == session_id,
+                self.model.expira_en > datetime.utcnow()
+            ).first()
+            return self._to_dict(row) if row else None
+        finally:
+            db.close()
+    
+    def transition(self, session_id: str, estado: str) -> bool:
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            updated = db.query(self.model).filter(
+                self.model.id == session_id,
+                self.model.expira_en > now,
+                self.model.estado.in_(TRANSICIONES.get(estado, ()))
+            ).update({"estado": estado, "expira_en": now + self.ttl}, synchronize_session=False)
+            db.commit()
+            return updated == 1
+        finally:
+            db.close()
+    
+    def clear(self) -> None:
+        db = self.session_factory()
+        try:
+            db.query(self.model).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+    
+    def _to_dict(self, row) -> Dict:
+        return {"id": row.id, "user_id": row.user_id, "estado": row.estado, "expira_en": row.expira_en}
+
+
+class RedisSessionStore:
+    """
+    Sesiones como hashes de Redis con expiración nativa (EXPIRE). El cambio de
+    estado es un script Lua: Redis lo ejecuta sin intercalar otros comandos
+    """
+    _PREFIX = "sesion:"
+    
+    # KEYS[1]: sesión; ARGV[1]: ttl; ARGV[2]: estado destino; ARGV[3..]: estados de origen
+    _TRANSITION = """
+    local actual = redis.call('HGET', KEYS[1], 'estado')
+    if not actual then return 0 end
+    for i = 3, #ARGV do
+        if ARGV[i] == actual then
+            redis.call('HSET', KEYS[1], 'estado', ARGV[2])
+            redis.call('EXPIRE', KEYS[1], ARGV[1])
+            return 1
+        end
+    end
+    return 0
+    """
+    
+    def __init__(self, url: str, ttl_seconds: float = 86400):
+        if redis is None:
+            raise RuntimeError("redis no está instalado")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = int(ttl_seconds)
+        self._transition = self.client.register_script(self._TRANSITION)
+    
+    def create(self, session_id: str, user_id: Optional[int] = None) -> Dict:
+        key = self._PREFIX + session_id
+        pipe = self.client.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={"estado": ESTADO_GRABANDO, "user_id": "" if user_id is None else str(user_id)})
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+        return {"id": session_id, "user_id": user_id, "estado": ESTADO_GRABANDO,
+                "expira_en": datetime.utcnow() + timedelta(seconds=self.ttl)}
+    
+    def get(self, session_id: str) -> Optional[Dict]:
+        key = self._PREFIX + session_id
+        pipe = self.client.pipeline()
+        pipe.hgetall(key)
+        pipe.ttl(key)
+        data, ttl = pipe.execute()
+        if not data:
+            return None
+        return {"id": session_id, "user_id": int(data["user_id"]) if data.get("user_id") else None,
+                "estado": data["estado"], "expira_en": datetime.utcnow() + timedelta(seconds=max(ttl, 0))}
+    
+    def transition(self, session_id: str, estado: str) -> bool:
+        origins = TRANSICIONES.get(estado, ())
+        if not origins:
+            return False
+        return bool(self._transition(keys=[self._PREFIX + session_id], args=[self.ttl, estado, *origins]))
+    
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self._PREFIX + "*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_session_store(backend: str, session_factory: Optional[Callable] = None, model=None,
+                         redis_url: str = "", ttl_seconds: float = 86400):
+    """Store configurado; si no se puede crear, en memoria (un solo worker de la API)"""
+    try:
+        if backend == "redis":
+            if not redis_url:
+                raise ValueError("SESIONES_REDIS_URL no está definida")
+            store = RedisSessionStore(redis_url, ttl_seconds)
+            store.client.ping()
+            return store
+        if backend == "db":
+            return DatabaseSessionStore(session_factory, model, ttl_seconds)
+        if backend != "memoria":
+            raise ValueError(f"backend desconocido: {backend}")
+    except Exception as e:
+        logger.warning(f"Store de sesiones '{backend}' no disponible ({e}), se usa memoria")
+    return MemorySessionStore(ttl_seconds)
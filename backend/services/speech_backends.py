@@ -0,0 +1,167 @@
+"""
+Backends de reconocimiento de voz intercambiables para AudioAnalyzer:
+- "google": Google Web Speech vía SpeechRecognition (remoto, sin key)
+- "http": servidor propio (p.ej. un servidor local de prueba) que recibe WAV
+  y responde JSON {"transcripcion": "..."}
+- "vosk": reconocimiento offline en CPU (Kaldi), sin red
+Todos reciben PCM s16le mono y retornan el texto reconocido, con tiempos por
+palabra si el motor los entrega
+"""
+import abc
+import json
+import threading
+from typing import Dict, List, NamedTuple, Optional
+import logging
+
+import requests
+import speech_recognition as sr
+
+from .speech_timeline import Word
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+try:
+    import vosk
+    vosk.SetLogLevel(-1)
+except ImportError:  # Vosk es opcional: solo se necesita con ANALISIS_ASR=vosk
+    vosk = None
+
+# Modelos de Vosk cargados en el proceso (uno por ruta, compartidos entre hilos)
+_vosk_models: Dict[str, "vosk.Model"] = {}
+_vosk_lock = threading.Lock()
+
+
+class Transcript(NamedTuple):
+    text: str
+    words: Optional[List[Word]] = None  # Tiempos relativos al inicio del audio recibido
+
+
+class SpeechBackend(abc.ABC):
+    """
+    Interfaz de los backends. sample_rate es la frecuencia nativa del motor:
+    el audio se entrega ya convertido a esa frecuencia
+    """
+    name = "base"
+    sample_rate = 16000
+    
+    @abc.abstractmethod
+    def transcribe(self, pcm: bytes, sample_rate: int) -> Transcript:
+        """Texto reconocido en pcm (s16le mono a sample_rate)"""
+
+
+class GoogleSpeechBackend(SpeechBackend):
+    """
+    recognizer: sr.Recognizer compartido (su operation_timeout acota cada petición)
+    """
+    name = "google"
+    
+    def __init__(self, recognizer: sr.Recognizer, language: str = "es-ES"):
+        self.recognizer = recognizer
+        self.language = language
+    
+    def transcribe(self, pcm: bytes, sample_rate: int) -> Transcript:
+        audio_data = sr.AudioData(pcm, sample_rate, 2)
+        try:
+            # Usar Google API (gratis, sin key para uso básico); sin tiempos por palabra
+            return Transcript(self.recognizer.recognize_google(audio_data, language=self.language))
+        except sr.UnknownValueError:
+            logger.warning("No se pudo entender el audio")
+            return Transcript("")
+        except sr.RequestError as e:
+            logger.error(f"Error en el servicio de reconocimiento: {e}")
+            return Transcript("")
+
+
+class HTTPSpeechBackend(SpeechBackend):
+    """
+    url: endpoint que recibe un POST con el WAV (audio/wav) y el idioma como
+         parámetro, y responde {"transcripcion": "..."} y opcionalmente
+         "palabras": [{"texto", "inicio", "fin"}] en segundos
+    """
+    name = "http"
+    
+    def __init__(self, url: str, language: str = "es-ES", timeout: Optional[float] = None):
+        self.url = url
+        self.language = language
+        self.timeout = timeout
+        self.session = requests.Session()
+    
+    def transcribe(self, pcm: bytes, sample_rate: int) -> Transcript:
+        wav = sr.AudioData(pcm, sample_rate, 2).get_wav_data()
+        try:
+            response = self.session.post(
+                self.url, data=wav, params={"idioma": self.language},
+                headers={"Content-Type": "audio/wav"}, timeout=self.timeout
+            )
+            response.raise_for_status()
+            body = response.json()
+            words = body.get("palabras")
+            if words is not None:
+                words = [Word(word["texto"], float(word["inicio"]), float(word["fin"])) for word in words]
+            return Transcript(body.get("transcripcion", ""), words)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.error(f"Error en el servicio de reconocimiento: {e}")
+            return Transcript("")
+
+
+class VoskSpeechBackend(SpeechBackend):
+    """
+    model_path: carpeta del modelo (p.ej. vosk-model-small-es-0.42).
+    El modelo se carga una vez por proceso; cada fragmento usa su propio
+    KaldiRecognizer, alimentado por bloques como en un stream
+    """
+    name = "vosk"
+    
+    # Bytes de PCM por llamada a AcceptWaveform (0.25 s a 16 kHz)
+    _BLOCK_BYTES = 8000
+    
+    def __init__(self, model_path: str, sample_rate: int = 16000):
+        if vosk is None:
+            raise RuntimeError("Vosk no está instalado")
+        self.sample_rate = sample_rate
+        with _vosk_lock:
+            if model_path not in _vosk_models:
+                logger.info(f"Cargando modelo de Vosk: {model_path}")
+                _vosk_models[model_path] = vosk.Model(model_path)
+        self.model = _vosk_models[model_path]
+    
+    def transcribe(self, pcm: bytes, sample_rate: int) -> Transcript:
+        try:
+            recognizer = vosk.KaldiRecognizer(self.model, sample_rate)
+            recognizer.SetWords(True)  # Tiempos por palabra
+            results = []
+            for offset in range(0, len(pcm), self._BLOCK_BYTES):
+                # True al cerrar una frase (pausa detectada por el decodificador)
+                if recognizer.AcceptWaveform(pcm[offset:offset + self._BLOCK_BYTES]):
+                    results.append(json.loads(recognizer.Result()))
+            results.append(json.loads(recognizer.FinalResult()))
+            
+            words = [
+                Word(word["word"], float(word["start"]), float(word["end"]))
+                for result in results for word in result.get("result", [])
+            ]
+            text = " ".join(result.get("text", "") for result in results if result.get("text"))
+            return Transcript(text, words)
+        except Exception as e:
+            logger.error(f"Error en el reconocimiento offline: {e}")
+            return Transcript("")
+
+
+def create_speech_backend(recognizer: sr.Recognizer, name: Optional[str] = None) -> SpeechBackend:
+    """Backend configurado en ANALISIS_ASR; si no se puede crear, Google"""
+    from . import config
+    name = name or config.ANALISIS_ASR
+    try:
+        if name == "vosk":
+            return VoskSpeechBackend(config.ANALISIS_ASR_MODELO_VOSK)
+        if name == "http":
+            if not config.ANALISIS_ASR_URL:
+                raise ValueError("ANALISIS_ASR_URL no está definida")
+            return HTTPSpeechBackend(config.ANALISIS_ASR_URL, config.ANALISIS_ASR_IDIOMA,
+                                     timeout=config.ANALISIS_TIMEOUT_AUDIO or None)
+        if name != "google":
+            raise ValueError(f"motor desconocido: {name}")
+    except Exception as e:
+        logger.warning(f"Backend de reconocimiento '{name}' no disponible ({e}), se usa Google")
+    return GoogleSpeechBackend(recognizer, config.ANALISIS_ASR_IDIOMA)
@@ -0,0 +1,95 @@
+"""
+Línea de tiempo del habla: palabras por minuto por ventana, posición de las
+muletillas y pausas entre palabras. Se construye de forma incremental, un
+fragmento transcrito a la vez, para que el frontend la dibuje sin reanalizar
+"""
+import math
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Word(NamedTuple):
+    text: str
+    start: float  # segundos
+    end: float
+
+
+def spread_words(text: str, start: float, end: float) -> List[Word]:
+    """
+    Tiempos estimados cuando el motor no da tiempos por palabra: las palabras
+    del fragmento se reparten de forma uniforme entre su inicio y su fin
+    """
+    tokens = text.split()
+    if not tokens:
+        return []
+    step = (end - start) / len(tokens)
+    return [Word(token, start + i * step, start + (i + 1) * step) for i, token in enumerate(tokens)]
+
+
+class SpeechTimeline:
+    """
+    window_seconds: ancho de las ventanas de palabras por minuto
+    pause_seconds: silencio mínimo entre palabras para contar una pausa
+    find_fillers: texto -> [(offset del carácter, muletilla)] en minúsculas
+    """
+    def __init__(self, find_fillers: Callable[[str], List[Tuple[int, str]]],
+                 window_seconds: float = 10, pause_seconds: float = 0.5):
+        self.find_fillers = find_fillers
+        self.window_seconds = window_seconds
+        self.pause_seconds = pause_seconds
+        self._window_words: Dict[int, int] = {}
+        self._fillers: List[Dict] = []
+        self._pauses: List[Dict] = []
+        self._last_end: Optional[float] = None
+        self.word_level = True
+    
+    def add_fragment(self, words: List[Word], word_level: bool = True) -> None:
+        """
+        Incorpora las palabras de un fragmento (en orden, tiempos absolutos)
+        word_level: False si los tiempos son estimados a nivel de fragmento
+        """
+        if not words:
+            return
+        self.word_level = self.word_level and word_level
+        
+        for word in words:
+            window = int(word.start // self.window_seconds)
+            self._window_words[window] = self._window_words.get(window, 0) + 1
+            if self._last_end is not None and word.start - self._last_end >= self.pause_seconds:
+                self._pauses.append({
+                    "inicio": round(self._last_end, 2),
+                    "duracion": round(word.start - self._last_end, 2)
+                })
+            self._last_end = max(word.end, self._last_end or 0.0)
+        
+        # Muletillas: offset del carácter -> palabra que lo contiene -> su tiempo
+        text = " ".join(word.text for word in words).lower()
+        word_offsets = []
+        offset = 0
+        for word in words:
+            word_offsets.append(offset)
+            offset += len(word.text) + 1
+        index = 0
+        for char_offset, filler in sorted(self.find_fillers(text)):
+            while index + 1 < len(word_offsets) and word_offsets[index + 1] <= char_offset:
+                index += 1
+            self._fillers.append({"segundo": round(words[index].start, 2), "texto": filler})
+    
+    def to_dict(self, duration_seconds: float) -> Dict:
+        windows = math.ceil(duration_seconds / self.window_seconds) if duration_seconds > 0 else 0
+        wpm = []
+        for window in range(windows):
+            # La última ventana puede ser más corta
+            length = min(self.window_seconds, duration_seconds - window * self.window_seconds)
+            count = self._window_words.get(window, 0)
+            wpm.append(round(count * 60 / length, 1) if length > 0 else 0.0)
+        return {
+            "ventana_segundos": self.window_seconds,
+            "palabras_por_minuto": wpm,
+            "muletillas": sorted(self._fillers, key=lambda filler: filler["segundo"]),
+            "pausas": self._pauses,
+            "precision": "palabra" if self.word_level else "fragmento"
+        }
@@ -0,0 +1,230 @@
+"""
+Descarga en streaming: los bytes de la respuesta HTTP se entregan al decodificador
+por un pipe mientras la cola del archivo todavía se está descargando
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Firma EBML de Matroska/WebM (contenedores que siempre se pueden leer en secuencia)
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+def is_streamable(prefix: bytes) -> Optional[bool]:
+    """
+    Decide si el contenedor se puede decodificar leyendo en secuencia.
+    MP4: streamable si 'moov' (faststart) o 'moof' (fragmentado) aparece antes de 'mdat'.
+    Returns: True / False, o None si el prefijo no alcanza para decidir
+    """
+    if prefix[:4] == EBML_MAGIC:
+        return True
+    if len(prefix) >= 8 and prefix[4:8] != b"ftyp":
+        return False  # Contenedor desconocido: usar archivo temporal
+    
+    pos = 0
+    while pos + 8 <= len(prefix):
+        size = int.from_bytes(prefix[pos:pos + 4], "big")
+        box_type = prefix[pos + 4:pos + 8]
+        if box_type in (b"moov", b"moof"):
+            return True
+        if box_type == b"mdat":
+            return False
+        if size == 1:
+            # Tamaño extendido de 64 bits
+            if pos + 16 > len(prefix):
+                return None
+            size = int.from_bytes(prefix[pos + 8:pos + 16], "big")
+        if size < 8:
+            return False  # size 0 = hasta el final del archivo; no hay moov antes
+        pos += size
+    return None
+
+
+def _moov_end(prefix: bytes) -> Optional[int]:
+    """Fin de la caja 'moov' de primer nivel, o None si el prefijo no la incluye"""
+    pos = 0
+    while pos + 8 <= len(prefix):
+        size = int.from_bytes(prefix[pos:pos + 4], "big")
+        if size == 1:
+            if pos + 16 > len(prefix):
+                return None
+            size = int.from_bytes(prefix[pos + 8:pos + 16], "big")
+        if size < 8:
+            return None
+        if prefix[pos + 4:pos + 8] == b"moov":
+            return pos + size
+        pos += size
+    return None
+
+
+def mp4_rotation(prefix: bytes) -> int:
+    """
+    Rotación de visualización (0, 90, 180 o 270) según la matriz de los 'tkhd'
+    del prefijo. En streaming el decodificador no puede consultar el archivo,
+    y la 'moov' de un MP4 streamable va al inicio. 0 si no hay matriz girada
+    """
+    pos = prefix.find(b"tkhd")
+    while pos >= 4:
+        version = prefix[pos + 4] if pos + 4 < len(prefix) else 0
+        # versión+flags, fechas, track_id, reservado y duración; luego 16 bytes hasta la matriz
+        matrix = pos + 4 + 4 + (32 if version == 1 else 20) + 16
+        if matrix + 36 > len(prefix):
+            break
+        a, b = (int.from_bytes(prefix[matrix + i:matrix + i + 4], "big", signed=True) for i in (0, 4))
+        rotation = {(0, 1): 90, (-1, 0): 180, (0, -1): 270}.get((a >> 16, b >> 16), 0)
+        if rotation:
+            return rotation
+        pos = prefix.find(b"tkhd", pos + 4)
+    return 0
+
+
+class _PipeReader:
+    """
+    Extremo de lectura del pipe. Solo expone read() para que PyAV lo trate
+    como entrada no buscable (igual que un pipe de ffmpeg)
+    """
+    def __init__(self, fd: int):
+        self._file = os.fdopen(fd, "rb")
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+    
+    def close(self):
+        try:
+            self._file.close()
+        except Exception:
+            pass
+
+
+class StreamingDownload:
+    """
+    Copia el resto de la respuesta al pipe en un hilo aparte.
+    
+    prefix: bytes ya leídos de la respuesta (para detectar el contenedor)
+    chunks: iterador con el resto del cuerpo
+    spool: guardar en memoria lo enviado al pipe hasta stop_spooling(), para
+           seguir la descarga a archivo (to_file) si el decodificador no abre
+           el contenedor, sin volver a pedir esos bytes
+    """
+    def __init__(self, prefix: bytes, chunks: Iterator[bytes], spool: bool = False):
+        read_fd, write_fd = os.pipe()
+        self.reader = _PipeReader(read_fd)
+        self._writer = os.fdopen(write_fd, "wb", buffering=0)
+        self._prefix = prefix
+        self._chunks = chunks
+        self.bytes_total = 0
+        self.sha256 = hashlib.sha256()  # Hash del contenido para la caché
+        self.error: Optional[str] = None
+        self.complete = False
+        self.seconds = 0.0
+        self.path: Optional[str] = None  # Archivo temporal tras to_file()
+        self._spool: Optional[List[bytes]] = [] if spool else None
+        self._file = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stream-download", daemon=True)
+    
+    def start(self) -> "StreamingDownload":
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        inicio = time.perf_counter()
+        try:
+            self._write(self._prefix)
+            for chunk in self._chunks:
+                if chunk:
+                    self._write(chunk)
+            self.complete = True
+        except BrokenPipeError:
+            # El decodificador cerró el pipe (análisis terminado o cancelado)
+            logger.info("Descarga en streaming interrumpida por el decodificador")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Error en descarga en streaming: {self.error}")
+        finally:
+            self.seconds = time.perf_counter() - inicio
+            for stream in (self._writer, self._file):
+                try:
+                    if stream is not None:
+                        stream.close()
+                except Exception:
+                    pass
+            self._done.set()
+    
+    def _write(self, data: bytes):
+        self.sha256.update(data)
+        self.bytes_total += len(data)
+        with self._lock:
+            if self._spool is not None:
+                self._spool.append(data)
+            file = self._file
+        if file is not None:
+            file.write(data)
+            return
+        try:
+            self._writer.write(data)
+        except BrokenPipeError:
+            # Si se pasó a archivo mientras se escribía, estos bytes ya están en el spool
+            if self._file is None:
+                raise
+    
+    def stop_spooling(self) -> None:
+        """El decodificador abrió el contenedor: no hace falta guardar más bytes"""
+        with self._lock:
+            self._spool = None
+    
+    def to_file(self) -> str:
+        """
+        Sigue la descarga a un archivo temporal: los bytes ya enviados al pipe
+        salen del spool y el resto se escribe a continuación. Esperar con wait()
+        Returns: ruta del archivo
+        """
+        with self._lock:
+            if self._spool is None:
+                raise RuntimeError("to_file requiere spool=True antes de stop_spooling()")
+            f = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+            for data in self._spool:
+                f.write(data)
+            self._spool = None
+            self._file = f
+            self.path = f.name
+        # Desbloquea al escritor si estaba esperando en el pipe
+        self.reader.close()
+        return self.path
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+    
+    def close(self):
+        self.reader.close()
+        self._thread.join(timeout=5)
+
+
+def peek_container(chunks: Iterator[bytes], max_bytes: int = 4 * 1024 * 1024) -> Tuple[bytes, Optional[bool]]:
+    """
+    Lee del iterador lo justo para decidir si el contenedor es streamable. En un
+    MP4 streamable sigue hasta completar la 'moov', donde está la matriz de
+    rotación que lee mp4_rotation (la decisión llega con su encabezado).
+    Returns: (prefijo leído, streamable)
+    """
+    prefix = b""
+    streamable = None
+    for chunk in chunks:
+        prefix += chunk
+        if streamable is None:
+            streamable = is_streamable(prefix)
+        if streamable is not None:
+            end = _moov_end(prefix) if streamable and prefix[4:8] == b"ftyp" else None
+            if end is None or end <= len(prefix):
+                break
+        if len(prefix) >= max_bytes:
+            break
+    return prefix, streamable
@@ -0,0 +1,179 @@
+"""
+Estadísticos acumulables y combinables para agregar métricas por bloques o por
+segmentos de video en memoria constante: media y varianza de Welford con mínimo
+y máximo, y un sketch de cuantiles (t-digest con fusión). Ambos tienen un modo
+exacto que guarda los valores, para calibrar contra NumPy
+"""
+import math
+from typing import List, Optional
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class RunningStats:
+    """
+    Media, desviación estándar (ddof=0, como np.std) y rango de una serie sin
+    guardarla: Welford por bloques y combinación de Chan et al.
+    exact: guardar los valores y calcular con NumPy (modo de calibración)
+    """
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        self.count = 0
+        self._mean = 0.0
+        self._m2 = 0.0  # Suma de cuadrados de las diferencias respecto a la media
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._values: List[np.ndarray] = []
+    
+    def add(self, values: np.ndarray) -> None:
+        values = np.array(values, dtype=np.float64).ravel()  # Copia: el bloque de origen se reutiliza
+        if len(values) == 0:
+            return
+        if self.exact:
+            self._values.append(values)
+        mean = float(values.mean())
+        self._combine(len(values), mean, float(np.square(values - mean).sum()))
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+    
+    def merge(self, other: "RunningStats") -> None:
+        if other.count == 0:
+            return
+        self._values.extend(other._values)
+        self._combine(other.count, other._mean, other._m2)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+    
+    def _combine(self, count: int, mean: float, m2: float) -> None:
+        total = self.count + count
+        delta = mean - self._mean
+        self._mean += delta * count / total
+        self._m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+    
+    def _exact_values(self) -> Optional[np.ndarray]:
+        if self.exact and self._values:
+            return np.concatenate(self._values)
+        return None
+    
+    @property
+    def mean(self) -> float:
+        values = self._exact_values()
+        if values is not None:
+            return float(values.mean())
+        return self._mean if self.count else 0.0
+    
+    @property
+    def std(self) -> float:
+        values = self._exact_values()
+        if values is not None:
+            return float(values.std())
+        return math.sqrt(self._m2 / self.count) if self.count else 0.0
+    
+    @property
+    def ptp(self) -> float:
+        return self.maximum - self.minimum if self.count else 0.0
+
+
+class QuantileSketch:
+    """
+    Sketch de cuantiles combinable (t-digest con fusión, escala k1).
+    compression: cota aproximada de centroides; más alto = más preciso
+    exact: guardar los valores y usar np.percentile (modo de calibración)
+    """
+    def __init__(self, compression: float = 100, exact: bool = False):
+        self.compression = compression
+        self.exact = exact
+        self._values: List[np.ndarray] = []
+        self.count = 0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._pending: List[np.ndarray] = []
+        self._pending_weights: List[np.ndarray] = []
+        self._pending_count = 0
+    
+    def add(self, values: np.ndarray) -> None:
+        values = np.array(values, dtype=np.float64).ravel()  # Copia: el bloque de origen se reutiliza
+        if len(values) == 0:
+            return
+        if self.exact:
+            self._values.append(values)
+        self._push(values, np.ones(len(values)))
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+    
+    def merge(self, other: "QuantileSketch") -> None:
+        self._values.extend(other._values)
+        other._compress()
+        if other.count == 0:
+            return
+        self._push(other._means, other._weights)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+    
+    def _push(self, means: np.ndarray, weights: np.ndarray) -> None:
+        self._pending.append(means)
+        self._pending_weights.append(weights)
+        self._pending_count += len(means)
+        self.count += int(weights.sum())
+        if self._pending_count >= 5 * self.compression:
+            self._compress()
+    
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+    
+    def _compress(self) -> None:
+        if not self._pending:
+            return
+        means = np.concatenate([self._means] + self._pending)
+        weights = np.concatenate([self._weights] + self._pending_weights)
+        self._pending, self._pending_weights, self._pending_count = [], [], 0
+        
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        
+        # Fusionar centroides vecinos mientras quepan en una unidad de la escala k
+        merged_means, merged_weights = [], []
+        current_mean, current_weight = means[0], weights[0]
+        cumulative = 0.0
+        k_low = self._k(0.0)
+        for mean, weight in zip(means[1:], weights[1:]):
+            if self._k((cumulative + current_weight + weight) / total) - k_low <= 1:
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                merged_means.append(current_mean)
+                merged_weights.append(current_weight)
+                cumulative += current_weight
+                k_low = self._k(cumulative / total)
+                current_mean, current_weight = mean, weight
+        merged_means.append(current_mean)
+        merged_weights.append(current_weight)
+        self._means = np.array(merged_means)
+        self._weights = np.array(merged_weights)
+    
+    def quantile(self, q: float) -> Optional[float]:
+        """q en [0, 1]; None si el sketch está vacío"""
+        if self.exact and self._values:
+            return float(np.percentile(np.concatenate(self._values), q * 100))
+        self._compress()
+        if self.count == 0:
+            return None
+        if len(self._means) == 1:
+            return float(self._means[0])
+        
+        # Interpolar entre los centros de masa de los centroides (extremos: min y max)
+        centers = np.cumsum(self._weights) - self._weights / 2
+        positions = np.concatenate([[0.0], centers, [self._weights.sum()]])
+        values = np.concatenate([[self.minimum], self._means, [self.maximum]])
+        return float(np.interp(q * self._weights.sum(), positions, values))
+    
+    def quantiles(self, qs: List[float]) -> List[Optional[float]]:
+        return [self.quantile(q) for q in qs]
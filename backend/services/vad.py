@@ -0,0 +1,146 @@
+"""
+Detección de actividad de voz (VAD) sobre PCM s16le mono, vectorizada con
+NumPy: energía y tasa de cruces por cero por trama. Recorta los silencios
+del inicio y el final, entrega los tramos de voz al reconocimiento y mide
+las pausas del discurso
+"""
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Tramas procesadas por bloque: acota la memoria en audios largos (~60 s a 30 ms)
+_BLOCK_FRAMES = 2000
+
+# Energía mínima para considerar voz, aunque el ruido de fondo sea menor (dBFS)
+_MIN_SPEECH_DB = -50.0
+
+# Cruces por cero por muestra desde los que una trama débil cuenta como
+# consonante sorda (s, f, j) y no como silencio
+_FRICATIVE_ZCR = 0.25
+
+# Límites de la distribución de pausas (segundos)
+_PAUSE_BUCKETS = ((1.0, "cortas"), (2.0, "medias"), (float("inf"), "largas"))
+
+
+def frame_features(pcm: bytes, sample_rate: int, frame_ms: int = 30) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Energía (dBFS) y cruces por cero por muestra de cada trama del audio
+    Returns: (energia_db, zcr), un valor por trama completa
+    """
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    frame = max(1, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // frame
+    energy = np.empty(count, dtype=np.float32)
+    zcr = np.empty(count, dtype=np.float32)
+    
+    for first in range(0, count, _BLOCK_FRAMES):
+        last = min(count, first + _BLOCK_FRAMES)
+        block = samples[first * frame:last * frame].reshape(last - first, frame).astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(block * block, axis=1))
+        energy[first:last] = 20 * np.log10(np.maximum(rms, 1e-10))
+        signs = np.signbit(block)
+        zcr[first:last] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame
+    return energy, zcr
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Inicio y fin (exclusivo) de cada tramo de True consecutivos"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+class VoiceActivity:
+    """
+    Tramos de voz de un audio, en segundos y en orden.
+    duration: duración total del audio analizado
+    """
+    def __init__(self, segments: List[Tuple[float, float]], duration: float):
+        self.segments = segments
+        self.duration = duration
+    
+    @property
+    def speech_seconds(self) -> float:
+        """Tiempo con voz (sin pausas ni silencios)"""
+        return sum(end - start for start, end in self.segments)
+    
+    @property
+    def trimmed_seconds(self) -> float:
+        """Desde el primer hasta el último tramo de voz (sin silencio inicial ni final)"""
+        if not self.segments:
+            return 0.0
+        return self.segments[-1][1] - self.segments[0][0]
+    
+    def pauses(self, min_seconds: float = 0.5) -> List[Tuple[float, float]]:
+        """Silencios entre tramos de voz de al menos min_seconds: (inicio, duración)"""
+        return [
+            (end, start - end)
+            for (_, end), (start, _) in zip(self.segments, self.segments[1:])
+            if start - end >= min_seconds
+        ]
+    
+    def segments_ms(self) -> List[Tuple[int, int]]:
+        return [(int(start * 1000), int(end * 1000)) for start, end in self.segments]
+    
+    def pause_metrics(self, min_seconds: float = 0.5) -> Dict:
+        """Cantidad de pausas, duración media y máxima, y su distribución por duración"""
+        durations = np.array([duration for _, duration in self.pauses(min_seconds)])
+        distribution = dict.fromkeys((label for _, label in _PAUSE_BUCKETS), 0)
+        lower = 0.0
+        for upper, label in _PAUSE_BUCKETS:
+            distribution[label] = int(np.count_nonzero((durations >= lower) & (durations < upper)))
+            lower = upper
+        return {
+            "total": int(durations.size),
+            "media_segundos": round(float(durations.mean()), 2) if durations.size else 0.0,
+            "maxima_segundos": round(float(durations.max()), 2) if durations.size else 0.0,
+            "segundos_en_pausa": round(float(durations.sum()), 1),
+            "distribucion": distribution
+        }
+
+
+def detect_voice(pcm: bytes, sample_rate: int, frame_ms: int = 30, margin_db: float = 12.0,
+                 min_silence_ms: int = 200, min_speech_ms: int = 100) -> VoiceActivity:
+    """
+    pcm: audio s16le mono
+    margin_db: cuánto por encima del ruido de fondo debe estar una trama para ser voz
+    min_silence_ms: silencios más cortos quedan dentro del tramo de voz
+    min_speech_ms: tramos de voz más cortos se descartan (golpes, clics)
+    """
+    duration = len(pcm) / (2 * sample_rate) if sample_rate else 0.0
+    energy, zcr = frame_features(pcm, sample_rate, frame_ms)
+    if energy.size == 0:
+        return VoiceActivity([], duration)
+    
+    # Umbral adaptativo: ruido de fondo (percentil bajo) + margen, sin superar
+    # el nivel de la voz (percentil alto) cuando el audio casi no tiene silencios
+    floor, loud = np.percentile(energy, [10, 95])
+    threshold = max(min(floor + margin_db, loud - 6.0), _MIN_SPEECH_DB)
+    voiced = (energy > threshold) | ((energy > threshold - 6.0) & (zcr > _FRICATIVE_ZCR))
+    
+    starts, ends = _runs(voiced)
+    if starts.size:
+        # Unir los tramos separados por silencios cortos
+        keep = (starts[1:] - ends[:-1]) * frame_ms >= min_silence_ms
+        starts = starts[np.concatenate(([True], keep))]
+        ends = ends[np.concatenate((keep, [True]))]
+        # Descartar los tramos demasiado cortos para ser habla
+        long_enough = (ends - starts) * frame_ms >= min_speech_ms
+        starts, ends = starts[long_enough], ends[long_enough]
+    
+    seconds = frame_ms / 1000
+    segments = [(float(start * seconds), float(end * seconds)) for start, end in zip(starts, ends)]
+    logger.info(f"VAD: {len(segments)} tramos de voz, umbral {threshold:.1f} dBFS")
+    return VoiceActivity(segments, duration)
+
+
+def detect_voice_from_config(pcm: bytes, sample_rate: int) -> Optional[VoiceActivity]:
+    """VAD con los parámetros de config; None si está deshabilitado (ANALISIS_VAD=0)"""
+    from . import config
+    if not config.ANALISIS_VAD:
+        return None
+    return detect_voice(pcm, sample_rate, margin_db=config.ANALISIS_VAD_MARGEN_DB,
+                        min_silence_ms=config.ANALISIS_VAD_SILENCIO_MS)
@@ -1,258 +1,465 @@
 """
 Análisis de video usando MediaPipe Face Mesh para análisis visual completo
 """
-import cv2
-import mediapipe as mp
+import threading
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 import logging
+from . import config
+from .landmarks import LandmarkBackend, create_backend
+from .frame_sampler import FrameSampler
+from .frame_preprocess import FramePreprocessor, PreparedFrame
+from .streaming_stats import QuantileSketch, RunningStats
+from .video_segments import SegmentPool
+from .frame_source import open_video, probe_video
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Índices de Face Mesh (con iris) usados por los rasgos geométricos
+# Iris: 469 (centro izquierdo), 474 (centro derecho)
+# Esquinas de ojos: 33/133 (izquierdo), 263/362 (derecho). En el derecho 362 tiene
+# MAYOR X que 263, por eso el orden es (263, 362)
+# Párpados (superior, inferior): 159/145 (izquierdo), 386/374 (derecho)
+# Boca: 13 (labio superior), 14 (labio inferior)
+_IRIS = np.array([469, 474])
+_EYE_CORNERS = np.array([[33, 133], [263, 362]])
+_EYE_LIDS = np.array([[159, 145], [386, 374]])
+_LIPS = (13, 14)
+_EYEBROWS = np.array([70, 63, 105, 66, 107, 300, 293, 334, 296, 336])
+_NOSE_TIP = 1
+
+# Pose: hombros izquierdo y derecho
+_LEFT_SHOULDER, _RIGHT_SHOULDER = 11, 12
+
+# Columnas de la matriz de rasgos: una fila por frame analizado (NaN = no disponible)
+FRAME_FEATURES = np.dtype([
+    ("frame", np.int32),  # Número de frame en el video original
+    ("has_face", np.bool_),
+    ("has_hands", np.bool_),
+    ("has_pose", np.bool_),
+    ("dev_left", np.float64),  # Desviación del iris respecto al centro del ojo
+    ("dev_right", np.float64),
+    ("mouth", np.float64),  # Apertura vertical de la boca
+    ("eyebrow", np.float64),  # Distancia cejas-ojos
+    ("eye_open", np.float64),  # Apertura media de los párpados
+    ("nose_x", np.float64),
+    ("nose_y", np.float64),
+    ("head_movement", np.float64),  # Respecto al frame con cara anterior
+    ("hand_movement", np.float64),  # 0 si no hay manos visibles
+    ("shoulder", np.float64),  # Diferencia de altura entre hombros
+])
+
+
+class _FeatureMatrix:
+    """
+    Bloque estructurado preasignado de filas de rasgos. Al llenarse se vuelca al
+    estado parcial y se reutiliza, así la memoria no crece con la duración
+    """
+    def __init__(self, capacity: int):
+        self._data = np.zeros(max(1, capacity), dtype=FRAME_FEATURES)
+        self._empty = np.zeros(1, dtype=FRAME_FEATURES)[0]
+        for name in FRAME_FEATURES.names:
+            if FRAME_FEATURES[name] == np.float64:
+                self._empty[name] = np.nan
+        self.size = 0
+    
+    @property
+    def full(self) -> bool:
+        return self.size == len(self._data)
+    
+    def clear(self) -> None:
+        self.size = 0
+    
+    def append(self, frame: int):
+        """Agrega una fila vacía y la retorna (vista) para completarla in-place"""
+        self._data[self.size] = self._empty
+        row = self._data[self.size]
+        row["frame"] = frame
+        self.size += 1
+        return row
+    
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+
+# Filas de rasgos por bloque antes de volcarlas a los estimadores acumulados
+_FEATURE_BLOCK = 512
+
+# Umbrales de la agregación
+_GAZE_OUTLIER = 2.0  # Desviación media del iris a partir de la cual es un error de detección
+_BLINK_OPEN, _BLINK_CLOSED = 0.15, 0.1  # Apertura de párpados: abierto -> cerrado = parpadeo
+
+
+def _head_movement(previous: Tuple[int, float, float], current: Tuple[int, float, float],
+                   aspect: float) -> float:
+    """
+    Movimiento de la nariz entre dos frames con cara: distancia relativa al ancho,
+    normalizada a 2 frames para que el umbral no dependa del paso de muestreo.
+    Con frames a 2 de distancia coincide con la métrica original (distancia en
+    píxeles / ancho, muestreando cada 2 frames): los umbrales de 0.02 siguen valiendo
+    previous, current: (frame, nariz_x, nariz_y); aspect: alto / ancho del frame
+    """
+    prev_index, prev_x, prev_y = previous
+    index, x, y = current
+    return float(np.hypot(x - prev_x, (y - prev_y) * aspect) * 2 / (index - prev_index))
+
+
+class VisualPartial:
+    """
+    Estado parcial combinable del análisis visual de un tramo de video: conteos,
+    estadísticos acumulados, sketches de cuantiles de la mirada y el estado en los
+    bordes del tramo (parpadeo y posición de la cabeza en el primer y último
+    frame con cara). Se llena con update() y se combina con merge().
+    
+    exact: los estimadores guardan los valores (calibración; memoria lineal)
+    """
+    def __init__(self, aspect: float = 1.0, exact: bool = False):
+        self.aspect = aspect  # alto / ancho del frame analizado
+        self.frames_read = 0
+        self.frames = 0
+        self.frames_with_face = 0
+        self.frames_with_hands = 0
+        
+        # Mirada: desviación media por frame (cruda y sin outliers) y máxima sin outliers
+        self.gaze_raw = RunningStats(exact)
+        self.gaze = RunningStats(exact)
+        self.gaze_max = RunningStats(exact)
+        self.gaze_sketch = QuantileSketch(exact=exact)
+        self.gaze_max_sketch = QuantileSketch(exact=exact)
+        self.contact_fallback = 0  # Frames con iris centrado en ambos ojos
+        
+        self.mouth = RunningStats(exact)
+        self.eyebrow = RunningStats(exact)
+        self.hand = RunningStats(exact)
+        self.head = RunningStats(exact)
+        self.shoulder = RunningStats(exact)
+        
+        self.blinks = 0
+        self.first_eye_open: Optional[float] = None
+        self.last_eye_open: Optional[float] = None
+        self.first_face: Optional[Tuple[int, float, float]] = None  # (frame, nariz_x, nariz_y)
+        self.last_face: Optional[Tuple[int, float, float]] = None
+    
+    def update(self, features: np.ndarray) -> None:
+        """Incorpora filas FRAME_FEATURES consecutivas, en orden de frame"""
+        if len(features) == 0:
+            return
+        self.frames += len(features)
+        self.frames_with_hands += int(np.count_nonzero(features["has_hands"]))
+        self.hand.add(features["hand_movement"])
+        self.shoulder.add(features["shoulder"][features["has_pose"]])
+        
+        face = features[features["has_face"]]
+        if len(face) == 0:
+            return
+        self.frames_with_face += len(face)
+        self.mouth.add(face["mouth"])
+        self.eyebrow.add(face["eyebrow"])
+        
+        # Mirada: frames con al menos un ojo con desviación > 0, sin outliers
+        deviations = np.stack([face["dev_left"], face["dev_right"]], axis=1)
+        self.contact_fallback += int(np.count_nonzero(deviations.mean(axis=1) < 0.15))
+        gaze = deviations[(deviations > 0).any(axis=1)]
+        if len(gaze):
+            avg_deviations = gaze.mean(axis=1)
+            valid = avg_deviations < _GAZE_OUTLIER
+            self.gaze_raw.add(avg_deviations)
+            self.gaze.add(avg_deviations[valid])
+            self.gaze_max.add(gaze.max(axis=1)[valid])
+            self.gaze_sketch.add(avg_deviations[valid])
+            self.gaze_max_sketch.add(gaze.max(axis=1)[valid])
+        
+        head = face["head_movement"]
+        self.head.add(head[~np.isnan(head)])
+        
+        # Parpadeo: abiertos en un frame con cara y cerrados en el siguiente,
+        # incluyendo el paso desde el último frame con cara ya incorporado
+        eye_open = face["eye_open"]
+        if self.last_eye_open is not None:
+            eye_open = np.concatenate([[self.last_eye_open], eye_open])
+        self.blinks += int(np.count_nonzero((eye_open[:-1] > _BLINK_OPEN) & (eye_open[1:] < _BLINK_CLOSED)))
+        
+        if self.first_face is None:
+            self.first_face = (int(face["frame"][0]), float(face["nose_x"][0]), float(face["nose_y"][0]))
+            self.first_eye_open = float(face["eye_open"][0])
+        self.last_face = (int(face["frame"][-1]), float(face["nose_x"][-1]), float(face["nose_y"][-1]))
+        self.last_eye_open = float(face["eye_open"][-1])
+    
+    def merge(self, other: "VisualPartial") -> None:
+        """Combina el parcial del tramo siguiente (other empieza donde termina este)"""
+        # Bordes: el primer frame con cara de other no tenía frame anterior en su tramo
+        if self.last_eye_open is not None and other.first_eye_open is not None:
+            if self.last_eye_open > _BLINK_OPEN and other.first_eye_open < _BLINK_CLOSED:
+                self.blinks += 1
+        if self.last_face is not None and other.first_face is not None:
+            self.head.add([_head_movement(self.last_face, other.first_face, self.aspect)])
+        
+        self.frames_read += other.frames_read
+        self.frames += other.frames
+        self.frames_with_face += other.frames_with_face
+        self.frames_with_hands += other.frames_with_hands
+        self.contact_fallback += other.contact_fallback
+        self.blinks += other.blinks
+        for name in ("gaze_raw", "gaze", "gaze_max", "gaze_sketch", "gaze_max_sketch",
+                     "mouth", "eyebrow", "hand", "head", "shoulder"):
+            getattr(self, name).merge(getattr(other, name))
+        
+        if self.first_face is None:
+            self.first_face, self.first_eye_open = other.first_face, other.first_eye_open
+        if other.last_face is not None:
+            self.last_face, self.last_eye_open = other.last_face, other.last_eye_open
+        if other.frames:
+            self.aspect = other.aspect
+
 
 class VideoAnalyzer:
-    def __init__(self):
-        # Inicializar MediaPipe Face Mesh
-        self.mp_face_mesh = mp.solutions.face_mesh
-        self.face_mesh = self.mp_face_mesh.FaceMesh(
-            static_image_mode=False,
-            max_num_faces=1,
-            refine_landmarks=True,  # Incluye iris para eye gaze
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Inicializar MediaPipe Hands
-        self.mp_hands = mp.solutions.hands
-        self.hands = self.mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=2,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Inicializar MediaPipe Pose
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
-        
-        # Landmarks clave para análisis
-        # Iris: 468-477 (iris izquierdo), 473-477 (iris derecho)
-        # Ojos: 33, 133 (izquierdo), 362, 263 (derecho)
-        # Boca: 61, 291, 0, 17
-        # Cejas: 70, 300
-        self.LEFT_IRIS = [469, 470, 471, 472]
-        self.RIGHT_IRIS = [474, 475, 476, 477]
-        self.LEFT_EYE = [33, 133, 160, 144]
-        self.RIGHT_EYE = [362, 263, 385, 380]
-        self.MOUTH = [61, 291, 0, 17, 13, 14]
-        self.EYEBROWS = [70, 63, 105, 66, 107, 300, 293, 334, 296, 336]
+    def __init__(self, landmarks: Optional[LandmarkBackend] = None,
+                 segments: Optional[SegmentPool] = None):
+        # Inferencia de MediaPipe (Face Mesh con iris, Hands, Pose): mp.solutions
+        # frame a frame o MediaPipe Tasks por lotes, según ANALISIS_MEDIAPIPE
+        self.landmarks = landmarks or create_backend()
+        
+        # Reducción de resolución y ROI de cara/torso antes de la inferencia
+        self.preprocessor = FramePreprocessor.from_config()
+        
+        # Videos largos por archivo: tramos en paralelo en procesos (None = una pasada)
+        self.segments = segments
+        
+        # Estimadores en memoria constante, o exactos para calibración
+        self.exact_stats = config.ANALISIS_ESTADISTICAS == "exacto"
         
+        # Permite detener el análisis en curso (timeout de la rama de video)
+        self._cancel_event = threading.Event()
+        
+    def cancel(self):
+        """Detiene el análisis en curso; se calculan métricas con los frames ya procesados"""
+        self._cancel_event.set()
+    
     def analyze_video_complete(self, video_path: str) -> Dict:
         """
         Análisis completo de video: contacto visual, expresividad, estabilidad, manos, postura
         """
+        if self.segments is not None:
+            result = self._analyze_segmented(video_path)
+            if result is not None:
+                return result
+        
         try:
-            # Limpiar métricas de sesiones anteriores
-            self._all_gaze_metrics = []
-            
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                logger.error(f"No se pudo abrir el video: {video_path}")
-                return self._default_metrics()
-            
-            # Variables de análisis
-            total_frames = 0
-            frames_with_face = 0
-            eye_contact_frames = 0
-            frames_with_hands = 0
-            frames_with_pose = 0
-            
-            # Para expresividad (boca, cejas, manos)
-            mouth_movements = []
-            eyebrow_movements = []
-            hand_movements = []  # Nueva métrica para manos
-            
-            # Para estabilidad (parpadeo y movimiento de cabeza)
-            blink_count = 0
-            head_movements = []
-            previous_head_position = None
-            previous_eye_state = None
-            
-            # Para postura
-            shoulder_alignments = []
-            
-            # Procesar cada 2 frames para máxima precisión en videos cortos
-            frame_skip = 2
-            frame_count = 0
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                frame_count += 1
-                if frame_count % frame_skip != 0:
-                    continue
-                
-                total_frames += 1
-                
-                # Convertir BGR a RGB para MediaPipe
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w = frame.shape[:2]
-                
-                # Detectar face mesh
-                face_results = self.face_mesh.process(rgb_frame)
+            source = open_video(video_path)
+        except Exception as e:
+            logger.error(f"No se pudo abrir el video: {video_path} ({e})")
+            return self._default_metrics()
+        
+        try:
+            # Con hilo productor, la decodificación se solapa con la inferencia
+            result = self.analyze_frames(source.frames(), source.fps, source.total_frames)
+            result["decodificador"] = source.backend
+            return result
+        finally:
+            source.close()
+    
+    def _analyze_segmented(self, video_path: str) -> Optional[Dict]:
+        """
+        Analiza el video en tramos paralelos y combina sus estados parciales.
+        Returns: métricas, o None si el video es corto o no se pudo segmentar
+        """
+        try:
+            self._cancel_event.clear()
+            fps, total_frames, _, _ = probe_video(video_path)
+            segments = self.segments.plan(fps, total_frames)
+            if not segments:
+                return None
+            
+            logger.info(f"Análisis por segmentos: {len(segments)} tramos de ~{total_frames // len(segments)} frames")
+            results = self.segments.analyze(video_path, fps, total_frames, segments, self._cancel_event)
+            if not any(results) and not self._cancel_event.is_set():
+                return None
+            
+            partial = VisualPartial(exact=self.exact_stats)
+            sampled = 0
+            decimated = False
+            for result in results:
+                if result is not None:
+                    segment, segment_sampled, segment_decimated = result
+                    partial.merge(segment)
+                    sampled += segment_sampled
+                    decimated = decimated or segment_decimated
+            
+            metrics = self.metrics_from_partial(partial, partial.frames_read / fps)
+            if metrics["frames_con_cara"] > 0:
+                metrics["segmentos"] = {
+                    "tramos": len(segments),
+                    "tramos_completos": sum(result is not None for result in results),
+                    "procesos": self.segments.workers,
+                    "frames_leidos": partial.frames_read,
+                    "frames_muestreados": sampled,
+                    "muestreo_reducido": decimated
+                }
+            return metrics
+        
+        except Exception as e:
+            logger.error(f"Error en el análisis por segmentos, se usa una sola pasada: {str(e)}")
+            return None
+    
+    def _batches(self, frames: Iterable[np.ndarray],
+                 sampler: FrameSampler, start_frame: int = 0) -> Iterator[Tuple[List[PreparedFrame], List[int]]]:
+        """
+        Agrupa los frames que elige el sampler (reducidos, en RGB y con ROI) en
+        lotes del tamaño del backend
+        Returns: (frames preparados, número de frame en el video) por lote
+        """
+        batch, indices = [], []
+        self._frames_read = start_frame
+        for frame in frames:
+            self._frames_read += 1
+            if not sampler.should_sample(self._frames_read):
+                continue
+            
+            # Reducir, convertir BGR a RGB para MediaPipe y recortar la ROI
+            batch.append(self.preprocessor.prepare(frame))
+            indices.append(self._frames_read)
+            if len(batch) >= self.landmarks.batch_size:
+                yield batch, indices
+                batch, indices = [], []
+        if batch:
+            yield batch, indices
+    
+    def analyze_frames(self, frames: Iterable[np.ndarray], fps: float,
+                       total_frames: Optional[int] = None) -> Dict:
+        """
+        Analiza una secuencia de frames BGR (de frame_source o del demuxer)
+        fps: cuadros por segundo del video original
+        total_frames: frames del video si se conocen (reparto del presupuesto de muestreo)
+        """
+        try:
+            self._cancel_event.clear()
+            partial, sampler = self.analyze_segment(frames, fps, total_frames)
+            
+            metrics = self.metrics_from_partial(partial, partial.frames_read / (fps or 30))
+            if metrics["frames_con_cara"] > 0:
+                # Política de muestreo y preproceso aplicados
+                metrics["muestreo"] = sampler.policy(partial.frames_read)
+                metrics["preproceso"] = self.preprocessor.stats()
+                if self.landmarks.gate is not None:
+                    metrics["cascada"] = self.landmarks.gate.stats()
+            return metrics
+        
+        except Exception as e:
+            logger.error(f"Error al analizar video: {str(e)}")
+            import traceback
+            logger.error(traceback.format_exc())
+            return self._default_metrics()
+    
+    def analyze_segment(self, frames: Iterable[np.ndarray], fps: float,
+                        total_frames: Optional[int] = None, start_frame: int = 0,
+                        share: float = 1.0) -> Tuple[VisualPartial, FrameSampler]:
+        """
+        Analiza un tramo de frames BGR y retorna su estado parcial (sin métricas finales)
+        start_frame: frames del video anteriores al tramo (numeración absoluta)
+        share: fracción del video que cubre el tramo (reparto del presupuesto de muestreo)
+        """
+        # Muestreo adaptativo: tasa objetivo + presupuesto, más denso en eventos
+        sampler = FrameSampler.from_config(fps, total_frames, share, start_frame)
+        
+        # Bloque de rasgos por frame, llenado in-place y volcado a los estimadores
+        # acumulados (memoria constante aunque el video dure horas)
+        features = _FeatureMatrix(min(sampler.expected_samples(), _FEATURE_BLOCK))
+        partial = VisualPartial(exact=self.exact_stats)
+        
+        # Estado para disparar el muestreo denso (parpadeos y movimiento de cabeza)
+        previous_face = None  # (frame, nariz_x, nariz_y) del último frame con cara
+        eye_open_baseline = None
+        
+        self.landmarks.reset()
+        self.preprocessor.reset()
+        for batch, indices in self._batches(frames, sampler, start_frame):
+            if self._cancel_event.is_set():
+                logger.warning(f"Análisis de video cancelado tras {self._frames_read - start_frame} frames")
+                break
+            
+            h, w = batch[0].rgb.shape[:2]
+            partial.aspect = h / w
+            
+            # Inferencia del lote completo; la matemática de landmarks se aplica después
+            timestamps = [int(i * 1000 / (fps or 30)) for i in indices]
+            results = self.landmarks.process_batch(batch, timestamps)
+            
+            for index, result in zip(indices, results):
+                self.preprocessor.update(result)
+                if features.full:
+                    partial.update(features.values)
+                    features.clear()
+                row = features.append(index)
                 
-                if face_results.multi_face_landmarks:
-                    frames_with_face += 1
-                    landmarks = face_results.multi_face_landmarks[0].landmark
-                    
-                    # 1. ANÁLISIS DE CONTACTO VISUAL (iris tracking)
-                    is_looking_at_camera = self._analyze_eye_gaze(landmarks, w, h)
-                    if is_looking_at_camera:
-                        eye_contact_frames += 1
+                if result.face is not None:
+                    # Contacto visual (iris), expresividad (boca, cejas), ojos y nariz
+                    row["has_face"] = True
+                    self._face_features(result.face, row)
                     
-                    # 2. ANÁLISIS DE EXPRESIVIDAD (movimiento facial)
-                    mouth_movement = self._calculate_mouth_movement(landmarks)
-                    eyebrow_movement = self._calculate_eyebrow_movement(landmarks)
-                    mouth_movements.append(mouth_movement)
-                    eyebrow_movements.append(eyebrow_movement)
-                    
-                    # 3. ANÁLISIS DE PARPADEO
-                    current_eye_state = self._calculate_eye_open_ratio(landmarks)
-                    if previous_eye_state is not None:
-                        if previous_eye_state > 0.15 and current_eye_state < 0.1:
-                            blink_count += 1
-                    previous_eye_state = current_eye_state
-                    
-                    # 4. ANÁLISIS DE MOVIMIENTO DE CABEZA
-                    current_head_pos = self._get_head_position(landmarks, w, h)
-                    if previous_head_position is not None:
-                        movement = np.linalg.norm(
-                            np.array(current_head_pos) - np.array(previous_head_position)
-                        ) / w
-                        head_movements.append(movement)
-                    previous_head_position = current_head_pos
-                
-                # Detectar manos y calcular movimiento
-                hands_results = self.hands.process(rgb_frame)
-                if hands_results.multi_hand_landmarks:
-                    frames_with_hands += 1
-                    # Calcular movimiento de manos (variación de posición)
-                    hand_movement = self._calculate_hand_movement(hands_results.multi_hand_landmarks, w, h)
-                    hand_movements.append(hand_movement)
-                else:
-                    # Sin manos visibles = sin movimiento
-                    hand_movements.append(0.0)
-                
-                # Detectar postura
-                pose_results = self.pose.process(rgb_frame)
-                if pose_results.pose_landmarks:
-                    frames_with_pose += 1
-                    pose_landmarks = pose_results.pose_landmarks.landmark
+                    # Ojos cerrándose respecto a su apertura habitual: muestrear
+                    # denso para no perder el parpadeo
+                    eye_open = row["eye_open"]
+                    if eye_open_baseline is not None and eye_open < 0.6 * eye_open_baseline:
+                        sampler.mark_event(index)
+                    eye_open_baseline = eye_open if eye_open_baseline is None \
+                        else 0.9 * eye_open_baseline + 0.1 * eye_open
                     
-                    # Calcular alineación de hombros
-                    left_shoulder = pose_landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER]
-                    right_shoulder = pose_landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER]
-                    shoulder_alignment = abs(left_shoulder.y - right_shoulder.y)
-                    shoulder_alignments.append(shoulder_alignment)
-            
-            cap.release()
-            
-            if total_frames == 0 or frames_with_face == 0:
-                logger.warning("No se detectó cara en el video")
-                return self._default_metrics()
-            
-            # Calcular métricas finales
-            fps = cap.get(cv2.CAP_PROP_FPS) or 30
-            duration_seconds = frame_count / fps
-            
-            # DEBUG: Logging de movimientos faciales
-            logger.info(f"[EXPRESIVIDAD DEBUG] Mouth movements: n={len(mouth_movements)}, "
-                       f"min={np.min(mouth_movements) if mouth_movements else 0:.4f}, "
-                       f"max={np.max(mouth_movements) if mouth_movements else 0:.4f}, "
-                       f"mean={np.mean(mouth_movements) if mouth_movements else 0:.4f}, "
-                       f"std={np.std(mouth_movements) if mouth_movements else 0:.4f}")
-            logger.info(f"[EXPRESIVIDAD DEBUG] Eyebrow movements: n={len(eyebrow_movements)}, "
-                       f"min={np.min(eyebrow_movements) if eyebrow_movements else 0:.4f}, "
-                       f"max={np.max(eyebrow_movements) if eyebrow_movements else 0:.4f}, "
-                       f"mean={np.mean(eyebrow_movements) if eyebrow_movements else 0:.4f}, "
-                       f"std={np.std(eyebrow_movements) if eyebrow_movements else 0:.4f}")
-            
-            # 1. Contacto visual - ENFOQUE SIMPLIFICADO Y ROBUSTO
-            if hasattr(self, '_all_gaze_metrics') and len(self._all_gaze_metrics) > 0:
-                data = self._all_gaze_metrics
-                
-                # Extraer las métricas más relevantes
-                avg_deviations = np.array([m['avg_deviation'] for m in data])
-                max_deviations = np.array([m['max_deviation'] for m in data])
-                h_asymmetries = np.array([m['h_asymmetry'] for m in data])
-                
-                # Debug: Ver el rango de valores
-                logger.info(f"[DEBUG] avg_deviations: min={np.min(avg_deviations):.4f}, max={np.max(avg_deviations):.4f}, mean={np.mean(avg_deviations):.4f}")
-                
-                # FILTRAR OUTLIERS: Remover valores donde avg_deviation > 2.0 (claramente errores de detección)
-                valid_mask = avg_deviations < 2.0
-                avg_deviations_clean = avg_deviations[valid_mask]
-                max_deviations_clean = max_deviations[valid_mask]
-                h_asymmetries_clean = h_asymmetries[valid_mask]
-                
-                logger.info(f"[FILTRO] Frames válidos: {len(avg_deviations_clean)}/{len(avg_deviations)} ({len(avg_deviations_clean)/len(avg_deviations)*100:.1f}%)")
-                
-                if len(avg_deviations_clean) < 3:  # Mínimo 3 frames para calcular estadísticas
-                    logger.warning(f"Muy pocos frames válidos después de filtrar outliers: {len(avg_deviations_clean)}")
-                    eye_contact_percentage = 0.0
-                else:
-                    # Calcular estadísticas robustas
-                    metrics_stats = {
-                        'avg_dev_mean': np.mean(avg_deviations_clean),
-                        'avg_dev_median': np.median(avg_deviations_clean),
-                        'avg_dev_std': np.std(avg_deviations_clean),
-                        'avg_dev_p75': np.percentile(avg_deviations_clean, 75),
-                        'avg_dev_p90': np.percentile(avg_deviations_clean, 90),
-                        'max_dev_mean': np.mean(max_deviations_clean),
-                        'max_dev_median': np.median(max_deviations_clean),
-                        'max_dev_std': np.std(max_deviations_clean),
-                        'max_dev_p75': np.percentile(max_deviations_clean, 75),
-                        'max_dev_p90': np.percentile(max_deviations_clean, 90),
-                        'h_asym_mean': np.mean(h_asymmetries_clean),
-                        'h_asym_p75': np.percentile(h_asymmetries_clean, 75),
-                    }
-                
-                # Logging exhaustivo para calibración
-                logger.info("=" * 80)
-                logger.info("ESTADÍSTICAS DE MIRADA:")
-                for key, value in metrics_stats.items():
-                    logger.info(f"  {key}: {value:.4f}")
-                logger.info("=" * 80)
+                    # Movimiento de cabeza respecto al frame con cara anterior
+                    current_face = (index, row["nose_x"], row["nose_y"])
+                    if previous_face is not None:
+                        row["head_movement"] = _head_movement(previous_face, current_face, partial.aspect)
+                        if row["head_movement"] > 0.02:
+                            # Movimiento brusco de cabeza
+                            sampler.mark_event(index)
+                    previous_face = current_face
                 
-                # ============================================================
-                # ALGORITMO MINIMALISTA - 2 VARIABLES CLAVE
-                # ============================================================
-                # 
-                # Variable 1: avg_dev_std (Desviación Estándar)
-                #   - Mide la VARIABILIDAD del movimiento de los ojos
-                #   - Valor BAJO = mirada estable y consistente (mirando fijamente)
-                #   - Valor ALTO = mirada errática (moviendo ojos constantemente)
-                #
-                # Variable 2: h_asym_p75 (Asimetría Horizontal P75)
-                #   - Mide si ambos ojos miran al MISMO PUNTO
-                #   - Valor BAJO = ojos alineados (ambos miran al mismo lugar)
-                #   - Valor ALTO = ojos desalineados (cada ojo mira a diferente punto)
-                #
-                # ============================================================
+                # Manos: sin manos visibles = sin movimiento
+                row["has_hands"] = bool(result.hands)
+                row["hand_movement"] = self._hand_movement(result.hands) if result.hands else 0.0
                 
+                # Postura: alineación de hombros
+                if result.pose is not None:
+                    row["has_pose"] = True
+                    row["shoulder"] = abs(result.pose[_LEFT_SHOULDER, 1] - result.pose[_RIGHT_SHOULDER, 1])
+        
+        partial.update(features.values)
+        partial.frames_read = self._frames_read - start_frame
+        return partial, sampler
+    
+    def metrics_from_partial(self, partial: VisualPartial, duration_seconds: float) -> Dict:
+        """
+        Etapa única de agregación sobre el estado parcial de todo el video (un tramo
+        o varios combinados): contacto visual, expresividad, confianza, manos y postura
+        """
+        frames_analyzed = partial.frames
+        frames_with_face = partial.frames_with_face
+        
+        if frames_analyzed == 0 or frames_with_face == 0:
+            logger.warning("No se detectó cara en el video")
+            return self._default_metrics()
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            self._log_distribution("[EXPRESIVIDAD DEBUG] Mouth movements", partial.mouth)
+            self._log_distribution("[EXPRESIVIDAD DEBUG] Eyebrow movements", partial.eyebrow)
+        
+        # 1. Contacto visual - ENFOQUE SIMPLIFICADO Y ROBUSTO
+        # Frames con datos de mirada válidos (al menos un ojo con desviación > 0),
+        # sin outliers (avg_deviation > 2.0: claramente errores de detección)
+        if partial.gaze_raw.count > 0:
+            if logger.isEnabledFor(logging.DEBUG):
+                self._log_gaze_stats(partial)
+            
+            if partial.gaze.count < 3:  # Mínimo 3 frames para calcular estadísticas
+                logger.warning(f"Muy pocos frames válidos después de filtrar outliers: {partial.gaze.count}")
+                eye_contact_percentage = 0.0
+            else:
                 # DECISIÓN FINAL: Combinar mean (magnitud) y std (estabilidad)
                 # mean = qué tan desviado está en promedio
                 # std = qué tan estable/consistente es la mirada
-                metric_mean = metrics_stats['avg_dev_mean']
-                metric_std = metrics_stats['avg_dev_std']
+                metric_mean = partial.gaze.mean
+                metric_std = partial.gaze.std
                 
                 # Métrica combinada: 60% magnitud + 40% estabilidad
                 combined_score = (metric_mean * 0.6) + (metric_std * 0.4)
@@ -271,327 +478,166 @@ class VideoAnalyzer:
                 
                 logger.info(f"[MÉTRICAS] mean={metric_mean:.4f}, std={metric_std:.4f}, combined={combined_score:.4f}")
                 logger.info(f"[DECISIÓN] Contacto visual: {eye_contact_percentage:.1f}%")
-                logger.info("=" * 80)
-            else:
-                # Método original como fallback
-                eye_contact_percentage = (eye_contact_frames / frames_with_face) * 100 if frames_with_face > 0 else 0
-            
-            eye_contact_level = self._classify_eye_contact(eye_contact_percentage)
-            
-            # 2. Expresividad completa - BOCA + CEJAS + MANOS
-            # La expresividad en oratoria combina movimiento facial y gestual
-            # No modificamos el análisis de contacto visual (ojos)
-            if len(mouth_movements) > 2 and len(eyebrow_movements) > 2 and len(hand_movements) > 2:
-                # === BOCA: Sonrisas y apertura ===
-                mouth_std = np.std(mouth_movements)
-                mouth_range = np.max(mouth_movements) - np.min(mouth_movements)
-                mouth_expressiveness = (mouth_std * 0.7) + (mouth_range * 0.3)
-                
-                # === CEJAS: Elevaciones para énfasis ===
-                eyebrow_std = np.std(eyebrow_movements)
-                eyebrow_range = np.max(eyebrow_movements) - np.min(eyebrow_movements)
-                eyebrow_expressiveness = (eyebrow_std * 0.7) + (eyebrow_range * 0.3)
-                
-                # === MANOS: Gestos y movimientos ===
-                hand_std = np.std(hand_movements)
-                hand_range = np.max(hand_movements) - np.min(hand_movements)
-                # Normalizar: si nunca hay manos visibles, el score es 0
-                # Si hay manos, medir variación de movimiento
-                hand_expressiveness = (hand_std * 0.7) + (hand_range * 0.3)
-                
-                # Score final: 40% boca, 30% cejas, 30% manos
-                # La boca es ligeramente más importante, pero manos también son clave
-                expressiveness_score = (mouth_expressiveness * 0.4) + \
-                                      (eyebrow_expressiveness * 0.3) + \
-                                      (hand_expressiveness * 0.3)
-                
-                logger.info(f"[EXPRESIVIDAD] boca: std={mouth_std:.4f}, range={mouth_range:.4f}, score={mouth_expressiveness:.4f}")
-                logger.info(f"[EXPRESIVIDAD] cejas: std={eyebrow_std:.4f}, range={eyebrow_range:.4f}, score={eyebrow_expressiveness:.4f}")
-                logger.info(f"[EXPRESIVIDAD] manos: std={hand_std:.4f}, range={hand_range:.4f}, score={hand_expressiveness:.4f}")
-                logger.info(f"[EXPRESIVIDAD] SCORE FINAL={expressiveness_score:.4f}")
-            else:
-                expressiveness_score = 0.0
-                logger.warning("[EXPRESIVIDAD] Muy pocos frames para calcular")
-            
-            expressiveness_level = self._classify_expressiveness(expressiveness_score)
-            
-            # 3. Estabilidad/Confianza
-            avg_head_movement = np.mean(head_movements) if head_movements else 0
-            blinks_per_minute = (blink_count / duration_seconds) * 60 if duration_seconds > 0 else 0
-            confidence_score = self._calculate_confidence_score(avg_head_movement, blinks_per_minute)
-            confidence_level = self._classify_confidence(confidence_score)
-            
-            # 4. Manos visibles
-            hands_percentage = (frames_with_hands / total_frames) * 100 if total_frames > 0 else 0
-            
-            # 5. Alineación de hombros
-            avg_shoulder_alignment = np.mean(shoulder_alignments) if shoulder_alignments else 0.02
-            
-            logger.info(f"Análisis visual completado:")
-            logger.info(f"  - Contacto visual: {eye_contact_percentage:.1f}% ({eye_contact_level})")
-            logger.info(f"  - Expresividad: {expressiveness_score:.2f} ({expressiveness_level})")
-            logger.info(f"  - Confianza: {confidence_score:.2f} ({confidence_level})")
-            logger.info(f"  - Manos visibles: {hands_percentage:.1f}%")
-            logger.info(f"  - Alineación hombros: {avg_shoulder_alignment:.4f}")
-            
-            return {
-                # Contacto visual
-                "contacto_visual_porcentaje": round(eye_contact_percentage, 1),
-                "contacto_visual_nivel": eye_contact_level,
-                
-                # Expresividad
-                "expresividad_score": round(expressiveness_score, 4),  # 4 decimales para no perder precisión
-                "expresividad_nivel": expressiveness_level,
-                
-                # Confianza/Estabilidad
-                "confianza_score": round(confidence_score, 2),
-                "confianza_nivel": confidence_level,
-                "parpadeos_por_minuto": round(blinks_per_minute, 1),
-                "movimiento_cabeza": round(avg_head_movement, 3),
-                
-                # Manos
-                "porcentaje_manos_visibles": round(hands_percentage, 1),
-                
-                # Postura
-                "alineacion_hombros_promedio": round(avg_shoulder_alignment, 3),
-                
-                # Estadísticas
-                "frames_procesados": total_frames,
-                "frames_con_cara": frames_with_face,
-                "duracion_segundos": round(duration_seconds, 1)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error al analizar video: {str(e)}")
-            import traceback
-            logger.error(traceback.format_exc())
-            return self._default_metrics()
-    
-    def _analyze_eye_gaze(self, landmarks, frame_width, frame_height):
-        """
-        Analiza la dirección de la mirada usando vectores estándar de iris
-        Enfoque simplificado basado en estándares de la industria
-        landmarks: ya es face_landmarks.landmark (lista de NormalizedLandmark)
-        """
-        try:
-            # ============ ENFOQUE ESTÁNDAR: Posición relativa del iris ============
-            # Usar solo los landmarks esenciales de MediaPipe
-            
-            # Iris centers
-            left_iris = landmarks[469]
-            right_iris = landmarks[474]
-            
-            # Eye corners (para normalización)
-            # CRÍTICO: Necesitamos que left.x < right.x para ambos ojos
-            # Ojo izquierdo: 33 y 133 funcionan correctamente
-            # Ojo derecho: Según logs, landmark 362 tiene MAYOR X que 263
-            #              Por tanto: 263 debe ser "left" y 362 debe ser "right"
-            left_eye_left = landmarks[33]    # Ojo izquierdo: esquina izquierda
-            left_eye_right = landmarks[133]  # Ojo izquierdo: esquina derecha  
-            right_eye_left = landmarks[263]  # Ojo derecho: esquina con MENOR X (cerca de nariz)
-            right_eye_right = landmarks[362] # Ojo derecho: esquina con MAYOR X (exterior)
-            
-            # Eye vertical bounds
-            left_eye_top = landmarks[159]
-            left_eye_bottom = landmarks[145]
-            right_eye_top = landmarks[386]
-            right_eye_bottom = landmarks[374]
-            
-            # Calcular posición normalizada del iris (0.0 a 1.0)
-            # Centro perfecto = 0.5, 0.5
-            def normalize_iris_position(iris, eye_corner1, eye_corner2, eye_top, eye_bottom, eye_name="eye"):
-                # Centro del ojo
-                eye_min_x = min(eye_corner1.x, eye_corner2.x)
-                eye_max_x = max(eye_corner1.x, eye_corner2.x)
-                eye_center_x = (eye_min_x + eye_max_x) / 2
-                eye_center_y = (eye_top.y + eye_bottom.y) / 2
-                
-                # DESVIACIÓN ABSOLUTA (sin normalizar)
-                # Funciona para videos móvil, limitado en PC
-                deviation_x = abs(iris.x - eye_center_x)
-                deviation_y = abs(iris.y - eye_center_y)
-                deviation = np.sqrt(deviation_x**2 + deviation_y**2)
-                
-                # Posición relativa (legacy, no se usa)
-                h_pos = 0.5
-                v_pos = 0.5
-                
-                return h_pos, v_pos, deviation
-            
-            left_h, left_v, left_dev = normalize_iris_position(
-                left_iris, left_eye_left, left_eye_right, left_eye_top, left_eye_bottom, "LEFT_EYE"
-            )
-            right_h, right_v, right_dev = normalize_iris_position(
-                right_iris, right_eye_left, right_eye_right, right_eye_top, right_eye_bottom, "RIGHT_EYE"
-            )
-            
-            # Métricas clave
-            avg_deviation = (left_dev + right_dev) / 2
-            max_deviation = max(left_dev, right_dev)
-            h_asymmetry = abs(left_h - right_h)
-            v_asymmetry = abs(left_v - right_v)
-            
-            # ============ LOGGING EXHAUSTIVO PARA CALIBRACIÓN ============
-            if not hasattr(self, '_all_gaze_metrics'):
-                self._all_gaze_metrics = []
-            
-            # Solo agregar si al menos un ojo tiene datos válidos (deviation > 0)
-            # Si ambos devolvieron (0.5, 0.5, 0.0), significa que fueron descartados
-            if left_dev > 0 or right_dev > 0:
-                frame_data = {
-                    'left_h': left_h,
-                    'left_v': left_v,
-                    'left_dev': left_dev,
-                    'right_h': right_h,
-                    'right_v': right_v,
-                    'right_dev': right_dev,
-                    'avg_deviation': avg_deviation,
-                    'max_deviation': max_deviation,
-                    'h_asymmetry': h_asymmetry,
-                    'v_asymmetry': v_asymmetry,
-                }
-                self._all_gaze_metrics.append(frame_data)
-            else:
-                # Debug: frame descartado porque ambos ojos son inválidos
-                if not hasattr(self, '_logged_invalid_frame'):
-                    logger.info(f"[DEBUG] Frame descartado: left_dev={left_dev}, right_dev={right_dev}")
-                    self._logged_invalid_frame = True
-            
-            # Retornar True si ambos ojos miran cerca del centro
-            # Este valor legacy no se usa en la decisión final
-            return avg_deviation < 0.15
-            
-        except Exception as e:
-            logger.error(f"Error en análisis de mirada: {e}")
-            return False
+        else:
+            # Método original como fallback: iris cerca del centro en ambos ojos
+            eye_contact_percentage = partial.contact_fallback / frames_with_face * 100
+        
+        eye_contact_level = self._classify_eye_contact(eye_contact_percentage)
+        
+        # 2. Expresividad completa - BOCA + CEJAS + MANOS
+        # La expresividad en oratoria combina movimiento facial y gestual
+        # No modificamos el análisis de contacto visual (ojos)
+        if partial.mouth.count > 2 and partial.eyebrow.count > 2 and partial.hand.count > 2:
+            # === BOCA: Sonrisas y apertura ===
+            mouth_std = partial.mouth.std
+            mouth_range = partial.mouth.ptp
+            mouth_expressiveness = (mouth_std * 0.7) + (mouth_range * 0.3)
+            
+            # === CEJAS: Elevaciones para énfasis ===
+            eyebrow_std = partial.eyebrow.std
+            eyebrow_range = partial.eyebrow.ptp
+            eyebrow_expressiveness = (eyebrow_std * 0.7) + (eyebrow_range * 0.3)
+            
+            # === MANOS: Gestos y movimientos ===
+            hand_std = partial.hand.std
+            hand_range = partial.hand.ptp
+            # Normalizar: si nunca hay manos visibles, el score es 0
+            # Si hay manos, medir variación de movimiento
+            hand_expressiveness = (hand_std * 0.7) + (hand_range * 0.3)
+            
+            # Score final: 40% boca, 30% cejas, 30% manos
+            # La boca es ligeramente más importante, pero manos también son clave
+            expressiveness_score = (mouth_expressiveness * 0.4) + \
+                                  (eyebrow_expressiveness * 0.3) + \
+                                  (hand_expressiveness * 0.3)
+            
+            logger.info(f"[EXPRESIVIDAD] boca: std={mouth_std:.4f}, range={mouth_range:.4f}, score={mouth_expressiveness:.4f}")
+            logger.info(f"[EXPRESIVIDAD] cejas: std={eyebrow_std:.4f}, range={eyebrow_range:.4f}, score={eyebrow_expressiveness:.4f}")
+            logger.info(f"[EXPRESIVIDAD] manos: std={hand_std:.4f}, range={hand_range:.4f}, score={hand_expressiveness:.4f}")
+            logger.info(f"[EXPRESIVIDAD] SCORE FINAL={expressiveness_score:.4f}")
+        else:
+            expressiveness_score = 0.0
+            logger.warning("[EXPRESIVIDAD] Muy pocos frames para calcular")
+        
+        expressiveness_level = self._classify_expressiveness(expressiveness_score)
+        
+        # 3. Estabilidad/Confianza
+        avg_head_movement = partial.head.mean
+        blinks_per_minute = (partial.blinks / duration_seconds) * 60 if duration_seconds > 0 else 0
+        confidence_score = self._calculate_confidence_score(avg_head_movement, blinks_per_minute)
+        confidence_level = self._classify_confidence(confidence_score)
+        
+        # 4. Manos visibles
+        hands_percentage = partial.frames_with_hands / frames_analyzed * 100
+        
+        # 5. Alineación de hombros
+        avg_shoulder_alignment = partial.shoulder.mean if partial.shoulder.count else 0.02
+        
+        logger.info(f"Análisis visual completado:")
+        logger.info(f"  - Contacto visual: {eye_contact_percentage:.1f}% ({eye_contact_level})")
+        logger.info(f"  - Expresividad: {expressiveness_score:.2f} ({expressiveness_level})")
+        logger.info(f"  - Confianza: {confidence_score:.2f} ({confidence_level})")
+        logger.info(f"  - Manos visibles: {hands_percentage:.1f}%")
+        logger.info(f"  - Alineación hombros: {avg_shoulder_alignment:.4f}")
+        
+        return {
+            # Contacto visual
+            "contacto_visual_porcentaje": round(eye_contact_percentage, 1),
+            "contacto_visual_nivel": eye_contact_level,
+            
+            # Expresividad
+            "expresividad_score": round(expressiveness_score, 4),  # 4 decimales para no perder precisión
+            "expresividad_nivel": expressiveness_level,
+            
+            # Confianza/Estabilidad
+            "confianza_score": round(confidence_score, 2),
+            "confianza_nivel": confidence_level,
+            "parpadeos_por_minuto": round(blinks_per_minute, 1),
+            "movimiento_cabeza": round(avg_head_movement, 3),
+            
+            # Manos
+            "porcentaje_manos_visibles": round(hands_percentage, 1),
+            
+            # Postura
+            "alineacion_hombros_promedio": round(avg_shoulder_alignment, 3),
+            
+            # Estadísticas
+            "frames_procesados": frames_analyzed,
+            "frames_con_cara": frames_with_face,
+            "duracion_segundos": round(duration_seconds, 1)
+        }
     
-    def _calculate_eye_width(self, landmarks, eye_indices: List[int], w: int) -> float:
-        """Calcula el ancho del ojo"""
-        try:
-            eye_points = [landmarks[i] for i in eye_indices]
-            x_coords = [p.x * w for p in eye_points]
-            return max(x_coords) - min(x_coords)
-        except:
-            return 1.0
+    def _log_distribution(self, label: str, stats: RunningStats) -> None:
+        """Estadísticas de depuración (solo se calculan con logging DEBUG activo)"""
+        logger.debug(f"{label}: n={stats.count}, min={stats.minimum:.4f}, max={stats.maximum:.4f}, "
+                     f"mean={stats.mean:.4f}, std={stats.std:.4f}")
     
-    def _calculate_mouth_movement(self, landmarks) -> float:
-        """
-        Calcula el movimiento/apertura de la boca (apertura vertical)
-        Retorna la apertura vertical sin normalización (valores absolutos)
-        """
-        try:
-            # Puntos superior e inferior de la boca
-            upper = landmarks[13]  # Upper lip
-            lower = landmarks[14]  # Lower lip
-            
-            # Distancia vertical (apertura) - valores normalizados ya por MediaPipe [0-1]
-            mouth_height = abs(upper.y - lower.y)
-            
-            # MediaPipe ya proporciona coordenadas normalizadas [0-1]
-            # No necesitamos normalizar más, solo retornar la apertura directa
-            return mouth_height
-            
-        except Exception as e:
-            return 0.0
+    def _log_gaze_stats(self, partial: VisualPartial) -> None:
+        """Logging exhaustivo de la mirada para calibración (solo con logging DEBUG activo)"""
+        raw, clean, clean_max = partial.gaze_raw, partial.gaze, partial.gaze_max
+        logger.debug(f"[DEBUG] avg_deviations: min={raw.minimum:.4f}, "
+                     f"max={raw.maximum:.4f}, mean={raw.mean:.4f}")
+        logger.debug(f"[FILTRO] Frames válidos: {clean.count}/{raw.count} "
+                     f"({clean.count / raw.count * 100:.1f}%)")
+        if clean.count == 0:
+            return
+            
+        # Percentiles estimados con los sketches de cuantiles
+        p50_avg, p75_avg, p90_avg = partial.gaze_sketch.quantiles([0.5, 0.75, 0.9])
+        p50_max, p75_max, p90_max = partial.gaze_max_sketch.quantiles([0.5, 0.75, 0.9])
+        metrics_stats = {
+            'avg_dev_mean': clean.mean,
+            'avg_dev_median': p50_avg,
+            'avg_dev_std': clean.std,
+            'avg_dev_p75': p75_avg,
+            'avg_dev_p90': p90_avg,
+            'max_dev_mean': clean_max.mean,
+            'max_dev_median': p50_max,
+            'max_dev_std': clean_max.std,
+            'max_dev_p75': p75_max,
+            'max_dev_p90': p90_max,
+        }
+        logger.debug("=" * 80)
+        logger.debug("ESTADÍSTICAS DE MIRADA:")
+        for key, value in metrics_stats.items():
+            logger.debug(f"  {key}: {value:.4f}")
+        logger.debug("=" * 80)
     
-    def _calculate_eyebrow_movement(self, landmarks) -> float:
+    def _face_features(self, face: np.ndarray, row) -> None:
         """
-        Calcula la posición de las cejas relativa a los ojos
-        Retorna la distancia normalizada entre cejas y ojos
+        Rasgos geométricos de la cara en una sola pasada vectorizada
+        face: (478, 3) float32 con coordenadas normalizadas del frame
+        row: fila de la matriz de rasgos (FRAME_FEATURES) donde se escribe el resultado
         """
-        try:
-            # Puntos de cejas (promedio)
-            eyebrow_points = [landmarks[i].y for i in self.EYEBROWS]
-            avg_eyebrow_y = np.mean(eyebrow_points)
+        xy = face[:, :2]
+        corners_x = xy[_EYE_CORNERS, 0]  # (ojo, esquina)
+        lids_y = xy[_EYE_LIDS, 1]  # (ojo, [superior, inferior])
             
-            # Puntos de ojos (promedio) para normalización
-            left_eye_top = landmarks[159]
-            right_eye_top = landmarks[386]
-            avg_eye_y = (left_eye_top.y + right_eye_top.y) / 2
+        # Contacto visual: desviación absoluta del iris respecto al centro del ojo
+        # (sin normalizar: funciona para videos móvil, limitado en PC)
+        centers = np.stack([corners_x.mean(axis=1), lids_y.mean(axis=1)], axis=1)
+        row["dev_left"], row["dev_right"] = np.linalg.norm(xy[_IRIS] - centers, axis=1)
             
-            # Distancia vertical entre cejas y ojos
-            # Negativo = cejas levantadas, positivo = cejas bajas
-            eyebrow_eye_distance = abs(avg_eyebrow_y - avg_eye_y)
+        # Expresividad: apertura vertical de la boca y distancia cejas-ojos
+        row["mouth"] = abs(xy[_LIPS[0], 1] - xy[_LIPS[1], 1])
+        row["eyebrow"] = abs(xy[_EYEBROWS, 1].mean() - lids_y[:, 0].mean())
             
-            return eyebrow_eye_distance
+        # Parpadeo: apertura media de los párpados
+        row["eye_open"] = np.abs(lids_y[:, 0] - lids_y[:, 1]).mean()
             
-        except Exception as e:
-            return 0.0
+        # Posición de la cabeza: punta de la nariz
+        row["nose_x"], row["nose_y"] = xy[_NOSE_TIP]
     
-    def _calculate_hand_movement(self, hand_landmarks_list, frame_width: int, frame_height: int) -> float:
+    def _hand_movement(self, hands: List[np.ndarray]) -> float:
         """
-        Calcula el movimiento/amplitud de las manos
-        Retorna una métrica de cuánto se mueven las manos (dispersión espacial)
+        Amplitud de las manos: dispersión espacial (desviación estándar) de todos
+        los puntos de las manos visibles, combinando X e Y
         """
-        try:
-            if not hand_landmarks_list:
-                return 0.0
-            
-            # Recolectar todas las posiciones de puntos de manos
-            all_points = []
-            for hand_landmarks in hand_landmarks_list:
-                for landmark in hand_landmarks.landmark:
-                    # Normalizado [0-1], no necesitamos multiplicar por w/h
-                    all_points.append((landmark.x, landmark.y))
-            
-            if len(all_points) < 2:
-                return 0.0
-            
-            # Calcular la dispersión (desviación estándar) de posiciones
-            x_coords = [p[0] for p in all_points]
-            y_coords = [p[1] for p in all_points]
-            
-            x_std = np.std(x_coords)
-            y_std = np.std(y_coords)
-            
-            # Combinar dispersión en X e Y (movimiento total)
-            movement = np.sqrt(x_std**2 + y_std**2)
-            
-            return movement
-            
-        except Exception as e:
+        points = np.concatenate(hands)[:, :2]
+        if len(points) < 2:
             return 0.0
-    
-    def _calculate_eye_open_ratio(self, landmarks) -> float:
-        """
-        Calcula qué tan abiertos están los ojos (para detectar parpadeo)
-        """
-        try:
-            # Ojo izquierdo: puntos verticales
-            left_top = landmarks[159]
-            left_bottom = landmarks[145]
-            left_height = abs(left_top.y - left_bottom.y)
-            
-            # Ojo derecho
-            right_top = landmarks[386]
-            right_bottom = landmarks[374]
-            right_height = abs(right_top.y - right_bottom.y)
-            
-            avg_height = (left_height + right_height) / 2
-            return avg_height
-            
-        except:
-            return 0.2  # Valor por defecto (ojos abiertos)
-    
-    def _get_head_position(self, landmarks, w: int, h: int) -> Tuple[float, float]:
-        """
-        Obtiene la posición de la cabeza (centro de la cara)
-        """
-        try:
-            # Usar punto de la nariz como referencia
-            nose_tip = landmarks[1]
-            return (nose_tip.x * w, nose_tip.y * h)
-        except:
-            return (0, 0)
-    
-    def _get_landmark_center(self, landmarks, indices: List[int], w: int, h: int) -> Tuple[float, float]:
-        """
-        Calcula el centro de un conjunto de landmarks
-        """
-        points = [landmarks[i] for i in indices]
-        center_x = np.mean([p.x for p in points]) * w
-        center_y = np.mean([p.y for p in points]) * h
-        return (center_x, center_y)
+        x_std, y_std = points.std(axis=0)
+        return float(np.sqrt(x_std ** 2 + y_std ** 2))
     
     def _classify_eye_contact(self, percentage: float) -> str:
         if percentage >= 70:
@@ -664,11 +710,8 @@ class VideoAnalyzer:
     
     def cleanup(self):
         """Liberar recursos de MediaPipe"""
-        if hasattr(self, 'face_mesh'):
-            self.face_mesh.close()
-        if hasattr(self, 'hands'):
-            self.hands.close()
-        if hasattr(self, 'pose'):
-            self.pose.close()
-            self.face_mesh.close()
+        if hasattr(self, 'landmarks'):
+            self.landmarks.close()
+        if getattr(self, 'segments', None) is not None:
+            self.segments.shutdown(wait=False)
 
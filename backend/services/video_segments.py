@@ -0,0 +1,137 @@
+"""
+Análisis visual de videos largos por segmentos en procesos: cada proceso analiza
+un tramo del archivo y retorna su estado parcial (VisualPartial); el proceso que
+despacha los combina en orden y calcula las métricas una sola vez
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, wait as wait_futures
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Analizador del proceso worker (uno por proceso, creado en el initializer)
+_worker_analyzer = None
+
+
+def _init_worker():
+    """Inicializa el VideoAnalyzer del proceso una sola vez (pre-calienta MediaPipe)"""
+    global _worker_analyzer
+    from .video_analyzer import VideoAnalyzer
+    _worker_analyzer = VideoAnalyzer()
+    logger.info(f"Worker de segmentos listo (pid={os.getpid()})")
+
+
+def _analyze_segment(video_path: str, start: int, stop: int, fps: float, total_frames: int):
+    """Retorna (VisualPartial, frames muestreados, muestreo reducido) del tramo [start, stop)"""
+    from .frame_source import open_video
+    source = open_video(video_path, start_frame=start, frame_count=stop - start)
+    try:
+        partial, sampler = _worker_analyzer.analyze_segment(
+            source.frames(), fps, stop - start, start_frame=start, share=(stop - start) / total_frames
+        )
+        return partial, sampler.sampled, sampler.decimated
+    finally:
+        source.close()
+
+
+class SegmentPool:
+    """
+    Pool de procesos para el análisis por segmentos.
+    
+    workers: cantidad de procesos (por defecto, núcleos disponibles)
+    segment_seconds: duración mínima de un segmento; un video que no alcanza
+                     para dos segmentos se analiza en una sola pasada
+    """
+    def __init__(self, workers: Optional[int] = None, segment_seconds: float = 60.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.segment_seconds = segment_seconds
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn": cada proceso crea sus propios grafos de MediaPipe
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+                logger.info(f"Pool de segmentos: {self.workers} procesos")
+            return self._executor
+    
+    def plan(self, fps: float, total_frames: Optional[int]) -> List[Tuple[int, int]]:
+        """Tramos [inicio, fin) en frames; lista vacía si no conviene segmentar"""
+        if not total_frames or not fps:
+            return []
+        count = min(self.workers, int(total_frames / fps // self.segment_seconds))
+        if count < 2:
+            return []
+        bounds = [round(total_frames * i / count) for i in range(count + 1)]
+        return list(zip(bounds[:-1], bounds[1:]))
+    
+    def analyze(self, video_path: str, fps: float, total_frames: int,
+                segments: List[Tuple[int, int]], cancel_event: threading.Event) -> List[Optional[Tuple]]:
+        """
+        Despacha los tramos y espera sus resultados, en el orden de los tramos.
+        Si cancel_event se activa, no espera más: los tramos pendientes quedan en None.
+        """
+        executor = self._get_executor()
+        futures: List[Future] = [
+            executor.submit(_analyze_segment, video_path, start, stop, fps, total_frames)
+            for start, stop in segments
+        ]
+        
+        pending = set(futures)
+        while pending and not cancel_event.is_set():
+            _, pending = wait_futures(pending, timeout=0.5)
+        for future in pending:
+            future.cancel()
+        
+        results = []
+        for (start, stop), future in zip(segments, futures):
+            if not future.done() or future.cancelled():
+                logger.warning(f"Segmento {start}-{stop} sin terminar (cancelado)")
+                results.append(None)
+                continue
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                # Un worker murió (p.ej. crash nativo): descartar el pool para recrearlo
+                logger.error("Pool de segmentos roto, se recreará en el próximo video")
+                with self._lock:
+                    if self._executor is executor:
+                        self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                results.append(None)
+            except Exception as e:
+                logger.error(f"Error en el segmento {start}-{stop}: {str(e)}")
+                results.append(None)
+        return results
+    
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+    
+    @classmethod
+    def from_config(cls, concurrency: int = 1) -> "SegmentPool":
+        """
+        concurrency: análisis simultáneos que crean su propio SegmentPool (hilos de
+        la API o procesos de AnalysisWorkerPool). Los núcleos se reparten entre
+        ellos: si no, cada uno abriría un proceso por núcleo
+        """
+        from . import config
+        concurrency = max(1, concurrency)
+        cores = os.cpu_count() or 1
+        workers = config.ANALISIS_SEGMENTOS_PROCESOS or max(1, cores // concurrency)
+        if workers * concurrency > cores:
+            logger.warning(f"{concurrency} análisis × {workers} procesos de segmentos superan "
+                           f"los {cores} núcleos: reducir ANALISIS_SEGMENTOS_PROCESOS")
+        return cls(workers=workers, segment_seconds=config.ANALISIS_SEGMENTOS_SEGUNDOS)
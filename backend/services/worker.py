@@ -0,0 +1,59 @@
+"""
+Worker de análisis independiente de la API:
+    
+    python -m services.worker
+
+Reclama prácticas pendientes de la tabla trabajos_analisis (SELECT ... FOR
+UPDATE SKIP LOCKED), ejecuta AVProcessor y guarda las filas de PracticaDB con
+la misma lógica que la API. Con ANALISIS_COLA_BACKEND=externa la API solo
+encola, y API y workers escalan por separado (réplicas en docker-compose)
+"""
+import signal
+import threading
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def run(stop_event: threading.Event) -> None:
+    # main se importa recién aquí: modelos, sesión de BD y handler de la práctica
+    # son los de la API, sin levantar el servidor
+    import main as api
+    from .job_queue import JobQueue
+    
+    # Con "db" la API también reclama trabajos y competiría con el worker por la CPU
+    if api.ANALISIS_COLA_BACKEND != "externa":
+        raise RuntimeError("El worker requiere ANALISIS_COLA_BACKEND=externa (también en la API)")
+    
+    queue = JobQueue(
+        api._job_backend,
+        api._procesar_practica,
+        max_workers=api.ANALISIS_PROCESOS if api.analysis_pool is not None else api.ANALISIS_MAX_WORKERS,
+        on_state_change=api._actualizar_estado_sesion,
+        heartbeat_seconds=api.ANALISIS_COLA_LATIDO_SEGUNDOS
+    )
+    try:
+        queue.serve(stop_event, poll_seconds=api.ANALISIS_COLA_ESPERA_SEGUNDOS,
+                    lease_seconds=api.ANALISIS_COLA_LEASE_SEGUNDOS)
+    finally:
+        if api.analysis_pool is not None:
+            api.analysis_pool.shutdown(wait=False)
+
+
+def main() -> None:
+    stop_event = threading.Event()
+    
+    def stop(signum, frame):
+        # Terminar los trabajos en curso y no reclamar más
+        logger.info(f"Señal {signum} recibida, deteniendo el worker")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    run(stop_event)
+    logger.info("Worker de análisis detenido")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Pool de procesos de análisis: cada worker tiene su propio AVProcessor con los
+grafos de MediaPipe (FaceMesh, Hands, Pose) ya inicializados
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Procesador del proceso worker (uno por proceso, creado en el initializer)
+_worker_processor = None
+
+
+def _init_worker(concurrency: int = 1):
+    """Inicializa el AVProcessor del proceso una sola vez (pre-calienta MediaPipe)"""
+    global _worker_processor
+    from .av_processor import AVProcessor
+    _worker_processor = AVProcessor(concurrency=concurrency)
+    logger.info(f"Worker de análisis listo (pid={os.getpid()})")
+
+
+def _process_in_worker(video_url: str) -> Dict:
+    return _worker_processor.process_video(video_url)
+
+
+class AnalysisWorkerPool:
+    """
+    Ejecuta process_video en un pool de procesos.
+    
+    workers: cantidad de procesos (por defecto, núcleos disponibles)
+    max_jobs_per_worker: reciclar el proceso tras N videos (libera memoria de
+                         MediaPipe/ffmpeg). None = nunca reciclar
+    """
+    def __init__(self, workers: Optional[int] = None, max_jobs_per_worker: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_jobs_per_worker = max_jobs_per_worker or None
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # "spawn" evita heredar estado de MediaPipe/hilos del proceso padre
+                # y es requerido por max_tasks_per_child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.workers,),
+                    max_tasks_per_child=self.max_jobs_per_worker
+                )
+                logger.info(f"Pool de análisis: {self.workers} procesos, "
+                            f"reciclar cada {self.max_jobs_per_worker or '∞'} videos")
+            return self._executor
+    
+    def process_video(self, video_url: str) -> Dict:
+        """Despacha el video a un worker libre y espera el resultado"""
+        executor = self._get_executor()
+        try:
+            return executor.submit(_process_in_worker, video_url).result()
+        except BrokenProcessPool:
+            # Un worker murió (p.ej. crash nativo): descartar el pool para recrearlo
+            logger.error("Pool de análisis roto, se recreará en el próximo trabajo")
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,10 @@
+"""
+Pruebas de los servicios de análisis: se ejecutan desde backend/ con
+    
+    python -m pytest tests
+"""
+import os
+import sys
+
+# Importar los servicios como paquete (services.*), igual que main.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
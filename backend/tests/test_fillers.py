@@ -0,0 +1,73 @@
+import re
+
+import pytest
+
+from services.fillers import FillerMatcher
+
+# Patrones de la implementación anterior (una búsqueda por patrón)
+LEGACY_PATTERNS = [
+    r'\beh+\b',
+    r'\bum+\b',
+    r'\bemm+\b',
+    r'\bahh+\b',
+    r'\beste\b',
+    r'\bbueno\b',
+    r'\bo sea\b',
+    r'\bcomo que\b',
+    r'\bpues\b',
+    r'\bentonces\b',
+    r'\bverdad\b',
+    r'\bno\?\b',
+]
+
+TEXTS = [
+    "eh bueno este o sea como que no sé pues entonces",
+    "Ehhh, BUENO, la verdad es que ummm no tengo claro el tema, emmm, ahhh sí",
+    "entonces entonces entonces, o sea, pues nada",
+    "este proyecto es bueno, ¿verdad? mmm ehh",
+    "Presentación sin muletillas: contenido claro y directo.",
+    "",
+]
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return FillerMatcher.from_locale("es")
+
+
+def _legacy_counts(text):
+    return [len(re.findall(pattern, text.lower(), re.IGNORECASE)) for pattern in LEGACY_PATTERNS]
+
+
+def _legacy_offsets(text):
+    return sorted(
+        (match.start(), match.group(0))
+        for pattern in LEGACY_PATTERNS
+        for match in re.finditer(pattern, text, re.IGNORECASE)
+    )
+
+
+def test_locale_file_keeps_legacy_patterns(matcher):
+    assert len(matcher.names) == len(LEGACY_PATTERNS)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_counts_match_legacy(matcher, text):
+    counts = matcher.count(matcher.scan(text.lower()))
+    assert list(counts.values()) == _legacy_counts(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_offsets_match_legacy(matcher, text):
+    assert matcher.find(text) == _legacy_offsets(text)
+
+
+def test_scan_reports_pattern_name(matcher):
+    matches = matcher.scan("o sea, ehh")
+    assert [(m.offset, m.text, m.name) for m in matches] == [(0, "o sea", "o_sea"), (7, "ehh", "eh")]
+
+
+def test_empty_patterns():
+    matcher = FillerMatcher({})
+    assert matcher.scan("eh bueno") == []
+    assert matcher.count([]) == {}
@@ -0,0 +1,122 @@
+import pytest
+
+from services.frame_sampler import FrameSampler
+
+
+def _run(sampler, start, stop, events=()):
+    """
+    Recorre los frames [start, stop] y retorna los índices muestreados. Como en
+    VideoAnalyzer, el evento se marca después de analizar su frame
+    """
+    sampled = []
+    events = set(events)
+    for index in range(start, stop + 1):
+        if sampler.should_sample(index):
+            sampled.append(index)
+        if index in events:
+            sampler.mark_event(index)
+    return sampled
+
+
+def test_target_fps_without_budget():
+    sampler = FrameSampler(30, total_frames=300, target_fps=15)
+    sampled = _run(sampler, 1, 300)
+    assert sampler.step == 2
+    assert sampled == list(range(2, 301, 2))
+    assert not sampler.decimated
+
+
+def test_budget_spread_over_known_length():
+    sampler = FrameSampler(30, total_frames=3000, target_fps=15, max_frames=100)
+    sampled = _run(sampler, 1, 3000)
+    # El paso se amplía desde el inicio para que el presupuesto cubra todo el video
+    assert sampler.step > 2
+    assert len(sampled) <= 100
+    assert sampled[-1] > 3000 - sampler.step
+    assert not sampler.decimated
+
+
+def test_budget_exhausted_keeps_sampling_until_the_end():
+    # Total desconocido: al agotar el presupuesto se duplica el paso y se suma
+    # un tramo extra, sin dejar de muestrear el final del video
+    sampler = FrameSampler(30, total_frames=None, target_fps=15, max_frames=50)
+    sampled = _run(sampler, 1, 3000)
+    assert sampler.decimated
+    assert sampled[-1] > 3000 - sampler.step
+    assert sampler.step > sampler.base_step
+    # Cada tramo extra cubre el doble de video con la mitad del presupuesto
+    assert len(sampled) < 3000 // sampler.base_step
+    policy = sampler.policy(3000)
+    assert policy["muestreo_reducido"] is True
+    assert policy["paso_final"] == sampler.step and policy["paso_base"] == 2
+
+
+def test_underestimated_length_is_decimated():
+    # El contenedor informa menos frames de los que tiene el video
+    sampler = FrameSampler(30, total_frames=1000, target_fps=15, max_frames=100)
+    sampled = _run(sampler, 1, 4000)
+    assert sampler.decimated
+    assert sampled[-1] > 4000 - sampler.step
+
+
+def test_dense_window_after_event():
+    sampler = FrameSampler(30, total_frames=300, target_fps=5, dense_fps=30, dense_seconds=1.0)
+    sampled = _run(sampler, 1, 300, events=[60])
+    assert sampler.step == 6 and sampler.dense_step == 1
+    # Todos los frames de la ventana (30 frames tras el evento), luego el paso normal
+    assert set(range(61, 91)) <= set(sampled)
+    after = [index for index in sampled if index > 90]
+    assert all(b - a == 6 for a, b in zip(after, after[1:]))
+    assert sampler.events == 1 and sampler.sampled_dense == 30
+
+
+def test_dense_window_extended_by_new_event():
+    sampler = FrameSampler(30, total_frames=300, target_fps=5, dense_fps=30, dense_seconds=1.0)
+    sampled = _run(sampler, 1, 300, events=[60, 80])
+    # El segundo evento extiende la ventana hasta el frame 110
+    assert set(range(61, 111)) <= set(sampled)
+    assert 112 not in sampled
+    assert sampler.sampled_dense == 50
+
+
+def test_dense_frames_capped_by_budget():
+    sampler = FrameSampler(30, total_frames=3000, target_fps=15, max_frames=200)
+    # Eventos continuos: sin límite, casi todo el video sería denso
+    sampled = _run(sampler, 1, 3000, events=range(1, 3001, 20))
+    assert sampler.dense_capped
+    regular = sampler.sampled - sampler.sampled_dense
+    window = sampler.dense_frames // sampler.dense_step + 1
+    assert sampler.sampled_dense <= regular * 0.25 + window + 1
+    assert sampled[-1] > 3000 - sampler.step
+
+
+def test_start_frame_for_segments():
+    # Tramo [6000, 9000) de un video: índices absolutos, presupuesto del tramo
+    sampler = FrameSampler(30, total_frames=3000, target_fps=15, max_frames=100, start_frame=6000)
+    assert sampler.end_frame == 9000
+    sampled = _run(sampler, 6001, 9000)
+    assert sampled[0] == 6001
+    assert len(sampled) <= 100
+    assert sampled[-1] > 9000 - sampler.step
+    assert not sampler.decimated
+
+
+def test_from_config_share_splits_budget(monkeypatch):
+    from services import config
+    monkeypatch.setattr(config, "ANALISIS_MUESTREO_MAX_FRAMES", 1000)
+    sampler = FrameSampler.from_config(30, total_frames=3000, share=0.25, start_frame=3000)
+    assert sampler.max_frames == 250
+    assert sampler.end_frame == 6000
+
+
+def test_expected_samples():
+    assert FrameSampler(30, total_frames=300, target_fps=15).expected_samples() == 151
+    assert FrameSampler(30, total_frames=30000, target_fps=15, max_frames=100).expected_samples() == 100
+    assert FrameSampler(30, max_frames=0).expected_samples() == 1024
+
+
+@pytest.mark.parametrize("fps", [24, 25, 30, 60])
+def test_effective_fps_near_target(fps):
+    sampler = FrameSampler(fps, total_frames=fps * 60, target_fps=15)
+    _run(sampler, 1, fps * 60)
+    assert sampler.policy(fps * 60)["fps_efectivo"] == pytest.approx(fps / round(fps / 15), rel=0.02)
@@ -0,0 +1,271 @@
+import importlib
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy import Column, DateTime, Integer, String, Text, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from services.job_queue import (ESTADO_ERROR, ESTADO_LISTO, ESTADO_PENDIENTE, ESTADO_PROCESANDO,
+                                DatabaseJobBackend, JobQueue, LocalJobBackend)
+
+Base = declarative_base()
+
+
+class Trabajo(Base):
+    # Mismas columnas que TrabajoAnalisisDB en main.py
+    __tablename__ = "trabajos"
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer)
+    id_sesion = Column(String)
+    url_archivo = Column(String)
+    estado = Column(String, default=ESTADO_PENDIENTE)
+    resultado_json = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    actualizado_en = Column(DateTime, default=datetime.utcnow)
+
+
+def _payload(job_id):
+    return {"user_id": 1, "id_sesion": job_id, "url_archivo": f"https://ejemplo/{job_id}.mp4"}
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'cola.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture(params=["local", "db"])
+def backend(request, session_factory):
+    if request.param == "local":
+        return LocalJobBackend()
+    return DatabaseJobBackend(session_factory, Trabajo)
+
+
+def _age(backend, job_id, seconds):
+    """Retrasa actualizado_en del trabajo: simula un worker que dejó de latir"""
+    when = datetime.utcnow() - timedelta(seconds=seconds)
+    if isinstance(backend, LocalJobBackend):
+        backend._jobs[job_id]["actualizado_en"] = when
+        return
+    db = backend.session_factory()
+    try:
+        db.query(Trabajo).filter(Trabajo.id == job_id).update({"actualizado_en": when})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_claim_takes_oldest_pending_once(backend):
+    backend.create("a", _payload("a"))
+    backend.create("b", _payload("b"))
+    
+    first = backend.claim(lease_seconds=60)
+    second = backend.claim(lease_seconds=60)
+    assert (first["id"], second["id"]) == ("a", "b")
+    assert first["estado"] == ESTADO_PROCESANDO
+    assert first["payload"] == _payload("a")
+    assert backend.claim(lease_seconds=60) is None
+
+
+def test_update_result_and_error(backend):
+    backend.create("a", _payload("a"))
+    backend.update("a", estado=ESTADO_LISTO, resultado={"idPractica": 7}, error=None)
+    job = backend.get("a")
+    assert job["estado"] == ESTADO_LISTO and job["resultado"] == {"idPractica": 7}
+    
+    backend.update("a", estado=ESTADO_ERROR, error="falló")
+    assert backend.get("a")["error"] == "falló"
+    assert backend.get("no-existe") is None
+
+
+def test_db_reclaims_expired_lease(session_factory):
+    backend = DatabaseJobBackend(session_factory, Trabajo)
+    backend.create("a", _payload("a"))
+    assert backend.claim(lease_seconds=60)["id"] == "a"
+    
+    # Dentro del lease nadie más lo toma; vencido, otro worker lo retoma
+    _age(backend, "a", 30)
+    assert backend.claim(lease_seconds=60) is None
+    _age(backend, "a", 90)
+    assert backend.claim(lease_seconds=60)["id"] == "a"
+
+
+def test_touch_renews_lease(session_factory):
+    backend = DatabaseJobBackend(session_factory, Trabajo)
+    backend.create("a", _payload("a"))
+    backend.claim(lease_seconds=60)
+    _age(backend, "a", 90)
+    backend.touch("a")
+    assert backend.claim(lease_seconds=60) is None
+
+
+def test_touch_ignores_finished_jobs(backend):
+    backend.create("a", _payload("a"))
+    backend.claim()
+    backend.update("a", estado=ESTADO_LISTO, resultado={})
+    _age(backend, "a", 90)
+    antes = backend.get("a")["actualizado_en"]
+    backend.touch("a")
+    assert backend.get("a")["actualizado_en"] == antes
+
+
+def test_local_backend_does_not_reclaim_running_jobs():
+    # En un solo proceso un trabajo "procesando" siempre tiene un hilo detrás
+    backend = LocalJobBackend()
+    backend.create("a", _payload("a"))
+    backend.claim(lease_seconds=60)
+    _age(backend, "a", 90)
+    assert backend.claim(lease_seconds=60) is None
+
+
+def _wait_for(queue, job_id, estado, timeout=5.0):
+    limite = datetime.utcnow() + timedelta(seconds=timeout)
+    while datetime.utcnow() < limite:
+        job = queue.get(job_id)
+        if job and job["estado"] == estado:
+            return job
+        threading.Event().wait(0.02)
+    raise AssertionError(f"{job_id} no llegó a '{estado}': {queue.get(job_id)}")
+
+
+def test_queue_runs_jobs_and_reports_states(backend):
+    estados = []
+    queue = JobQueue(backend, lambda payload: {"url": payload["url_archivo"]}, max_workers=1,
+                     on_state_change=lambda job_id, estado: estados.append((job_id, estado)),
+                     heartbeat_seconds=0, poll_seconds=0.05)
+    try:
+        queue.submit("a", _payload("a"))
+        job = _wait_for(queue, "a", ESTADO_LISTO)
+    finally:
+        queue.shutdown(wait=True)
+    assert job["resultado"] == {"url": "https://ejemplo/a.mp4"}
+    assert estados == [("a", ESTADO_PROCESANDO), ("a", ESTADO_LISTO)]
+
+
+def test_queue_marks_failed_jobs(backend):
+    def falla(payload):
+        raise RuntimeError("video corrupto")
+    
+    estados = []
+    queue = JobQueue(backend, falla, max_workers=1,
+                     on_state_change=lambda job_id, estado: estados.append(estado),
+                     heartbeat_seconds=0, poll_seconds=0.05)
+    try:
+        queue.submit("a", _payload("a"))
+        job = _wait_for(queue, "a", ESTADO_ERROR)
+    finally:
+        queue.shutdown(wait=True)
+    assert job["error"] == "video corrupto"
+    assert estados[-1] == ESTADO_ERROR
+
+
+def test_submit_only_persists(backend):
+    # Sin ejecución local, submit no toca la sesión: ya está "procesando" y un
+    # aviso tardío podría reabrir una sesión que otro worker dejó en "error"
+    estados = []
+    queue = JobQueue(backend, lambda payload: {}, run_locally=False,
+                     on_state_change=lambda job_id, estado: estados.append(estado))
+    job = queue.submit("a", _payload("a"))
+    assert job["estado"] == ESTADO_PENDIENTE
+    assert estados == []
+
+
+def test_heartbeat_keeps_long_job(session_factory):
+    backend = DatabaseJobBackend(session_factory, Trabajo)
+    liberar = threading.Event()
+    queue = JobQueue(backend, lambda payload: liberar.wait(5) and {}, max_workers=1,
+                     heartbeat_seconds=0.05, poll_seconds=0.05, lease_seconds=60)
+    try:
+        queue.submit("a", _payload("a"))
+        _wait_for(queue, "a", ESTADO_PROCESANDO)
+        _age(backend, "a", 90)
+        threading.Event().wait(0.3)
+        # El latido renovó el lease: otro worker no lo retoma
+        assert backend.claim(lease_seconds=60) is None
+        liberar.set()
+        _wait_for(queue, "a", ESTADO_LISTO)
+    finally:
+        liberar.set()
+        queue.shutdown(wait=True)
+
+
+@pytest.fixture
+def main_module(tmp_path, monkeypatch):
+    pytest.importorskip("fastapi")
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'api.db'}")
+    monkeypatch.setenv("ANALISIS_COLA_BACKEND", "local")
+    monkeypatch.setenv("SESIONES_BACKEND", "memoria")
+    import main
+    main = importlib.reload(main)
+    yield main
+    main.job_queue.shutdown()
+    main.engine.dispose()
+
+
+def test_procesar_practica_is_idempotent(main_module, monkeypatch):
+    llamadas = []
+    
+    def analizar(url):
+        llamadas.append(url)
+        return {
+            "procesamiento_exitoso": True,
+            "video": {"frames_con_cara": 10, "contacto_visual_porcentaje": 70},
+            "audio": {"transcripcion": "hola a todos", "palabras_totales": 3, "duracion_segundos": 5},
+            "puntuacion": "verde",
+            "resumen": "Buen trabajo"
+        }
+    
+    monkeypatch.setattr(main_module, "analizar_video", analizar)
+    payload = _payload("sesion-1")
+    
+    primero = main_module._procesar_practica(payload)
+    # Reintento (lease vencido, reinicio): no se vuelve a analizar ni a guardar
+    segundo = main_module._procesar_practica(payload)
+    assert llamadas == [payload["url_archivo"]]
+    assert segundo["idPractica"] == primero["idPractica"]
+    
+    db = main_module.SessionLocal()
+    try:
+        assert db.query(main_module.PracticaDB).filter_by(id_sesion="sesion-1").count() == 1
+    finally:
+        db.close()
+
+
+def test_procesar_practica_keeps_other_workers_result(main_module, monkeypatch):
+    # Dos workers analizan la misma sesión a la vez: el segundo choca con la
+    # restricción única de id_sesion y devuelve la práctica del primero
+    payload = _payload("sesion-2")
+    
+    # _practica_de_sesion no la ve al empezar; la guarda otro worker durante el análisis
+    original = main_module._practica_de_sesion
+    vistas = []
+    
+    def practica_de_sesion(id_sesion):
+        vistas.append(id_sesion)
+        return None if len(vistas) == 1 else original(id_sesion)
+    
+    def analizar_y_guardar(url):
+        db = main_module.SessionLocal()
+        try:
+            db.add(main_module.PracticaDB(user_id=1, id_sesion="sesion-2", comentario="primero"))
+            db.commit()
+        finally:
+            db.close()
+        return {"procesamiento_exitoso": True, "video": {}, "audio": {}, "puntuacion": "verde"}
+    
+    monkeypatch.setattr(main_module, "_practica_de_sesion", practica_de_sesion)
+    monkeypatch.setattr(main_module, "analizar_video", analizar_y_guardar)
+    resultado = main_module._procesar_practica(payload)
+    assert resultado["comentario"] == "primero"
+    
+    db = main_module.SessionLocal()
+    try:
+        assert db.query(main_module.PracticaDB).filter_by(id_sesion="sesion-2").count() == 1
+    finally:
+        db.close()
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+from services.frame_preprocess import PreparedFrame
+from services.landmarks import CascadeGate, LandmarkBackend
+
+
+class _LinearBackend(LandmarkBackend):
+    """Landmarks que se mueven en línea recta con el tiempo (valor = segundos)"""
+    def __init__(self, gate, hands_per_frame=None):
+        super().__init__(gate=gate)
+        self.hands_per_frame = hands_per_frame or (lambda timestamp_ms: 1)
+        self.slow_calls = []
+    
+    def _face(self, rgb, timestamp_ms):
+        return None
+    
+    def _hands(self, rgb, timestamp_ms):
+        self.slow_calls.append(timestamp_ms)
+        return [np.full((21, 3), timestamp_ms / 1000, dtype=np.float32)] * self.hands_per_frame(timestamp_ms)
+    
+    def _pose(self, rgb, timestamp_ms):
+        return np.full((33, 3), timestamp_ms / 1000, dtype=np.float32)
+
+
+def _frame(value=100):
+    return PreparedFrame(np.full((72, 128, 3), value, dtype=np.uint8), None, None)
+
+
+def test_gate_skips_static_frames_up_to_max_reuse():
+    gate = CascadeGate(threshold=2.0, max_reuse=3)
+    decisions = [gate.should_run(_frame().rgb) for _ in range(8)]
+    # Se re-infiere al inicio y al agotar max_reuse, aunque el frame no cambie
+    assert decisions == [True, False, False, False, True, False, False, False]
+    stats = gate.stats()
+    assert (stats["inferencias_manos_pose"], stats["inferencias_omitidas"]) == (2, 6)
+    assert stats["fraccion_omitida"] == 0.75
+
+
+def test_gate_runs_on_changed_frames():
+    gate = CascadeGate(threshold=2.0, max_reuse=10)
+    decisions = [gate.should_run(_frame(value).rgb) for value in (100, 101, 110, 111, 140)]
+    assert decisions == [True, False, True, False, True]
+    assert gate.stats()["fraccion_omitida"] == 0.4
+
+
+def test_gate_reset():
+    gate = CascadeGate(max_reuse=3)
+    gate.should_run(_frame().rgb)
+    gate.should_run(_frame().rgb)
+    gate.reset()
+    assert gate.should_run(_frame().rgb)
+    assert gate.stats()["inferencias_omitidas"] == 0
+
+
+def test_skipped_frames_are_interpolated():
+    backend = _LinearBackend(CascadeGate(max_reuse=3))
+    timestamps = [0, 100, 200, 300, 400, 500, 600]
+    results = backend.process_batch([_frame()] * len(timestamps), timestamps)
+    assert backend.slow_calls == [0, 400]
+    
+    # Entre las inferencias de 0 y 400 ms, interpolados; después, reutilizados
+    poses = [result.pose[0, 0] for result in results]
+    hands = [result.hands[0][0, 0] for result in results]
+    np.testing.assert_allclose(poses, [0, 0.1, 0.2, 0.3, 0.4, 0.4, 0.4], atol=1e-6)
+    np.testing.assert_allclose(hands, poses, atol=1e-6)
+    assert backend.gate.stats()["inferencias_interpoladas"] == 3
+
+
+def test_interpolation_across_batches():
+    # El último frame inferido del lote anterior es el punto de partida
+    backend = _LinearBackend(CascadeGate(max_reuse=3))
+    backend.process_batch([_frame()] * 2, [0, 100])
+    results = backend.process_batch([_frame()] * 3, [200, 300, 400])
+    np.testing.assert_allclose([result.pose[0, 0] for result in results], [0.2, 0.3, 0.4], atol=1e-6)
+
+
+def test_hands_not_interpolated_when_count_changes():
+    backend = _LinearBackend(CascadeGate(max_reuse=2),
+                             hands_per_frame=lambda timestamp_ms: 1 if timestamp_ms < 300 else 2)
+    results = backend.process_batch([_frame()] * 4, [0, 100, 200, 300])
+    assert [len(result.hands) for result in results] == [1, 1, 1, 2]
+    np.testing.assert_allclose([result.hands[0][0, 0] for result in results[:3]], [0, 0, 0], atol=1e-6)
+    # La postura sí se interpola
+    np.testing.assert_allclose([result.pose[0, 0] for result in results], [0, 0.1, 0.2, 0.3], atol=1e-6)
+
+
+def test_without_gate_every_frame_is_inferred():
+    backend = _LinearBackend(None)
+    results = backend.process_batch([_frame()] * 3, [0, 100, 200])
+    assert backend.slow_calls == [0, 100, 200]
+    np.testing.assert_allclose([result.pose[0, 0] for result in results], [0, 0.1, 0.2], atol=1e-6)
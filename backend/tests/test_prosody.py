@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from services.prosody import analyze_prosody
+from services.vad import VoiceActivity
+
+SAMPLE_RATE = 16000
+
+
+def _harmonic_tone(f0, seconds=3.0):
+    """Tono con armónicos y un segundo armónico fuerte, como una vocal"""
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    x = sum((0.9 if k == 2 else 1 / k) * np.sin(2 * np.pi * f0 * k * t) for k in range(1, 8))
+    return (x / np.abs(x).max() * 0.5 * 32767).astype(np.int16).tobytes()
+
+
+@pytest.mark.parametrize("f0", [90, 150, 220, 380])
+def test_pitch_without_octave_errors(f0):
+    result = analyze_prosody(_harmonic_tone(f0), SAMPLE_RATE, VoiceActivity([(0.0, 3.0)], 3.0))
+    assert result["f0_mediana_hz"] == pytest.approx(f0, rel=0.01)
+    # Tono constante: sin saltos de octava entre tramas
+    assert result["f0_desvio_semitonos"] < 0.2
+    assert result["nivel"] == "baja"
+
+
+def test_noise_has_no_pitch():
+    noise = np.random.default_rng(0).normal(0, 3000, SAMPLE_RATE * 3).astype(np.int16)
+    assert analyze_prosody(noise.tobytes(), SAMPLE_RATE) == {}
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+
+from services import config
+from services.result_cache import ResultCache, analyzer_version
+
+
+def _result(n: int) -> dict:
+    # ~1 KB por resultado
+    return {"video": {"frames_con_cara": n}, "audio": {"transcripcion": "x" * 1000}}
+
+
+def _key(name: str) -> str:
+    return name * 64
+
+
+def _age(cache: ResultCache, name: str, seconds_ago: float) -> None:
+    path = cache._content_path(_key(name))
+    when = os.path.getmtime(path) - seconds_ago
+    os.utime(path, (when, when))
+
+
+def _disk_size(directory) -> int:
+    return sum(os.path.getsize(os.path.join(dirpath, name))
+               for dirpath, _, names in os.walk(directory) for name in names)
+
+
+def test_put_and_get(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1_000_000, version="v1")
+    assert cache.get(_key("a")) is None
+    cache.put(_key("a"), {"puntuacion": "verde", "valor": np.float32(0.5)})
+    assert cache.get(_key("a")) == {"puntuacion": "verde", "valor": 0.5}
+
+
+def test_url_index_requires_same_validator(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1_000_000, version="v1")
+    cache.put(_key("a"), _result(1))
+    cache.remember_url("https://ejemplo/v.mp4", '"etag-1"', _key("a"))
+    assert cache.get_by_url("https://ejemplo/v.mp4", '"etag-1"') == _result(1)
+    # El archivo cambió en el servidor, o no hay validador
+    assert cache.get_by_url("https://ejemplo/v.mp4", '"etag-2"') is None
+    assert cache.get_by_url("https://ejemplo/v.mp4", None) is None
+
+
+def test_evicts_least_recently_used_down_to_target(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=4500, version="v1")
+    for age, name in ((40, "a"), (30, "b"), (20, "c"), (10, "d")):
+        cache.put(_key(name), _result(0))
+        _age(cache, name, age)
+    # Leer "a" la marca como usada recientemente: el menos usado pasa a ser "b"
+    assert cache.get(_key("a")) is not None
+    
+    cache.put(_key("e"), _result(0))
+    present = {name for name in "abcde" if cache.get(_key(name)) is not None}
+    assert present == {"a", "d", "e"}
+    # Se desaloja hasta el 90 % del límite, no apenas por debajo
+    assert _disk_size(tmp_path) <= 4500 * 0.9
+
+
+def test_running_size_matches_disk(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=1_000_000, version="v1")
+    cache.put(_key("a"), _result(1))
+    cache.put(_key("b"), _result(2))
+    # Reescribir una entrada suma solo la diferencia
+    cache.put(_key("a"), {"corto": True})
+    cache.remember_url("https://ejemplo/v.mp4", "etag", _key("b"))
+    cache.put(_key("c"), _result(3))
+    assert cache._size == _disk_size(tmp_path)
+
+
+def test_no_scan_below_limit(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=1_000_000, version="v1")
+    cache.put(_key("a"), _result(1))
+    scans = []
+    original = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or original())
+    for name in "bcd":
+        cache.put(_key(name), _result(1))
+    assert scans == []
+
+
+def test_settings_change_misses(tmp_path, monkeypatch):
+    before = analyzer_version(extra=config.settings_fingerprint())
+    ResultCache(str(tmp_path), max_bytes=1_000_000, version=before).put(_key("a"), _result(1))
+    
+    monkeypatch.setattr(config, "ANALISIS_MUESTREO_FPS", config.ANALISIS_MUESTREO_FPS + 5)
+    after = analyzer_version(extra=config.settings_fingerprint())
+    assert after != before
+    assert ResultCache(str(tmp_path), max_bytes=1_000_000, version=after).get(_key("a")) is None
+    
+    monkeypatch.undo()
+    assert ResultCache(str(tmp_path), max_bytes=1_000_000, version=before).get(_key("a")) == _result(1)
+
+
+def test_cache_settings_do_not_change_version(monkeypatch):
+    before = analyzer_version(extra=config.settings_fingerprint())
+    monkeypatch.setattr(config, "ANALISIS_CACHE_MAX_MB", config.ANALISIS_CACHE_MAX_MB * 2)
+    assert analyzer_version(extra=config.settings_fingerprint()) == before
+
+
+def test_code_version_changes_key():
+    assert analyzer_version(extra=["a"]) != analyzer_version(extra=["b"])
+    assert analyzer_version(extra=["a"]) == analyzer_version(extra=["a"])
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from services import session_store as store_module
+from services.session_store import (ESTADO_ERROR, ESTADO_GRABANDO, ESTADO_LISTO, ESTADO_PROCESANDO,
+                                    DatabaseSessionStore, MemorySessionStore, RedisSessionStore,
+                                    create_session_store)
+
+sqlalchemy = pytest.importorskip("sqlalchemy")
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+Base = declarative_base()
+
+
+class Sesion(Base):
+    # Mismas columnas que SesionPracticaDB en main.py
+    __tablename__ = "sesiones"
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    estado = Column(String, default=ESTADO_GRABANDO)
+    creado_en = Column(DateTime, default=datetime.utcnow)
+    expira_en = Column(DateTime, index=True)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sesiones.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def redis_store(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")  # scripts Lua en fakeredis
+    server = fakeredis.FakeServer()
+    client = SimpleNamespace(from_url=lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    monkeypatch.setattr(store_module, "redis", SimpleNamespace(Redis=client))
+    return RedisSessionStore("redis://prueba", ttl_seconds=60)
+
+
+@pytest.fixture(params=["memoria", "db", "redis"])
+def store(request, session_factory):
+    if request.param == "memoria":
+        return MemorySessionStore(ttl_seconds=60)
+    if request.param == "db":
+        return DatabaseSessionStore(session_factory, Sesion, ttl_seconds=60)
+    return request.getfixturevalue("redis_store")
+
+
+def _expire_in(store, session_id, seconds):
+    """Cambia el vencimiento de la sesión sin esperar al TTL"""
+    if isinstance(store, RedisSessionStore):
+        if seconds <= 0:
+            store.client.delete(store._PREFIX + session_id)
+        else:
+            store.client.expire(store._PREFIX + session_id, seconds)
+        return
+    expira_en = datetime.utcnow() + timedelta(seconds=seconds)
+    if isinstance(store, MemorySessionStore):
+        store._sessions[session_id]["expira_en"] = expira_en
+        return
+    db = store.session_factory()
+    try:
+        db.query(Sesion).filter(Sesion.id == session_id).update({"expira_en": expira_en})
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_create_and_get(store):
+    created = store.create("s1", user_id=7)
+    assert created["estado"] == ESTADO_GRABANDO
+    
+    session = store.get("s1")
+    assert (session["id"], session["user_id"], session["estado"]) == ("s1", 7, ESTADO_GRABANDO)
+    assert session["expira_en"] > datetime.utcnow()
+    assert store.get("no-existe") is None
+
+
+def test_allowed_transitions(store):
+    store.create("s1")
+    assert store.transition("s1", ESTADO_PROCESANDO)
+    assert store.transition("s1", ESTADO_ERROR)
+    # Reintento tras un error, y de nuevo tras terminar bien
+    assert store.transition("s1", ESTADO_PROCESANDO)
+    assert store.transition("s1", ESTADO_LISTO)
+    assert store.transition("s1", ESTADO_PROCESANDO)
+    assert store.get("s1")["estado"] == ESTADO_PROCESANDO
+
+
+@pytest.mark.parametrize("origen, destino", [
+    (ESTADO_GRABANDO, ESTADO_LISTO),
+    (ESTADO_GRABANDO, ESTADO_ERROR),
+    (ESTADO_PROCESANDO, ESTADO_PROCESANDO),
+    (ESTADO_PROCESANDO, ESTADO_GRABANDO),
+    (ESTADO_GRABANDO, "desconocido")
+])
+def test_rejected_transitions(store, origen, destino):
+    # main responde 409 cuando transition retorna False
+    store.create("s1")
+    if origen == ESTADO_PROCESANDO:
+        assert store.transition("s1", ESTADO_PROCESANDO)
+    assert not store.transition("s1", destino)
+    assert store.get("s1")["estado"] == origen
+
+
+def test_only_one_concurrent_finalize(store):
+    # Dos peticiones finalizan la misma sesión: solo una pasa a "procesando"
+    store.create("s1")
+    assert [store.transition("s1", ESTADO_PROCESANDO) for _ in range(2)] == [True, False]
+
+
+def test_expired_session(store):
+    store.create("s1")
+    _expire_in(store, "s1", -1)
+    assert store.get("s1") is None
+    assert not store.transition("s1", ESTADO_PROCESANDO)
+    assert not store.transition("no-existe", ESTADO_PROCESANDO)
+
+
+def test_transition_renews_ttl(store):
+    store.create("s1")
+    _expire_in(store, "s1", 5)
+    assert store.transition("s1", ESTADO_PROCESANDO)
+    assert store.get("s1")["expira_en"] > datetime.utcnow() + timedelta(seconds=30)
+
+
+def test_clear(store):
+    store.create("s1")
+    store.create("s2")
+    store.clear()
+    assert store.get("s1") is None and store.get("s2") is None
+
+
+def test_memory_purges_expired_on_create():
+    store = MemorySessionStore(ttl_seconds=60)
+    store.create("vieja")
+    _expire_in(store, "vieja", -1)
+    store.create("nueva")
+    assert list(store._sessions) == ["nueva"]
+
+
+def test_db_deletes_expired_on_create(session_factory):
+    store = DatabaseSessionStore(session_factory, Sesion, ttl_seconds=60)
+    store.create("vieja")
+    _expire_in(store, "vieja", -1)
+    store.create("nueva")
+    db = session_factory()
+    try:
+        assert [row.id for row in db.query(Sesion).all()] == ["nueva"]
+    finally:
+        db.close()
+
+
+def test_create_session_store_falls_back_to_memory():
+    assert isinstance(create_session_store("memoria"), MemorySessionStore)
+    assert isinstance(create_session_store("redis", redis_url=""), MemorySessionStore)
+    assert isinstance(create_session_store("otro"), MemorySessionStore)
@@ -0,0 +1,121 @@
+import struct
+
+import pytest
+
+from services.stream_download import EBML_MAGIC, is_streamable, mp4_rotation, peek_container
+
+FIXED_ONE = 1 << 16  # 1.0 en punto fijo 16.16
+
+
+def _box(box_type: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+
+def _large_box(box_type: bytes, payload: bytes = b"") -> bytes:
+    # Tamaño extendido de 64 bits (size = 1)
+    return struct.pack(">I", 1) + box_type + struct.pack(">Q", 16 + len(payload)) + payload
+
+
+def _matrix(degrees: int) -> bytes:
+    a, b = {0: (1, 0), 90: (0, 1), 180: (-1, 0), 270: (0, -1)}[degrees]
+    values = [a * FIXED_ONE, b * FIXED_ONE, 0, -b * FIXED_ONE, a * FIXED_ONE, 0, 0, 0, 1 << 30]
+    return struct.pack(">9i", *values)
+
+
+def _tkhd(degrees: int = 0, version: int = 0) -> bytes:
+    times = struct.pack(">QQIIQ", 0, 0, 1, 0, 1000) if version == 1 else struct.pack(">IIIII", 0, 0, 1, 0, 1000)
+    payload = bytes([version, 0, 0, 3]) + times + bytes(16) + _matrix(degrees) + struct.pack(">II", 640 << 16, 360 << 16)
+    return _box(b"tkhd", payload)
+
+
+def _moov(*tracks: bytes) -> bytes:
+    return _box(b"moov", _box(b"mvhd", bytes(100)) + b"".join(_box(b"trak", track) for track in tracks))
+
+
+FTYP = _box(b"ftyp", b"isom" + bytes(4) + b"isomavc1")
+MDAT = _box(b"mdat", bytes(4096))
+
+
+def test_moov_before_mdat():
+    assert is_streamable(FTYP + _moov(_tkhd()) + MDAT) is True
+
+
+def test_moov_after_mdat():
+    assert is_streamable(FTYP + MDAT + _moov(_tkhd())) is False
+
+
+def test_fragmented_mp4():
+    assert is_streamable(FTYP + _box(b"moof", bytes(32)) + MDAT) is True
+
+
+def test_free_boxes_before_moov():
+    assert is_streamable(FTYP + _box(b"free", bytes(64)) + _large_box(b"wide", bytes(8)) + _moov()) is True
+
+
+def test_truncated_prefixes():
+    # Sin llegar al encabezado de moov/mdat todavía no se puede decidir
+    data = FTYP + _box(b"free", bytes(64)) + _moov(_tkhd())
+    assert is_streamable(data[:4]) is None
+    assert is_streamable(FTYP) is None
+    assert is_streamable(data[:len(FTYP) + 30]) is None
+    assert is_streamable(data[:len(FTYP) + 72 + 8]) is True
+    # Tamaño extendido cortado antes de sus 8 bytes
+    assert is_streamable(FTYP + _large_box(b"free", bytes(8))[:12]) is None
+
+
+def test_other_containers():
+    assert is_streamable(EBML_MAGIC + bytes(60)) is True
+    assert is_streamable(b"RIFF\x00\x00\x00\x00AVI LIST") is False
+    # size 0: la caja llega hasta el final del archivo, no hay moov antes
+    assert is_streamable(FTYP + struct.pack(">I", 0) + b"mdat" + bytes(16)) is False
+
+
+@pytest.mark.parametrize("degrees", [0, 90, 180, 270])
+def test_rotation_matrix(degrees):
+    assert mp4_rotation(FTYP + _moov(_tkhd(degrees))) == degrees
+
+
+def test_rotation_version_1_tkhd():
+    assert mp4_rotation(FTYP + _moov(_tkhd(90, version=1))) == 90
+
+
+def test_rotation_from_video_track():
+    # La pista de audio no está girada; la de video sí
+    assert mp4_rotation(FTYP + _moov(_tkhd(0), _tkhd(270))) == 270
+
+
+def test_rotation_truncated_matrix():
+    data = FTYP + _moov(_tkhd(90))
+    cut = data.find(b"tkhd") + 40
+    assert mp4_rotation(data[:cut]) == 0
+    assert mp4_rotation(FTYP + MDAT) == 0
+
+
+def _chunks(data: bytes, size: int):
+    return iter([data[i:i + size] for i in range(0, len(data), size)])
+
+
+def test_peek_reads_whole_moov_for_rotation():
+    # La decisión llega con el encabezado de moov: hay que seguir hasta su final
+    data = FTYP + _moov(_tkhd(0), _tkhd(90)) + MDAT
+    chunks = _chunks(data, 64)
+    prefix, streamable = peek_container(chunks)
+    assert streamable is True
+    assert len(prefix) < len(data)
+    assert mp4_rotation(prefix) == 90
+    # El resto sigue en el iterador, sin perder bytes
+    assert prefix + b"".join(chunks) == data
+
+
+def test_peek_not_streamable_stops_at_mdat():
+    data = FTYP + MDAT + _moov(_tkhd())
+    prefix, streamable = peek_container(_chunks(data, 16))
+    assert streamable is False
+    assert len(prefix) <= len(FTYP) + 16
+
+
+def test_peek_limit():
+    data = FTYP + _box(b"free", bytes(10000)) + _moov()
+    prefix, streamable = peek_container(_chunks(data, 1000), max_bytes=2000)
+    assert streamable is None
+    assert 2000 <= len(prefix) < 3000
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from services.streaming_stats import QuantileSketch, RunningStats
+
+QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9]
+
+
+@pytest.fixture
+def values():
+    # Mezcla asimétrica, parecida a las desviaciones de mirada por frame
+    rng = np.random.default_rng(7)
+    return np.concatenate([rng.normal(0.02, 0.005, 40000), rng.exponential(0.03, 10000)])
+
+
+def _blocks(values, size=977):
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def test_running_stats_matches_numpy(values):
+    stats = RunningStats()
+    for block in _blocks(values):
+        stats.add(block)
+    assert stats.count == len(values)
+    assert stats.mean == pytest.approx(np.mean(values), rel=1e-9)
+    assert stats.std == pytest.approx(np.std(values), rel=1e-9)
+    assert stats.ptp == pytest.approx(np.ptp(values))
+
+
+def test_running_stats_merge_equals_single_pass(values):
+    # Como los segmentos de video: cada parte acumula por separado y se combinan en orden
+    parts = np.array_split(values, 5)
+    merged = RunningStats()
+    for part in parts:
+        stats = RunningStats()
+        for block in _blocks(part):
+            stats.add(block)
+        merged.merge(stats)
+    merged.merge(RunningStats())  # Una parte vacía no cambia nada
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(np.mean(values), rel=1e-9)
+    assert merged.std == pytest.approx(np.std(values), rel=1e-9)
+    assert (merged.minimum, merged.maximum) == (values.min(), values.max())
+
+
+def test_running_stats_exact_mode(values):
+    stats = RunningStats(exact=True)
+    stats.add(values[:100])
+    other = RunningStats(exact=True)
+    other.add(values[100:200])
+    stats.merge(other)
+    assert stats.std == np.std(values[:200])
+
+
+def test_empty_running_stats():
+    stats = RunningStats()
+    assert (stats.mean, stats.std, stats.ptp) == (0.0, 0.0, 0.0)
+
+
+def _assert_close_to_percentiles(sketch, values):
+    expected = np.percentile(values, [q * 100 for q in QUANTILES])
+    tolerance = 0.002 * np.ptp(values)
+    for estimate, exact in zip(sketch.quantiles(QUANTILES), expected):
+        assert estimate == pytest.approx(exact, abs=tolerance)
+
+
+def test_quantile_sketch_matches_percentile(values):
+    sketch = QuantileSketch()
+    for block in _blocks(values):
+        sketch.add(block)
+    assert sketch.count == len(values)
+    _assert_close_to_percentiles(sketch, values)
+    assert sketch.quantile(0.0) == values.min()
+    assert sketch.quantile(1.0) == values.max()
+
+
+def test_quantile_sketch_merge(values):
+    merged = QuantileSketch()
+    for part in np.array_split(values, 4):
+        sketch = QuantileSketch()
+        for block in _blocks(part):
+            sketch.add(block)
+        merged.merge(sketch)
+    merged.merge(QuantileSketch())
+    assert merged.count == len(values)
+    _assert_close_to_percentiles(merged, values)
+
+
+def test_quantile_sketch_exact_mode(values):
+    sketch = QuantileSketch(exact=True)
+    sketch.add(values[:500])
+    other = QuantileSketch(exact=True)
+    other.add(values[500:1000])
+    sketch.merge(other)
+    assert sketch.quantile(0.75) == np.percentile(values[:1000], 75)
+
+
+def test_empty_quantile_sketch():
+    assert QuantileSketch().quantile(0.5) is None
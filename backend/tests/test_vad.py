@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from services.audio_chunks import group_segments
+from services.vad import detect_voice
+
+SAMPLE_RATE = 16000
+
+
+def _signal(*parts):
+    """parts: (segundos, amplitud) alternando silencio con ruido leve y tono de 200 Hz"""
+    rng = np.random.default_rng(3)
+    out = []
+    for seconds, amplitude in parts:
+        n = int(SAMPLE_RATE * seconds)
+        noise = rng.normal(0, 30, n)
+        tone = amplitude * np.sin(2 * np.pi * 200 * np.arange(n) / SAMPLE_RATE)
+        out.append(noise + tone)
+    return np.concatenate(out).astype(np.int16).tobytes()
+
+
+def test_tone_and_silence():
+    pcm = _signal((0.5, 0), (1.0, 8000), (0.8, 0), (1.2, 8000), (0.5, 0))
+    activity = detect_voice(pcm, SAMPLE_RATE)
+    
+    assert activity.duration == pytest.approx(4.0)
+    assert len(activity.segments) == 2
+    (s1, e1), (s2, e2) = activity.segments
+    frame = 0.03
+    assert s1 == pytest.approx(0.5, abs=frame) and e1 == pytest.approx(1.5, abs=frame)
+    assert s2 == pytest.approx(2.3, abs=frame) and e2 == pytest.approx(3.5, abs=frame)
+    assert activity.speech_seconds == pytest.approx(2.2, abs=2 * frame)
+    assert activity.trimmed_seconds == pytest.approx(3.0, abs=2 * frame)
+    
+    metrics = activity.pause_metrics(0.5)
+    assert metrics["total"] == 1
+    assert metrics["media_segundos"] == pytest.approx(0.8, abs=2 * frame)
+    assert metrics["distribucion"] == {"cortas": 1, "medias": 0, "largas": 0}
+
+
+def test_short_silence_and_click():
+    # Un silencio de 100 ms queda dentro del tramo; un golpe de 60 ms se descarta
+    pcm = _signal((0.5, 0), (1.0, 8000), (0.1, 0), (1.0, 8000), (1.0, 0), (0.06, 8000), (0.5, 0))
+    activity = detect_voice(pcm, SAMPLE_RATE)
+    assert len(activity.segments) == 1
+    assert activity.segments[0][1] == pytest.approx(2.6, abs=0.03)
+
+
+def test_silence_only():
+    activity = detect_voice(_signal((2.0, 0)), SAMPLE_RATE)
+    assert activity.segments == []
+    assert activity.trimmed_seconds == 0.0
+    assert activity.pause_metrics()["total"] == 0
+
+
+def test_group_segments_merges_until_max():
+    voiced = [(1000, 5000), (6000, 12000), (20000, 28000), (40000, 45000)]
+    chunks = group_segments(voiced, 50000, max_chunk_seconds=30, padding_ms=200)
+    assert chunks == [(800, 28200), (39800, 45200)]
+
+
+def test_group_segments_splits_long_speech():
+    chunks = group_segments([(0, 70000)], 70000, max_chunk_seconds=30, padding_ms=200)
+    assert chunks == [(0, 30000), (30000, 60000), (60000, 70000)]
+    assert all(end - start <= 30000 for start, end in chunks)
+
+
+def test_group_segments_padding_stays_inside_audio():
+    chunks = group_segments([(100, 900)], 1000, max_chunk_seconds=30, padding_ms=200)
+    assert chunks == [(0, 1000)]
+    assert group_segments([], 1000) == []
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("mediapipe")
+
+from services.video_analyzer import FRAME_FEATURES, VisualPartial, _head_movement
+
+WIDTH, HEIGHT = 640, 360  # Video horizontal: alto / ancho = 0.5625
+
+
+def _trajectory(count, step, seed=5):
+    """Nariz normalizada (frame, x, y) cada step frames, con movimiento al azar"""
+    rng = np.random.default_rng(seed)
+    xy = 0.5 + np.cumsum(rng.normal(0, 0.01, (count, 2)), axis=0)
+    return [(step * (i + 1), float(x), float(y)) for i, (x, y) in enumerate(xy)]
+
+
+def _baseline(faces):
+    """Métrica original: distancia en píxeles entre frames muestreados / ancho"""
+    pixels = np.array([(x * WIDTH, y * HEIGHT) for _, x, y in faces])
+    return np.linalg.norm(np.diff(pixels, axis=0), axis=1) / WIDTH
+
+
+def test_head_movement_matches_baseline_every_two_frames():
+    # Con paso 2 (el muestreo original) la métrica es la misma, así que los
+    # umbrales de 0.02 de la clasificación no cambian
+    faces = _trajectory(200, step=2)
+    movements = [_head_movement(a, b, HEIGHT / WIDTH) for a, b in zip(faces, faces[1:])]
+    np.testing.assert_allclose(movements, _baseline(faces), rtol=1e-12)
+
+
+def test_head_movement_independent_of_sampling_step():
+    # Velocidad constante: con paso 6 se reporta el mismo movimiento por 2 frames
+    def linear(step):
+        return [(frame, 0.3 + 0.001 * frame, 0.4 + 0.002 * frame) for frame in range(0, 120, step)]
+    
+    expected = _baseline(linear(2))
+    for step in (1, 4, 6):
+        faces = linear(step)
+        movements = [_head_movement(a, b, HEIGHT / WIDTH) for a, b in zip(faces, faces[1:])]
+        np.testing.assert_allclose(movements, expected[0], rtol=1e-9)
+
+
+def _partial(faces):
+    features = np.zeros(len(faces), dtype=FRAME_FEATURES)
+    for name in FRAME_FEATURES.names:
+        if FRAME_FEATURES[name] == np.float64:
+            features[name] = np.nan
+    features["has_face"] = True
+    features["eye_open"] = 0.3
+    features["frame"] = [frame for frame, _, _ in faces]
+    features["nose_x"] = [x for _, x, _ in faces]
+    features["nose_y"] = [y for _, _, y in faces]
+    features["head_movement"][1:] = [_head_movement(a, b, HEIGHT / WIDTH) for a, b in zip(faces, faces[1:])]
+    partial = VisualPartial(aspect=HEIGHT / WIDTH)
+    partial.update(features)
+    return partial
+
+
+def test_segments_keep_head_movement_at_the_border():
+    # Dos tramos combinados dan el mismo promedio que el video en una pasada
+    faces = _trajectory(100, step=2)
+    whole = _partial(faces)
+    first, second = _partial(faces[:40]), _partial(faces[40:])
+    first.merge(second)
+    assert first.head.count == whole.head.count == len(faces) - 1
+    assert first.head.mean == pytest.approx(whole.head.mean)
+    assert whole.head.mean == pytest.approx(_baseline(faces).mean())
@@ -119,6 +119,25 @@ else
     AUTH_HEADER=""
 fi
 
+# Espera a que termine el análisis encolado de una sesión y muestra el idPractica
+esperar_practica() {
+    local SESION=$1
+    local ESTADO=""
+    for i in $(seq 1 120); do
+        if [ -n "$AUTH_HEADER" ]; then
+            RESP=$(curl -s $BASE_URL/practica/sesion/$SESION/estado -H "$AUTH_HEADER")
+        else
+            RESP=$(curl -s $BASE_URL/practica/sesion/$SESION/estado)
+        fi
+        ESTADO=$(echo "$RESP" | python3 -c "import sys, json; print(json.load(sys.stdin).get('estado', ''))" 2>/dev/null)
+        if [ "$ESTADO" == "listo" ] || [ "$ESTADO" == "error" ]; then
+            break
+        fi
+        sleep 5
+    done
+    echo "$RESP" | python3 -c "import sys, json; print(json.load(sys.stdin).get('idPractica') or '')" 2>/dev/null
+}
+
 # ═══════════════════════════════════════════════════════════════════════════
 # FASE 2: PRIMERA SESIÓN DE PRÁCTICA (VIDEO BUENO)
 # ═══════════════════════════════════════════════════════════════════════════
@@ -144,17 +163,17 @@ echo ""
 # Finalizar sesión 1 con video bueno
 echo -e "${BLUE}5️⃣  Procesando video BUENO y analizando...${NC}"
 if [ -n "$AUTH_HEADER" ]; then
-    PRACTICA_1=$(curl -s -X POST $BASE_URL/practica/finalizar \
+    curl -s -X POST $BASE_URL/practica/finalizar \
       -H "Content-Type: application/json" \
       -H "$AUTH_HEADER" \
-      -d "{\"idSesion\": \"$SESION_1\", \"urlArchivo\": \"$VIDEO_BUENO\"}" | \
-      python3 -c "import sys, json; data=json.load(sys.stdin); print(data.get('idPractica', '1'))" 2>/dev/null)
+      -d "{\"idSesion\": \"$SESION_1\", \"urlArchivo\": \"$VIDEO_BUENO\"}" > /dev/null
 else
-    PRACTICA_1=$(curl -s -X POST $BASE_URL/practica/finalizar \
+    curl -s -X POST $BASE_URL/practica/finalizar \
       -H "Content-Type: application/json" \
-      -d "{\"idSesion\": \"$SESION_1\", \"urlArchivo\": \"$VIDEO_BUENO\"}" | \
-      python3 -c "import sys, json; data=json.load(sys.stdin); print(data.get('idPractica', '1'))" 2>/dev/null)
+      -d "{\"idSesion\": \"$SESION_1\", \"urlArchivo\": \"$VIDEO_BUENO\"}" > /dev/null
 fi
+PRACTICA_1=$(esperar_practica $SESION_1)
+PRACTICA_1=${PRACTICA_1:-1}
 
 # Ver análisis detallado de sesión 1
 echo -e "${BLUE}6️⃣  Análisis detallado de Primera Sesión${NC}"
@@ -190,17 +209,17 @@ echo ""
 # Finalizar sesión 2 con video malo
 echo -e "${BLUE}8️⃣  Procesando video MALO y analizando debilidades...${NC}"
 if [ -n "$AUTH_HEADER" ]; then
-    PRACTICA_2=$(curl -s -X POST $BASE_URL/practica/finalizar \
+    curl -s -X POST $BASE_URL/practica/finalizar \
       -H "Content-Type: application/json" \
       -H "$AUTH_HEADER" \
-      -d "{\"idSesion\": \"$SESION_2\", \"urlArchivo\": \"$VIDEO_MALO\"}" | \
-      python3 -c "import sys, json; data=json.load(sys.stdin); print(data.get('idPractica', '2'))" 2>/dev/null)
+      -d "{\"idSesion\": \"$SESION_2\", \"urlArchivo\": \"$VIDEO_MALO\"}" > /dev/null
 else
-    PRACTICA_2=$(curl -s -X POST $BASE_URL/practica/finalizar \
+    curl -s -X POST $BASE_URL/practica/finalizar \
       -H "Content-Type: application/json" \
-      -d "{\"idSesion\": \"$SESION_2\", \"urlArchivo\": \"$VIDEO_MALO\"}" | \
-      python3 -c "import sys, json; data=json.load(sys.stdin); print(data.get('idPractica', '2'))" 2>/dev/null)
+      -d "{\"idSesion\": \"$SESION_2\", \"urlArchivo\": \"$VIDEO_MALO\"}" > /dev/null
 fi
+PRACTICA_2=$(esperar_practica $SESION_2)
+PRACTICA_2=${PRACTICA_2:-2}
 
 # Ver análisis detallado de sesión 2
 echo -e "${BLUE}9️⃣  Análisis detallado de Segunda Sesión${NC}"